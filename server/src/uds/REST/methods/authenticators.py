@@ -42,7 +42,7 @@ from uds.core.environment import Environment
 
 from uds.REST import NotFound
 from uds.REST.model import ModelHandler
-from uds.core.util import permissions, ensure
+from uds.core.util import ensure
 from uds.core.util.model import processUuid
 from uds.core.ui import gui
 
@@ -171,7 +171,7 @@ class Authenticators(ModelHandler):
             'type': type_.getType(),
             'type_name': type_.name(),
             'type_info': self.typeInfo(type_),
-            'permission': permissions.getEffectivePermission(self._user, item),
+            'permission': self.getPermissions(item),
         }
 
     def afterSave(self, item: 'Model') -> None:
@@ -36,7 +36,7 @@ import collections.abc
 
 from django.utils.translation import gettext_lazy as _
 from uds.models import Calendar
-from uds.core.util import permissions, ensure
+from uds.core.util import ensure
 
 from uds.REST.model import ModelHandler
 from .calendarrules import CalendarRules
@@ -89,7 +89,7 @@ class Calendars(ModelHandler):
             'number_rules': item.rules.count(),
             'number_access': item.calendaraccess_set.all().values('service_pool').distinct().count(),
             'number_actions': item.calendaraction_set.all().values('service_pool').distinct().count(),
-            'permission': permissions.getEffectivePermission(self._user, item),
+            'permission': self.getPermissions(item),
         }
 
     def getGui(self, type_: str) -> list[typing.Any]:
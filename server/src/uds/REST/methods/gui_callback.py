@@ -35,6 +35,7 @@ import typing
 import collections.abc
 
 from uds.core.ui import gui
+from uds.core.util import modfinder
 from uds.REST import Handler, RequestError, NotFound
 
 
@@ -52,6 +53,10 @@ class Callback(Handler):
         if len(self._args) != 1:
             raise RequestError('Invalid Request')
 
+        # Callbacks are registered when their module is imported, and modules are loaded on demand
+        if self._args[0] not in gui.callbacks:
+            modfinder.ensureModulesLoaded()
+
         if self._args[0] in gui.callbacks:
             return gui.callbacks[self._args[0]](self._params)
 
@@ -40,7 +40,7 @@ from django.utils.translation import gettext_lazy as _
 from uds.core import types
 from uds.core.consts.images import DEFAULT_THUMB_BASE64
 from uds.core.ui import gui
-from uds.core.util import ensure, permissions
+from uds.core.util import ensure
 from uds.core.util.model import processUuid
 from uds.core.util.state import State
 from uds.models import Image, MetaPool, ServicePoolGroup
@@ -149,7 +149,7 @@ class MetaPools(ModelHandler):
             'visible': item.visible,
             'policy': item.policy,
             'fallbackAccess': item.fallbackAccess,
-            'permission': permissions.getEffectivePermission(self._user, item),
+            'permission': self.getPermissions(item),
             'calendar_message': item.calendar_message,
             'transport_grouping': item.transport_grouping,
             'ha_policy': item.ha_policy,
@@ -40,7 +40,7 @@ from django.utils.translation import gettext_lazy as _
 from uds import models
 from uds.core import mfas, types
 from uds.core.environment import Environment
-from uds.core.util import ensure, permissions
+from uds.core.util import ensure
 from uds.REST.model import ModelHandler
 
 if typing.TYPE_CHECKING:
@@ -115,5 +115,5 @@ class MFA(ModelHandler):
             'comments': item.comments,
             'type': type_.getType(),
             'type_name': type_.name(),
-            'permission': permissions.getEffectivePermission(self._user, item),
+            'permission': self.getPermissions(item),
         }
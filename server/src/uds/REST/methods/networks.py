@@ -38,7 +38,7 @@ from django.utils.translation import gettext_lazy as _, gettext
 
 from uds.models import Network
 from uds.core import types
-from uds.core.util import permissions, ensure
+from uds.core.util import ensure
 
 from ..model import ModelHandler
 
@@ -111,5 +111,5 @@ class Networks(ModelHandler):
             'net_string': item.net_string,
             'transports_count': item.transports.count(),
             'authenticators_count': item.authenticators.count(),
-            'permission': permissions.getEffectivePermission(self._user, item),
+            'permission': self.getPermissions(item),
         }
@@ -41,7 +41,7 @@ from traitlets import default
 from uds.core import messaging, types
 from uds.core.environment import Environment
 from uds.core.ui import gui
-from uds.core.util import ensure, permissions
+from uds.core.util import ensure
 from uds.models import LogLevel, Notifier
 from uds.REST.model import ModelHandler
 
@@ -124,5 +124,5 @@ class Notifiers(ModelHandler):
             'comments': item.comments,
             'type': type_.getType(),
             'type_name': type_.name(),
-            'permission': permissions.getEffectivePermission(self._user, item),
+            'permission': self.getPermissions(item),
         }
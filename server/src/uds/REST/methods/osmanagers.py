@@ -38,7 +38,7 @@ from django.utils.translation import gettext, gettext_lazy as _
 
 from uds.core import osmanagers
 from uds.core.environment import Environment
-from uds.core.util import permissions, ensure
+from uds.core.util import ensure
 from uds.models import OSManager
 from uds.REST import NotFound, RequestError
 from uds.REST.model import ModelHandler
@@ -75,7 +75,7 @@ class OsManagers(ModelHandler):
             'type_name': type_.name(),
             'servicesTypes': [type_.servicesType],  # A list for backward compatibility. TODO: To be removed when admin interface is changed
             'comments': osm.comments,
-            'permission': permissions.getEffectivePermission(self._user, osm),
+            'permission': self.getPermissions(osm),
         }
 
     def item_as_dict(self, item: 'Model') -> dict[str, typing.Any]:
@@ -40,7 +40,7 @@ from django.utils.translation import gettext_lazy as _
 import uds.core.types.permissions
 from uds.core import services
 from uds.core.environment import Environment
-from uds.core.util import ensure, permissions
+from uds.core.util import ensure
 from uds.core.util.state import State
 from uds.models import Provider, Service, UserService
 from uds.REST import NotFound, RequestError
@@ -109,7 +109,7 @@ class Providers(ModelHandler):
             'type': type_.getType(),
             'type_name': type_.name(),
             'comments': item.comments,
-            'permission': permissions.getEffectivePermission(self._user, item),
+            'permission': self.getPermissions(item),
         }
 
     def checkDelete(self, item: 'Model') -> None:
@@ -133,9 +133,11 @@ class Providers(ModelHandler):
         """
         Custom method that returns "all existing services", no mater who's his daddy :)
         """
-        for s in Service.objects.all():
+        services = list(Service.objects.all())
+        self.preloadPermissions(services)
+        for s in services:
             try:
-                perm = permissions.getEffectivePermission(self._user, s)
+                perm = self.getPermissions(s)
                 if perm >= uds.core.types.permissions.PermissionType.READ:
                     yield DetailServices.serviceToDict(s, perm, True)
             except Exception:
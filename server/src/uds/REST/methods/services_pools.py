@@ -43,7 +43,7 @@ from uds.core import consts, types
 from uds.core.managers.user_service import UserServiceManager
 from uds.core.ui import gui
 from uds.core.consts.images import DEFAULT_THUMB_BASE64
-from uds.core.util import log, permissions, ensure
+from uds.core.util import log, ensure
 from uds.core.util.config import GlobalConfig
 from uds.core.util.model import getSqlDatetime, processUuid
 from uds.core.util.state import State
@@ -113,6 +113,8 @@ class ServicesPools(ModelHandler):
 
     remove_fields = ['osmanager_id', 'service_id']
 
+    db_filter_fields = ('name', 'short_name', 'comments')
+
     table_title = typing.cast(str, _('Service Pools'))
     table_fields = [
         {'name': {'title': _('Name')}},
@@ -264,7 +266,7 @@ class ServicesPools(ModelHandler):
             val['user_services_in_preparation'] = preparing_count
             val['tags'] = [tag.tag for tag in item.tags.all()]
             val['restrained'] = restrained
-            val['permission'] = permissions.getEffectivePermission(self._user, item)
+            val['permission'] = self.getPermissions(item)
             val['info'] = Services.serviceInfo(item.service)  # type: ignore
             val['pool_group_id'] = poolGroupId
             val['pool_group_name'] = poolGroupName
@@ -40,7 +40,7 @@ from django.utils.translation import gettext_lazy as _
 
 from uds.core import consts, transports, types, ui
 from uds.core.environment import Environment
-from uds.core.util import ensure, permissions
+from uds.core.util import ensure
 from uds.models import Network, ServicePool, Transport
 from uds.REST.model import ModelHandler
 
@@ -167,7 +167,7 @@ class Transports(ModelHandler):
             'type': type_.getType(),
             'type_name': type_.name(),
             'protocol': type_.protocol,
-            'permission': permissions.getEffectivePermission(self._user, item),
+            'permission': self.getPermissions(item),
         }
 
     def beforeSave(self, fields: dict[str, typing.Any]) -> None:
@@ -38,7 +38,7 @@ from django.utils.translation import gettext_lazy as _
 
 import uds.core.types.permissions
 from uds.core import types, consts, ui
-from uds.core.util import permissions, validators, ensure
+from uds.core.util import validators, ensure
 from uds.core.util.model import processUuid
 from uds import models
 from uds.REST.model import DetailHandler, ModelHandler
@@ -200,7 +200,7 @@ class Tunnels(ModelHandler):
             'tags': [tag.tag for tag in item.tags.all()],
             'transports_count': item.transports.count(),
             'servers_count': item.servers.count(),
-            'permission': permissions.getEffectivePermission(self._user, item),
+            'permission': self.getPermissions(item),
         }
 
     def beforeSave(self, fields: dict[str, typing.Any]) -> None:
@@ -237,13 +237,13 @@ class Tunnels(ModelHandler):
         :param item:
         """
         allServers = set(parent.servers.all())
+        tunnels = list(models.Server.objects.filter(type=types.servers.ServerType.TUNNEL))
+        self.preloadPermissions(tunnels)
         return [
             {
                 'id': i.uuid,
                 'name': i.hostname,
             }
-            for i in models.Server.objects.filter(type=types.servers.ServerType.TUNNEL)
-            if permissions.getEffectivePermission(self._user, i)
-            >= uds.core.types.permissions.PermissionType.READ
-            and i not in allServers
+            for i in tunnels
+            if self.getPermissions(i) >= uds.core.types.permissions.PermissionType.READ and i not in allServers
         ]
@@ -33,12 +33,14 @@
 
 import fnmatch
 import inspect
+import itertools
 import logging
 import re
 import typing
 import collections.abc
 from types import GeneratorType
 
+from django.core.exceptions import FieldDoesNotExist
 from django.db import IntegrityError, models
 from django.utils.translation import gettext as _
 
@@ -46,7 +48,7 @@ from uds.core import consts
 from uds.core import exceptions as udsExceptions
 from uds.core import types
 from uds.core.module import Module
-from uds.core.util import log, permissions
+from uds.core.util import log, objtype, permissions
 from uds.core.util.model import processUuid
 from uds.models import ManagedObjectModel, Network, Tag, TaggingMixin
 from uds.REST.utils import rest_result
@@ -56,7 +58,7 @@ from .handlers import Handler
 
 # Not imported at runtime, just for type checking
 if typing.TYPE_CHECKING:
-    from uds.models import User
+    from uds.models import Group, User
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +69,11 @@ TABLEINFO: typing.Final[str] = 'tableinfo'
 GUI: typing.Final[str] = 'gui'
 LOG: typing.Final[str] = 'log'
 
+# Paging related
+PAGING_PARAMS: typing.Final[tuple[str, ...]] = ('offset', 'limit', 'cursor')
+NEXT_CURSOR_HEADER: typing.Final[str] = 'UDS-Next-Cursor'
+ITEMS_CHUNK_SIZE: typing.Final[int] = 512  # Items processed together on listings (db fetch on paged ones, permissions)
+
 FieldType = collections.abc.Mapping[str, typing.Any]
 
 
@@ -76,6 +83,10 @@ class BaseModelHandler(Handler):
     Base Handler for Master & Detail Handlers
     """
 
+    # Permissions memo (indexed by object type and pk) and user groups, for current request
+    _permissions: typing.Optional[dict[tuple[int, int], 'types.permissions.PermissionType']] = None
+    _groups: typing.Optional[list['Group']] = None
+
     def addField(
         self, gui: list[typing.Any], field: typing.Union[FieldType, list[FieldType]]
     ) -> list[typing.Any]:
@@ -263,11 +274,34 @@ class BaseModelHandler(Handler):
         permission: 'types.permissions.PermissionType',
         root: bool = False,
     ) -> None:
-        if not permissions.hasAccess(self._user, obj, permission, root):
+        if not self.getPermissions(obj, root).includes(permission):
             raise self.accessDenied()
 
-    def getPermissions(self, obj: models.Model, root: bool = False) -> int:
-        return permissions.getEffectivePermission(self._user, obj, root)
+    def getPermissions(self, obj: models.Model, root: bool = False) -> 'types.permissions.PermissionType':
+        """
+        Returns the effective permission of current user over obj
+        Permissions over objects are memoized for the whole request
+        """
+        try:
+            key: typing.Optional[tuple[int, int]] = (objtype.ObjectType.from_model(obj).type, obj.pk)
+        except ValueError:  # Not an object type with permissions
+            key = None
+        if root or key is None:
+            return permissions.getEffectivePermission(self._user, obj, root)
+        if self._permissions is None or key not in self._permissions:
+            self.preloadPermissions([obj])
+        return typing.cast(dict, self._permissions)[key]
+
+    def preloadPermissions(self, objs: collections.abc.Iterable[models.Model]) -> None:
+        """
+        Resolves, with a single query, the permissions of current user over objs, and
+        memoizes them for the rest of the request (so getPermissions will not hit the db for them)
+        """
+        if self._permissions is None:
+            self._permissions = {}
+        if self._groups is None:
+            self._groups = list(self._user.groups.all()) if not self._user.is_admin else []
+        self._permissions.update(permissions.getEffectivePermissions(self._user, objs, groups=self._groups))
 
     def typeInfo(
         self, type_: type['Module']  # pylint: disable=unused-argument
@@ -713,9 +747,15 @@ class ModelHandler(BaseModelHandler):
     model_filter: 'typing.ClassVar[typing.Optional[collections.abc.Mapping[str, typing.Any]]]' = None
     # Same, but for exclude
     model_exclude: 'typing.ClassVar[typing.Optional[collections.abc.Mapping[str, typing.Any]]]' = None
+    # Fields rendered as stored on their model column, so filters on them can be pushed into the query (see filterQuery)
+    db_filter_fields: typing.ClassVar[collections.abc.Collection[str]] = ()
 
     # By default, filter is empty
     fltr: typing.Optional[str] = None
+    # By default, no paging (whole listing is returned)
+    paging: typing.Optional[types.rest.Paging] = None
+    # pk of last item returned by getItems, used as cursor for next page
+    _last_pk: typing.Optional[int] = None
 
     # This is an array of tuples of two items, where first is method and second inticates if method needs parent id (normal behavior is it needs it)
     # For example ('services', True) -- > .../id_parent/services
@@ -825,19 +865,37 @@ class ModelHandler(BaseModelHandler):
             del self._params['filter']  # Remove parameter
             logger.debug('Found a filter expression (%s)', self.fltr)
 
-    def doFilter(self, data: typing.Any) -> typing.Any:
-        # Right now, filtering only supports a single filter, in a future
-        # we may improve it
-        if self.fltr is None:
-            return data
+    def extractPaging(self) -> None:
+        # Extract paging from params if present
+        # Paging is only used on listings, and only if requested (so clients not using it receives the whole list)
+        self.paging = None
+        if not self.isListing() or not any(p in self._params for p in PAGING_PARAMS):
+            return
+        try:
+            cursor = self._params.pop('cursor', None)
+            self.paging = types.rest.Paging(
+                offset=int(self._params.pop('offset', 0)),
+                limit=int(self._params.pop('limit', 0)),
+                cursor=int(cursor) if cursor is not None else None,
+            )
+        except (TypeError, ValueError) as e:
+            raise exceptions.RequestError('Invalid paging parameters') from e
+        if self.paging.offset < 0 or self.paging.limit < 0:
+            raise exceptions.RequestError('Invalid paging parameters')
+        logger.debug('Found paging (%s)', self.paging)
 
-        # Filtering a non iterable (list or tuple)
-        if not isinstance(data, (list, tuple, GeneratorType)):
-            return data
+    def isListing(self) -> bool:
+        """
+        Returns True if the request is for a listing of items (full or overview)
+        """
+        return len(self._args) == 0 or (len(self._args) == 1 and self._args[0] == OVERVIEW)
 
-        logger.debug('data: %s, fltr: %s', data, self.fltr)
+    def filterFunction(self) -> collections.abc.Callable[[collections.abc.Mapping[str, typing.Any]], bool]:
+        """
+        Returns a function that checks if an item (as dict) matches current filter
+        """
         try:
-            fld, pattern = self.fltr.split('=')
+            fld, pattern = typing.cast(str, self.fltr).split('=')
             s, e = '', ''
             if pattern[0] == '^':
                 pattern = pattern[1:]
@@ -847,24 +905,73 @@ class ModelHandler(BaseModelHandler):
                 e = '$'
 
             r = re.compile(s + fnmatch.translate(pattern) + e, re.RegexFlag.IGNORECASE)
-
-            def fltr_function(item: collections.abc.MutableMapping[str, typing.Any]):
-                try:
-                    if fld not in item or r.match(item[fld]) is None:
-                        return False
-                except Exception:
-                    return False
-                return True
-
-            res = list(filter(fltr_function, data))
-
-            logger.debug('After filtering: %s', res)
-            return res
         except Exception as e:
             logger.exception('Exception:')
             logger.info('Filtering expression %s is invalid!', self.fltr)
             raise exceptions.RequestError(f'Filtering expression {self.fltr} is invalid') from e
 
+        def fltr_function(item: collections.abc.Mapping[str, typing.Any]) -> bool:
+            try:
+                if fld not in item or r.match(item[fld]) is None:
+                    return False
+            except Exception:
+                return False
+            return True
+
+        return fltr_function
+
+    def filterQuery(self, query: 'models.QuerySet') -> 'models.QuerySet':
+        """
+        Pushes current filter (if any) into the query, so non matching items are not even loaded
+        Only char/text fields of the model listed on db_filter_fields are pushed, and wildcards are translated
+        to an equal or wider condition, so items must still be checked against filterFunction afterwards
+        """
+        if self.fltr is None or self.fltr.count('=') != 1:
+            return query  # Invalid filters are reported when filtering items
+
+        fld, pattern = self.fltr.split('=')
+        if fld not in self.db_filter_fields:
+            return query
+        pattern = pattern.removeprefix('^').removesuffix('$')
+        try:
+            field = query.model._meta.get_field(fld)
+        except FieldDoesNotExist:
+            return query
+
+        if not isinstance(field, (models.CharField, models.TextField)) or '[' in pattern:
+            return query
+
+        parts = re.split(r'[*?]+', pattern)
+        if len(parts) == 1:  # No wildcards
+            return query.filter(**{f'{fld}__iexact': pattern})
+
+        q = models.Q()
+        if parts[0]:
+            q &= models.Q(**{f'{fld}__istartswith': parts[0]})
+        if parts[-1]:
+            q &= models.Q(**{f'{fld}__iendswith': parts[-1]})
+        for part in parts[1:-1]:
+            if part:
+                q &= models.Q(**{f'{fld}__icontains': part})
+        return query.filter(q)
+
+    def doFilter(self, data: typing.Any) -> typing.Any:
+        # Right now, filtering only supports a single filter, in a future
+        # we may improve it
+        if self.fltr is None:
+            return data
+
+        # Filtering a non iterable (list or tuple)
+        # Note that items streams are already filtered by getItems
+        if not isinstance(data, (list, tuple, GeneratorType)):
+            return data
+
+        logger.debug('data: %s, fltr: %s', data, self.fltr)
+        res = list(filter(self.filterFunction(), data))
+
+        logger.debug('After filtering: %s', res)
+        return res
+
     # Helper to process detail
     # Details can be managed (writen) by any user that has MANAGEMENT permission over parent
     def processDetail(self) -> typing.Any:
@@ -878,7 +985,7 @@ class ModelHandler(BaseModelHandler):
             else:
                 requiredPermission = types.permissions.PermissionType.READ
 
-            if permissions.hasAccess(self._user, item, requiredPermission) is False:
+            if not self.getPermissions(item).includes(requiredPermission):
                 logger.debug(
                     'Permission for user %s does not comply with %s',
                     self._user,
@@ -908,6 +1015,11 @@ class ModelHandler(BaseModelHandler):
             raise self.invalidRequestException() from e
 
     def getItems(self, *args, **kwargs) -> typing.Generator[collections.abc.MutableMapping[str, typing.Any], None, None]:
+        """
+        Returns a generator of the items (as dicts) of the listing.
+        Query is built (and filter validated) right now, so errors are raised by this call and
+        not while iterating the result
+        """
         if 'overview' in kwargs:
             overview = kwargs['overview']
             del kwargs['overview']
@@ -935,42 +1047,96 @@ class ModelHandler(BaseModelHandler):
         if self.model_exclude is not None:
             query = query.exclude(**self.model_exclude)
 
-        for item in query:
-            try:
-                if (
-                    permissions.hasAccess(
-                        typing.cast('User', self._user),
-                        item,
-                        types.permissions.PermissionType.READ,
-                    )
-                    is False
-                ):
-                    continue
-                if overview:
-                    yield self.item_as_dict_overview(item)
-                else:
-                    res = self.item_as_dict(item)
-                    self.fillIntanceFields(item, res)
+        # Filter is validated now, so an invalid one is reported before any item is returned
+        matches = self.filterFunction() if self.fltr is not None else None
+        query = self.filterQuery(query)
+
+        # On paged listings, filtering and offset are processed here, so pages are built
+        # without loading the whole list. Non paged ones are filtered afterwards by doFilter
+        skip = 0
+        if self.paging is None:
+            matches = None  # doFilter will do it
+        else:
+            query = query.order_by('pk')
+            if self.paging.cursor is not None:
+                query = query.filter(pk__gt=self.paging.cursor)
+            skip = self.paging.offset
+            # If no item will be discarded after query (filter or permissions), offset can be done on db
+            if skip and matches is None and typing.cast('User', self._user).is_admin:
+                query = query[skip:]
+                skip = 0
+            query = query.iterator(chunk_size=ITEMS_CHUNK_SIZE)
+
+        return self.__items(query, overview, matches, skip)
+
+    def __items(
+        self,
+        query: collections.abc.Iterable[typing.Any],
+        overview: bool,
+        matches: typing.Optional[collections.abc.Callable[[collections.abc.Mapping[str, typing.Any]], bool]],
+        skip: int,
+    ) -> typing.Generator[collections.abc.MutableMapping[str, typing.Any], None, None]:
+        # Items are processed in chunks, so permissions of every chunk are resolved with a single query
+        items = iter(query)
+        for chunk in iter(lambda: list(itertools.islice(items, ITEMS_CHUNK_SIZE)), []):
+            self.preloadPermissions(chunk)
+            for item in chunk:
+                try:
+                    if not self.getPermissions(item).includes(types.permissions.PermissionType.READ):
+                        continue
+                    if overview:
+                        res = self.item_as_dict_overview(item)
+                    else:
+                        res = self.item_as_dict(item)
+                        self.fillIntanceFields(item, res)
+                    if matches is not None and not matches(res):
+                        continue
+                    if skip:
+                        skip -= 1
+                        continue
+                    self._last_pk = item.pk
                     yield res
-            except Exception as e:  # maybe an exception is thrown to skip an item
-                logger.debug('Got exception processing item from model: %s', e)
-                # logger.exception('Exception getting item from {0}'.format(self.model))
+                except Exception as e:  # maybe an exception is thrown to skip an item
+                    logger.debug('Got exception processing item from model: %s', e)
+                    # logger.exception('Exception getting item from {0}'.format(self.model))
 
     def get(self) -> typing.Any:
         """
         Wraps real get method so we can process filters if they exists
         """
-        # Extract filter from params if present
+        # Extract filter and paging from params if present
         self.extractFilter()
+        self.extractPaging()
         return self.doFilter(self.doGet())
 
+    def listItems(self, overview: bool = True) -> typing.Any:
+        """
+        Returns the listing of items
+        If no paging is requested, the whole list is returned (as always)
+        If paging is requested, the page is returned as an items stream, so it is rendered item by item,
+        and UDS-Next-Cursor header is added if there can be more items
+        """
+        items = self.getItems(overview=overview)
+        if self.paging is None:
+            return list(items)
+
+        if self.paging.limit == 0:  # No limit, stream all items
+            # First item is read now, so database errors are reported before the response is started
+            first = list(itertools.islice(items, 1))
+            return types.rest.ItemsStream(itertools.chain(first, items))
+
+        page = list(itertools.islice(items, self.paging.limit))
+        if len(page) == self.paging.limit and self._last_pk is not None:
+            self.addHeader(NEXT_CURSOR_HEADER, str(self._last_pk))
+        return types.rest.ItemsStream(page)
+
     #  pylint: disable=too-many-return-statements
     def doGet(self) -> typing.Any:
         logger.debug('method GET for %s, %s', self.__class__.__name__, self._args)
         nArgs = len(self._args)
 
         if nArgs == 0:
-            return list(self.getItems(overview=False))
+            return self.listItems(overview=False)
 
         # if has custom methods, look for if this request matches any of them
         for cm in self.custom_methods:
@@ -1003,7 +1169,7 @@ class ModelHandler(BaseModelHandler):
 
         if nArgs == 1:
             if self._args[0] == OVERVIEW:
-                return list(self.getItems())
+                return self.listItems()
             if self._args[0] == TYPES:
                 return list(self.getTypes())
             if self._args[0] == TABLEINFO:
@@ -39,9 +39,10 @@ import types
 import typing
 import collections.abc
 
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 
 from uds.core import consts
+from uds.core.types.rest import ItemsStream
 
 # from xml_marshaller import xml_marshaller
 
@@ -51,6 +52,10 @@ if typing.TYPE_CHECKING:
     from django.http import HttpRequest
 
 
+# Size (aprox) of the chunks sent on streamed responses
+STREAM_CHUNK_SIZE: typing.Final[int] = 64 * 1024
+
+
 class ParametersException(Exception):
     pass
 
@@ -88,7 +93,12 @@ class ContentProcessor:
         """
         Converts an obj to a response of specific type (json, XML, ...)
         This is done using "render" method of specific type
+        Items streams are sent as a StreamingHttpResponse, rendered using "renderStream"
         """
+        if isinstance(obj, ItemsStream):
+            return StreamingHttpResponse(
+                streaming_content=self.renderStream(obj), content_type=self.mime_type + "; charset=utf-8"
+            )
         return HttpResponse(content=self.render(obj), content_type=self.mime_type + "; charset=utf-8")
 
     def render(self, obj: typing.Any):
@@ -97,6 +107,13 @@ class ContentProcessor:
         """
         return str(obj)
 
+    def renderStream(self, obj: ItemsStream) -> collections.abc.Iterator[str]:
+        """
+        Renders an items stream to the specific type, chunk by chunk
+        Default implementation renders the whole list at once, override it if the type allows incremental rendering
+        """
+        yield self.render(list(obj))
+
     @staticmethod
     def procesForRender(obj: typing.Any):
         """
@@ -164,6 +181,23 @@ class JsonProcessor(MarshallerProcessor):
     extensions = ['json']
     marshaller = json  # type: ignore
 
+    def renderStream(self, obj: ItemsStream) -> collections.abc.Iterator[str]:
+        # Encodes item by item, so the whole list is never kept in memory (neither the items nor the rendered json)
+        # Items are grouped in chunks of about STREAM_CHUNK_SIZE bytes, to avoid too many small writes
+        chunk: list[str] = ['[']
+        size = 0
+        separator = ''
+        for item in obj:
+            encoded = separator + json.dumps(ContentProcessor.procesForRender(item))
+            separator = ','
+            chunk.append(encoded)
+            size += len(encoded)
+            if size >= STREAM_CHUNK_SIZE:
+                yield ''.join(chunk)
+                chunk, size = [], 0
+        chunk.append(']')
+        yield ''.join(chunk)
+
 
 # ---------------
 # XML Processor
@@ -43,6 +43,7 @@ from uds.core import auths, exceptions, types, consts
 from uds.core.auths.auth import authLogLogin
 from uds.core.ui import gui
 from uds.core.util import ldaputil, auth as auth_utils
+from uds.core.util.hash import hash_key
 
 try:
     # pylint: disable=no-name-in-module
@@ -211,7 +212,6 @@ class RegexLdap(auths.Authenticator):
     # Label for password field
     passwordLabel = _("Password")
 
-    _connection: typing.Any = None
     _host: str = ''
     _port: str = ''
     _ssl: bool = False
@@ -374,24 +374,25 @@ class RegexLdap(auths.Authenticator):
             ) = vals[11:]
             self._verifySsl = gui.toBool(verifySsl)
 
-    def __connection(self) -> typing.Any:
+    def __connection(self) -> typing.ContextManager[typing.Any]:
         """
-        Tries to connect to ldap. If username is None, it tries to connect using user provided credentials.
-        @return: Connection established
+        Borrows a connection, bound with the configured credentials, from the pool of this authenticator.
+        @return: Context manager with the connection
         @raise exception: If connection could not be established
         """
-        if self._connection is None:  # If connection is not established, try to connect
-            self._connection = ldaputil.connection(
-                self._username,
-                self._password,
-                self._host,
-                port=int(self._port),
-                ssl=self._ssl,
-                timeout=int(self._timeout),
-                debug=False,
-            )
+        return ldaputil.ConnectionPool.get(
+            self._username,
+            self._password,
+            self._host,
+            port=int(self._port),
+            ssl=self._ssl,
+            timeout=int(self._timeout),
+            owner=self.env.key,
+        ).connection()
 
-        return self._connection
+    def __cacheOwner(self) -> str:
+        # Entries are cached per configuration, so any change on it discards them
+        return 'ldap' + hash_key(self.marshal())
 
     def __connectAs(self, username: str, password: str) -> typing.Any:
         return ldaputil.connection(
@@ -410,7 +411,11 @@ class RegexLdap(auths.Authenticator):
         @param username: username to search, using user provided parameters at configuration to map search entries.
         @return: None if username is not found, an dictionary of LDAP entry attributes if found.
         @note: Active directory users contains the groups it belongs to in "memberOf" attribute
+        @note: Found entries are cached for a short time
         """
+        return ldaputil.cached(self.__cacheOwner(), 'user' + username, lambda: self.__searchUser(username))
+
+    def __searchUser(self, username: str) -> typing.Optional[ldaputil.LDAPResultType]:
         attributes = (
             [self._userIdAttr]
             + self.__getAttrsFromField(self._userNameAttr)
@@ -419,48 +424,49 @@ class RegexLdap(auths.Authenticator):
         if self._mfaAttr:
             attributes = attributes + self.__getAttrsFromField(self._mfaAttr)
 
-        user = ldaputil.getFirst(
-            con=self.__connection(),
-            base=self._ldapBase,
-            objectClass=self._userClass,
-            field=self._userIdAttr,
-            value=username,
-            attributes=attributes,
-            sizeLimit=LDAP_RESULT_LIMIT,
-        )
-
-        # If user attributes is split, that is, it has more than one "ldap entry", get a second entry filtering by a new attribute
-        # and add result attributes to "main" search.
-        # For example, you can have authentication in an "user" object class and attributes in an "user_attributes" object class.
-        # Note: This is very rare situation, but it ocurrs :)
-        if user and self._altClass:
-            for usr in ldaputil.getAsDict(
-                con=self.__connection(),
+        with self.__connection() as con:
+            user = ldaputil.getFirst(
+                con=con,
                 base=self._ldapBase,
-                ldapFilter=f'(&(objectClass={self._altClass})({self._userIdAttr}={ldaputil.escape(username)}))',
-                attrList=attributes,
+                objectClass=self._userClass,
+                field=self._userIdAttr,
+                value=username,
+                attributes=attributes,
                 sizeLimit=LDAP_RESULT_LIMIT,
-            ):
-                for attr in self.__getAttrsFromField(self._groupNameAttr):
-                    v = usr.get(attr)
-                    if not v:
-                        continue
-                    kl = attr.lower()
-                    # If already exists the field, check if it is a list to add new elements...
-                    if kl in usr:
-                        # Convert existing to list, so we can add a new value
-                        if not isinstance(user[kl], (list, tuple)):
-                            user[kl] = [user[kl]]
-
-                        # Convert values to list, if not list
-                        if not isinstance(v, (list, tuple)):
-                            v = [v]
-
-                        # Now append to existing values
-                        for x in v:
-                            user[kl].append(x)
-                    else:
-                        user[kl] = v
+            )
+
+            # If user attributes is split, that is, it has more than one "ldap entry", get a second entry filtering by a new attribute
+            # and add result attributes to "main" search.
+            # For example, you can have authentication in an "user" object class and attributes in an "user_attributes" object class.
+            # Note: This is very rare situation, but it ocurrs :)
+            if user and self._altClass:
+                for usr in ldaputil.getAsDict(
+                    con=con,
+                    base=self._ldapBase,
+                    ldapFilter=f'(&(objectClass={self._altClass})({self._userIdAttr}={ldaputil.escape(username)}))',
+                    attrList=attributes,
+                    sizeLimit=LDAP_RESULT_LIMIT,
+                ):
+                    for attr in self.__getAttrsFromField(self._groupNameAttr):
+                        v = usr.get(attr)
+                        if not v:
+                            continue
+                        kl = attr.lower()
+                        # If already exists the field, check if it is a list to add new elements...
+                        if kl in usr:
+                            # Convert existing to list, so we can add a new value
+                            if not isinstance(user[kl], (list, tuple)):
+                                user[kl] = [user[kl]]
+
+                            # Convert values to list, if not list
+                            if not isinstance(v, (list, tuple)):
+                                v = [v]
+
+                            # Now append to existing values
+                            for x in v:
+                                user[kl].append(x)
+                        else:
+                            user[kl] = v
 
         return user
 
@@ -499,10 +505,12 @@ class RegexLdap(auths.Authenticator):
 
             try:
                 # Let's see first if it credentials are fine
-                self.__connectAs(usr['dn'], credentials)  # Will raise an exception if it can't connect
+                con = self.__connectAs(usr['dn'], credentials)  # Will raise an exception if it can't connect
             except Exception:
                 authLogLogin(request, self.dbObj(), username, 'Invalid password')
                 return types.auth.FAILED_AUTH
+            # Only needed to check the credentials, searches are done with pooled connections
+            ldaputil.disconnect(con)
 
             # store the user mfa attribute if it is set
             if self._mfaAttr:
@@ -567,20 +575,21 @@ class RegexLdap(auths.Authenticator):
     def searchUsers(self, pattern: str) -> collections.abc.Iterable[dict[str, str]]:
         try:
             res = []
-            for r in ldaputil.getAsDict(
-                con=self.__connection(),
-                base=self._ldapBase,
-                ldapFilter=f'(&(&(objectClass={self._userClass})({self._userIdAttr}={ldaputil.escape(pattern)}*)))',
-                attrList=None,  # All attrs
-                sizeLimit=LDAP_RESULT_LIMIT,
-            ):
-                logger.debug('Result: %s', r)
-                res.append(
-                    {
-                        'id': r.get(self._userIdAttr.lower(), '')[0],
-                        'name': self.__getUserRealName(r),
-                    }
-                )
+            with self.__connection() as con:
+                for r in ldaputil.getAsDict(
+                    con=con,
+                    base=self._ldapBase,
+                    ldapFilter=f'(&(&(objectClass={self._userClass})({self._userIdAttr}={ldaputil.escape(pattern)}*)))',
+                    attrList=None,  # All attrs
+                    sizeLimit=LDAP_RESULT_LIMIT,
+                ):
+                    logger.debug('Result: %s', r)
+                    res.append(
+                        {
+                            'id': r.get(self._userIdAttr.lower(), '')[0],
+                            'name': self.__getUserRealName(r),
+                        }
+                    )
             logger.debug(res)
             return res
         except Exception as e:
@@ -598,7 +607,8 @@ class RegexLdap(auths.Authenticator):
 
     def testConnection(self):
         try:
-            con = self.__connection()
+            # A fresh connection, so the configured credentials are really checked
+            con = self.__connectAs(self._username, self._password)
         except Exception as e:
             return [False, str(e)]
 
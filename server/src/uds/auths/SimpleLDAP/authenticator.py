@@ -41,6 +41,7 @@ from uds.core import auths, types, consts, exceptions
 from uds.core.auths.auth import authLogLogin
 from uds.core.ui import gui
 from uds.core.util import ldaputil
+from uds.core.util.hash import hash_key
 
 # Not imported at runtime, just for type checking
 if typing.TYPE_CHECKING:
@@ -204,7 +205,6 @@ class SimpleLDAPAuthenticator(auths.Authenticator):
     # Label for password field
     passwordLabel = _("Password")
 
-    _connection: typing.Any = None
     _host: str = ''
     _port: str = ''
     _ssl: bool = False
@@ -318,26 +318,27 @@ class SimpleLDAPAuthenticator(auths.Authenticator):
     def mfaIdentifier(self, username: str) -> str:
         return self.storage.getPickle(self.mfaStorageKey(username)) or ''
 
-    def __connection(self):
+    def __connection(self) -> typing.ContextManager[typing.Any]:
         """
-        Tries to connect to ldap. If username is None, it tries to connect using user provided credentials.
-        @return: Connection established
+        Borrows a connection, bound with the configured credentials, from the pool of this authenticator.
+        @return: Context manager with the connection
         @raise exception: If connection could not be established
         """
-        if self._connection is None:  # We are not connected
-            self._connection = ldaputil.connection(
-                self._username,
-                self._password,
-                self._host,
-                port=int(self._port),
-                ssl=self._ssl,
-                timeout=int(self._timeout),
-                debug=False,
-                verify_ssl=self._verifySsl,
-                certificate=self._certificate,
-            )
+        return ldaputil.ConnectionPool.get(
+            self._username,
+            self._password,
+            self._host,
+            port=int(self._port),
+            ssl=self._ssl,
+            timeout=int(self._timeout),
+            verify_ssl=self._verifySsl,
+            certificate=self._certificate,
+            owner=self.env.key,
+        ).connection()
 
-        return self._connection
+    def __cacheOwner(self) -> str:
+        # Entries are cached per configuration, so any change on it discards them
+        return 'ldap' + hash_key(self.marshal())
 
     def __connectAs(self, username: str, password: str) -> typing.Any:
         return ldaputil.connection(
@@ -358,20 +359,25 @@ class SimpleLDAPAuthenticator(auths.Authenticator):
         @param username: username to search, using user provided parameters at configuration to map search entries.
         @return: None if username is not found, an dictionary of LDAP entry attributes if found.
         @note: Active directory users contains the groups it belongs to in "memberOf" attribute
+        @note: Found entries are cached for a short time
         """
+        return ldaputil.cached(self.__cacheOwner(), 'user' + username, lambda: self.__searchUser(username))
+
+    def __searchUser(self, username: str) -> typing.Optional[ldaputil.LDAPResultType]:
         attributes = self._userNameAttr.split(',') + [self._userIdAttr]
         if self._mfaAttr:
             attributes = attributes + [self._mfaAttr]
 
-        return ldaputil.getFirst(
-            con=self.__connection(),
-            base=self._ldapBase,
-            objectClass=self._userClass,
-            field=self._userIdAttr,
-            value=username,
-            attributes=attributes,
-            sizeLimit=LDAP_RESULT_LIMIT,
-        )
+        with self.__connection() as con:
+            return ldaputil.getFirst(
+                con=con,
+                base=self._ldapBase,
+                objectClass=self._userClass,
+                field=self._userIdAttr,
+                value=username,
+                attributes=attributes,
+                sizeLimit=LDAP_RESULT_LIMIT,
+            )
 
     def __getGroup(self, groupName: str) -> typing.Optional[ldaputil.LDAPResultType]:
         """
@@ -379,23 +385,35 @@ class SimpleLDAPAuthenticator(auths.Authenticator):
         @param groupName: group name to search, using user provided parameters at configuration to map search entries.
         @return: None if group name is not found, an dictionary of LDAP entry attributes if found.
         """
-        return ldaputil.getFirst(
-            con=self.__connection(),
-            base=self._ldapBase,
-            objectClass=self._groupClass,
-            field=self._groupIdAttr,
-            value=groupName,
-            attributes=[self._memberAttr],
-            sizeLimit=LDAP_RESULT_LIMIT,
-        )
+        with self.__connection() as con:
+            return ldaputil.getFirst(
+                con=con,
+                base=self._ldapBase,
+                objectClass=self._groupClass,
+                field=self._groupIdAttr,
+                value=groupName,
+                attributes=[self._memberAttr],
+                sizeLimit=LDAP_RESULT_LIMIT,
+            )
 
-    def __getGroups(self, user: ldaputil.LDAPResultType):
+    def __getGroups(self, user: ldaputil.LDAPResultType) -> list[str]:
         try:
-            groups: list[str] = []
+            # Group membership is cached for a short time, as user entries
+            return (
+                ldaputil.cached(self.__cacheOwner(), 'groups' + user['dn'], lambda: self.__searchGroups(user))
+                or []
+            )
+        except Exception:
+            logger.exception('Exception at __getGroups')
+            return []
+
+    def __searchGroups(self, user: ldaputil.LDAPResultType) -> list[str]:
+        groups: list[str] = []
 
-            filter_ = f'(&(objectClass={self._groupClass})(|({self._memberAttr}={user["_id"]})({self._memberAttr}={user["dn"]})))'
+        filter_ = f'(&(objectClass={self._groupClass})(|({self._memberAttr}={user["_id"]})({self._memberAttr}={user["dn"]})))'
+        with self.__connection() as con:
             for d in ldaputil.getAsDict(
-                con=self.__connection(),
+                con=con,
                 base=self._ldapBase,
                 ldapFilter=filter_,
                 attrList=[self._groupIdAttr],
@@ -405,12 +423,8 @@ class SimpleLDAPAuthenticator(auths.Authenticator):
                     for k in d[self._groupIdAttr]:
                         groups.append(k)
 
-            logger.debug('Groups: %s', groups)
-            return groups
-
-        except Exception:
-            logger.exception('Exception at __getGroups')
-            return []
+        logger.debug('Groups: %s', groups)
+        return groups
 
     def __getUserRealName(self, usr: ldaputil.LDAPResultType) -> str:
         '''
@@ -452,10 +466,12 @@ class SimpleLDAPAuthenticator(auths.Authenticator):
 
             try:
                 # Let's see first if it credentials are fine
-                self.__connectAs(user['dn'], credentials)  # Will raise an exception if it can't connect
+                con = self.__connectAs(user['dn'], credentials)  # Will raise an exception if it can't connect
             except Exception:
                 authLogLogin(request, self.dbObj(), username, 'Invalid password')
                 return types.auth.FAILED_AUTH
+            # Only needed to check the credentials, searches are done with pooled connections
+            ldaputil.disconnect(con)
 
             # store the user mfa attribute if it is set
             if self._mfaAttr:
@@ -528,19 +544,20 @@ class SimpleLDAPAuthenticator(auths.Authenticator):
     def searchUsers(self, pattern: str) -> collections.abc.Iterable[dict[str, str]]:
         try:
             res = []
-            for r in ldaputil.getAsDict(
-                con=self.__connection(),
-                base=self._ldapBase,
-                ldapFilter=f'(&(objectClass={self._userClass})({self._userIdAttr}={pattern}*))',
-                attrList=[self._userIdAttr, self._userNameAttr],
-                sizeLimit=LDAP_RESULT_LIMIT,
-            ):
-                res.append(
-                    {
-                        'id': r[self._userIdAttr][0],  # Ignore @...
-                        'name': self.__getUserRealName(r),
-                    }
-                )
+            with self.__connection() as con:
+                for r in ldaputil.getAsDict(
+                    con=con,
+                    base=self._ldapBase,
+                    ldapFilter=f'(&(objectClass={self._userClass})({self._userIdAttr}={pattern}*))',
+                    attrList=[self._userIdAttr, self._userNameAttr],
+                    sizeLimit=LDAP_RESULT_LIMIT,
+                ):
+                    res.append(
+                        {
+                            'id': r[self._userIdAttr][0],  # Ignore @...
+                            'name': self.__getUserRealName(r),
+                        }
+                    )
 
             return res
         except Exception as e:
@@ -550,14 +567,15 @@ class SimpleLDAPAuthenticator(auths.Authenticator):
     def searchGroups(self, pattern: str) -> collections.abc.Iterable[dict[str, str]]:
         try:
             res = []
-            for r in ldaputil.getAsDict(
-                con=self.__connection(),
-                base=self._ldapBase,
-                ldapFilter=f'(&(objectClass={self._groupClass})({self._groupIdAttr}={pattern}*))',
-                attrList=[self._groupIdAttr, 'memberOf', 'description'],
-                sizeLimit=LDAP_RESULT_LIMIT,
-            ):
-                res.append({'id': r[self._groupIdAttr][0], 'name': r['description'][0]})
+            with self.__connection() as con:
+                for r in ldaputil.getAsDict(
+                    con=con,
+                    base=self._ldapBase,
+                    ldapFilter=f'(&(objectClass={self._groupClass})({self._groupIdAttr}={pattern}*))',
+                    attrList=[self._groupIdAttr, 'memberOf', 'description'],
+                    sizeLimit=LDAP_RESULT_LIMIT,
+                ):
+                    res.append({'id': r[self._groupIdAttr][0], 'name': r['description'][0]})
 
             return res
         except Exception as e:
@@ -577,7 +595,8 @@ class SimpleLDAPAuthenticator(auths.Authenticator):
         self,
     ) -> list[typing.Any]:  # pylint: disable=too-many-return-statements,too-many-branches
         try:
-            con = self.__connection()
+            # A fresh connection, so the configured credentials are really checked
+            con = self.__connectAs(self._username, self._password)
         except Exception as e:
             return [False, str(e)]
 
@@ -32,9 +32,12 @@ Author: Adolfo Gómez, dkmaster at dkmon dot com
 """
 import re
 import logging
+import threading
 import typing
 import collections.abc
+import uuid
 
+from uds.core.util.cache import Cache
 from uds.core.util.state import State
 from .group import Group
 
@@ -43,10 +46,14 @@ if typing.TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Detects regex backreferences, that can't be combined with other patterns
+_BACKREFERENCE_RE: typing.Final['re.Pattern[str]'] = re.compile(r'\\[1-9]|\(\?P=')
+
 
 class _LocalGrp(typing.NamedTuple):
     name: str
-    group: 'Group'
+    group_id: int
+    db_name: str  # As stored in db
     is_valid: bool = False
     is_pattern: bool = False
 
@@ -57,6 +64,125 @@ class _LocalGrp(typing.NamedTuple):
         return name.casefold() == self.name.casefold()
 
 
+class _MetaGrp(typing.NamedTuple):
+    group_id: int
+    meta_if_any: bool
+    active_ids: frozenset[int]  # Active groups of this meta group
+    count: int  # Number of groups of this meta group
+
+
+class _GroupsMatcher:
+    """
+    Groups of an authenticator, prepared for matching group names against them.
+
+    Exact names are on a dict, and patterns are also combined in just one regex, so
+    names that do not match any pattern are discarded with just one search.
+    """
+
+    groups: tuple[_LocalGrp, ...]
+    exact: dict[str, list[int]]
+    patterns: list[tuple[int, 're.Pattern[str]']]
+    combined: typing.Optional['re.Pattern[str]']  # If None, all patterns must be checked
+    unfiltered: list[tuple[int, 're.Pattern[str]']]  # Patterns that can't be combined
+    metaGroups: tuple[_MetaGrp, ...]
+
+    def __init__(self, dbAuthenticator: 'DBAuthenticator') -> None:
+        groups: list[_LocalGrp] = []
+        self.exact = {}
+        self.patterns = []
+        self.unfiltered = []
+        combinable: list[str] = []
+        for g in dbAuthenticator.groups.filter(state=State.ACTIVE, is_meta=False):
+            name = g.name.lower()
+            isPattern = name.find('pat:') == 0  # Is a pattern?
+            grp = _LocalGrp(name=name[4:] if isPattern else name, group_id=g.id, db_name=g.name, is_pattern=isPattern)
+            if isPattern:
+                try:
+                    pattern = re.compile(grp.name, re.IGNORECASE)
+                except Exception:
+                    logger.exception('Exception in RE')
+                    groups.append(grp)  # Kept, but will not match anything
+                    continue
+                if _BACKREFERENCE_RE.search(grp.name):
+                    self.unfiltered.append((len(groups), pattern))
+                else:
+                    self.patterns.append((len(groups), pattern))
+                    combinable.append(f'(?:{grp.name})')
+            else:
+                self.exact.setdefault(grp.name.casefold(), []).append(len(groups))
+            groups.append(grp)
+        self.groups = tuple(groups)
+
+        self.combined = None
+        if combinable:
+            try:
+                self.combined = re.compile('|'.join(combinable), re.IGNORECASE)
+            except Exception:  # i.e. global flags in the middle of combined regex, check patterns one by one
+                self.unfiltered.extend(self.patterns)
+                self.patterns = []
+
+        self.metaGroups = tuple(
+            _MetaGrp(
+                group_id=m.id,
+                meta_if_any=m.meta_if_any,
+                active_ids=frozenset(g.id for g in m.groups.all() if g.state == State.ACTIVE),
+                count=len(m.groups.all()),
+            )
+            for m in dbAuthenticator.groups.filter(is_meta=True).prefetch_related('groups')
+        )
+
+    def matching(self, groupName: str) -> typing.Generator[int, None, None]:
+        """
+        Returns the index of all groups matching the name
+        """
+        name = groupName.lower()
+        yield from self.exact.get(name.casefold(), ())
+        if self.patterns and self.combined is not None and self.combined.search(name) is not None:
+            for n, pattern in self.patterns:
+                if pattern.search(name) is not None:
+                    yield n
+        for n, pattern in self.unfiltered:
+            if pattern.search(name) is not None:
+                yield n
+
+
+class _Matchers:
+    """
+    Matchers of every authenticator, discarded when any of its groups changes.
+
+    Every change stores a new stamp for the authenticator on the shared cache, so the
+    matchers of any process are discarded (the stamp is read through the local cache,
+    so this is seen in a few seconds at most)
+    """
+
+    lock: typing.ClassVar[threading.Lock] = threading.Lock()
+    matchers: typing.ClassVar[dict[int, tuple[_GroupsMatcher, typing.Any]]] = {}
+    stamps: typing.ClassVar[Cache] = Cache('groupsMatchers', local=True)
+
+    @staticmethod
+    def get(dbAuthenticator: 'DBAuthenticator') -> _GroupsMatcher:
+        stamp = _Matchers.stamps.get(str(dbAuthenticator.id))
+        with _Matchers.lock:
+            cached = _Matchers.matchers.get(dbAuthenticator.id)
+        if cached and cached[1] == stamp:
+            return cached[0]
+
+        if stamp is None:  # Ensure there is an stamp, so "no stamp" is not requested to db again and again
+            stamp = _Matchers.changed(dbAuthenticator.id)
+        matcher = _GroupsMatcher(dbAuthenticator)
+        with _Matchers.lock:
+            _Matchers.matchers[dbAuthenticator.id] = (matcher, stamp)
+        return matcher
+
+    @staticmethod
+    def changed(authenticatorId: int) -> str:
+        stamp = uuid.uuid4().hex
+        _Matchers.stamps.put(str(authenticatorId), stamp, 3600 * 24)
+        with _Matchers.lock:
+            _Matchers.matchers.pop(authenticatorId, None)
+        return stamp
+
+
 class GroupsManager:
     """
     Manages registered groups for an specific authenticator.
@@ -78,6 +204,7 @@ class GroupsManager:
     """
 
     _groups: list[_LocalGrp]
+    _matcher: typing.Optional[_GroupsMatcher]
 
     def __init__(self, dbAuthenticator: 'DBAuthenticator'):
         """
@@ -88,37 +215,26 @@ class GroupsManager:
         self._dbAuthenticator = dbAuthenticator
         # We just get active groups, inactive aren't visible to this class
         self._groups = []
+        self._matcher = None
         if (
             dbAuthenticator.id
         ):  # If "fake" authenticator (that is, root user with no authenticator in fact)
-            for g in dbAuthenticator.groups.filter(state=State.ACTIVE, is_meta=False):
-                name = g.name.lower()
-                isPattern = name.find('pat:') == 0  # Is a pattern?
-                self._groups.append(
-                    _LocalGrp(
-                        name=name[4:] if isPattern else name,
-                        group=Group(g),
-                        is_pattern=isPattern,
-                    )
-                )
+            self._matcher = _Matchers.get(dbAuthenticator)
+            self._groups = list(self._matcher.groups)
+
+    @staticmethod
+    def invalidate(authenticatorId: int) -> None:
+        """
+        Discards the cached groups of an authenticator (on every process)
+        """
+        _Matchers.changed(authenticatorId)
 
     def _checkAllGroups(self, groupName: str) -> typing.Generator[int, None, None]:
         """
         Returns true if this groups manager contains the specified group name (string)
         """
-        name = groupName.lower()
-        for n, grp in enumerate(self._groups):
-            if grp.is_pattern:
-                logger.debug('Group is a pattern: %s', grp)
-                try:
-                    logger.debug('Match: %s->%s', grp.name, name)
-                    if re.search(grp.name, name, re.IGNORECASE) is not None:
-                        yield n
-                except Exception:
-                    logger.exception('Exception in RE')
-            else:
-                if grp.matches(name):  # If group name matches
-                    yield n
+        if self._matcher:
+            yield from self._matcher.matching(groupName)
 
     def getGroupsNames(self) -> typing.Generator[str, None, None]:
         """
@@ -126,36 +242,34 @@ class GroupsManager:
         as where inserted inside Database (most probably using administration interface)
         """
         for g in self._groups:
-            yield g.group.dbGroup().name
+            yield g.db_name
 
     def getValidGroups(self) -> typing.Generator['Group', None, None]:
         """
         returns the list of valid groups (:py:class:uds.core.auths.group.Group)
         """
-        from uds.models import (  # pylint: disable=import-outside-toplevel
-            Group as DBGroup,
-        )
-
-        valid_id_list: list[int] = []
-        for group in self._groups:
-            if group.is_valid:
-                valid_id_list.append(group.group.dbGroup().id)
-                yield group.group
+        valid_id_list: list[int] = [group.group_id for group in self._groups if group.is_valid]
+        valid_ids = set(valid_id_list)
 
         # Now, get metagroups and also return them
-        for db_group in DBGroup.objects.filter(
-            manager__id=self._dbAuthenticator.id, is_meta=True
-        ):  # @UndefinedVariable
-            gn = db_group.groups.filter(
-                id__in=valid_id_list, state=State.ACTIVE
-            ).count()
-            if db_group.meta_if_any and gn > 0:
-                gn = db_group.groups.count()
+        for meta in self._matcher.metaGroups if self._matcher else ():
+            gn = len(meta.active_ids & valid_ids)
+            if meta.meta_if_any and gn > 0:
+                gn = meta.count
             if (
-                gn == db_group.groups.count()
+                gn == meta.count
             ):  # If a meta group is empty, all users belongs to it. we can use gn != 0 to check that if it is empty, is not valid
                 # This group matches
-                yield Group(db_group)
+                valid_id_list.append(meta.group_id)
+
+        if not valid_id_list:
+            return
+
+        # All of them, groups and metagroups, are read at once
+        dbGroups = {g.id: g for g in self._dbAuthenticator.groups.filter(id__in=valid_id_list)}
+        for group_id in valid_id_list:
+            if group_id in dbGroups:
+                yield Group(dbGroups[group_id])
 
     def hasValidGroups(self) -> bool:
         """
@@ -171,7 +285,8 @@ class GroupsManager:
         """
         for group in self._groups:
             if group.matches(groupName):
-                return group.group
+                dbGroup = self._dbAuthenticator.groups.filter(id=group.group_id).first()
+                return Group(dbGroup) if dbGroup else None
 
         return None
 
@@ -60,6 +60,14 @@ USER_AGENT: typing.Final[str] = f'UDS/{VERSION}'
 COMMS_TIMEOUT: typing.Final[int] = 5  # Timeout for communications with servers
 MIN_SERVER_VERSION: typing.Final[str] = '4.0.0'
 FAILURE_TIMEOUT: typing.Final[int] = 60  # In case of failure, wait this time before retrying (where applicable)
+# Max number of idle (keep-alive) sessions kept for actors & servers communications
+COMMS_MAX_IDLE_SESSIONS: typing.Final[int] = int(getattr(settings, 'COMMS_MAX_IDLE_SESSIONS', 128))
+# Max number of idle connections, bound with the service credentials, kept per ldap server
+LDAP_MAX_IDLE_CONNECTIONS: typing.Final[int] = int(getattr(settings, 'LDAP_MAX_IDLE_CONNECTIONS', 8))
+# Seconds that users entries and groups read from ldap are kept on the in-process cache
+LDAP_CACHE_TIME: typing.Final[int] = int(getattr(settings, 'LDAP_CACHE_TIME', 60))
+# If True, modules (services, authenticators, transports, ...) are imported on first use instead of at startup
+LAZY_MODULES_LOADING: typing.Final[bool] = bool(getattr(settings, 'LAZY_MODULES_LOADING', True))
 
 # Default length for Gui Text Fields
 DEFAULT_TEXT_LENGTH: typing.Final[int] = 64
@@ -69,5 +77,12 @@ DEFAULT_CACHE_TIMEOUT: typing.Final[int] = 60 * 3  # 3 minutes
 LONG_CACHE_TIMEOUT: typing.Final[int] = DEFAULT_CACHE_TIMEOUT * 20  # 1 hour
 SMALL_CACHE_TIMEOUT: typing.Final[int] = DEFAULT_CACHE_TIMEOUT // 3  # 1 minute
 
+# In-process (L1) cache in front of the database cache
+CACHE_LOCAL_MAX_ITEMS: typing.Final[int] = int(getattr(settings, 'CACHE_LOCAL_MAX_ITEMS', 8192))
+# Max time an entry is kept locally, so changes from other processes are seen after this time at most
+CACHE_LOCAL_MAX_TTL: typing.Final[int] = int(getattr(settings, 'CACHE_LOCAL_MAX_TTL', 10))
+# Time a "not found" result is remembered locally
+CACHE_LOCAL_NEGATIVE_TTL: typing.Final[int] = int(getattr(settings, 'CACHE_LOCAL_NEGATIVE_TTL', 2))
+
 DEFAULT_REQUEST_TIMEOUT: typing.Final[int] = 20  # In seconds
 DEFAULT_CONNECT_TIMEOUT: typing.Final[int] = 4   # In seconds
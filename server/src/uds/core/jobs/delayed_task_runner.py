@@ -37,13 +37,15 @@ from datetime import timedelta
 import logging
 import typing
 import collections.abc
+from concurrent.futures import ThreadPoolExecutor
 
 from django.db import connections
-from django.db import transaction, OperationalError
-from django.db.models import Q
+from django.db import transaction, OperationalError, DatabaseError
+from django.db.models import Q, Min
 
 from uds.models import DelayedTask as DBDelayedTask
 from uds.core.util.model import getSqlDatetime
+from uds.core.util.config import GlobalConfig
 from uds.core.environment import Environment
 from uds.core.util import singleton
 
@@ -74,6 +76,16 @@ class DelayedTaskThread(threading.Thread):
             connections['default'].close()
 
 
+class DelayedTaskQueueInfo(typing.NamedTuple):
+    """
+    Delayed tasks queue metrics
+    """
+
+    total: int  # Tasks on queue
+    due: int  # Tasks that should already be running
+    lag: float  # Seconds the oldest due task has been waiting for execution
+
+
 class DelayedTaskRunner(metaclass=singleton.Singleton):
     """
     Delayed task runner class
@@ -82,12 +94,24 @@ class DelayedTaskRunner(metaclass=singleton.Singleton):
     __slots__ = ()
 
     granularity: typing.ClassVar[int] = 2  # we check for delayed tasks every "granularity" seconds
+    # On pooled mode, we sleep until next task is due, but between this limits
+    min_wait: typing.ClassVar[float] = 0.2
+    max_wait: typing.ClassVar[float] = 5
+    report_interval: typing.ClassVar[int] = 60  # Queue metrics are logged every "report_interval" seconds on pooled mode
+
     _hostname: typing.ClassVar[str]  # "Our" hostname
     _keepRunning: typing.ClassVar[bool]  # If we should keep it running
+    # Pooled mode
+    _wakeup: typing.ClassVar[threading.Event]  # Set when a task finishes or termination is requested
+    _running: typing.ClassVar[int]  # Tasks being executed by the pool
+    _lock: typing.ClassVar[threading.Lock]
 
     def __init__(self):
         DelayedTaskRunner._hostname = gethostname()
         DelayedTaskRunner._keepRunning = True
+        DelayedTaskRunner._wakeup = threading.Event()
+        DelayedTaskRunner._running = 0
+        DelayedTaskRunner._lock = threading.Lock()
         logger.debug("Initialized delayed task runner for host %s", DelayedTaskRunner._hostname)
 
     def notifyTermination(self) -> None:
@@ -96,6 +120,15 @@ class DelayedTaskRunner(metaclass=singleton.Singleton):
         It will mark the thread to "stop" ASAP
         """
         DelayedTaskRunner._keepRunning = False
+        DelayedTaskRunner._wakeup.set()
+
+    @staticmethod
+    def isPooled() -> bool:
+        """
+        Returns True if runner works on "pooled" mode, that is, claiming tasks in batches and
+        executing them on a fixed size worker pool (of DELAYED_TASKS_THREADS workers)
+        """
+        return GlobalConfig.DELAYED_TASKS_BATCH_SIZE.getInt() > 0
 
     @staticmethod
     def runner() -> 'DelayedTaskRunner':
@@ -106,9 +139,97 @@ class DelayedTaskRunner(metaclass=singleton.Singleton):
         """
         return DelayedTaskRunner()
 
+    @staticmethod
+    def _dueFilter(now: 'typing.Any') -> Q:
+        # If next execution is before now or last execution is in the future (clock changed on this server, we take that task as executable)
+        return Q(execution_time__lt=now) | Q(insert_date__gt=now + timedelta(seconds=30))
+
+    @staticmethod
+    def _decode(instance: str) -> DelayedTask:
+        return pickle.loads(codecs.decode(instance.encode(), 'base64'))  # nosec: controlled pickle
+
+    def claimTasks(self, maxTasks: int) -> list[DelayedTask]:
+        """
+        Claims (removes from queue) up to maxTasks due tasks, most overdue first, and returns them
+        ready to be executed.
+
+        Rows locked by other runners are skipped if the database supports it (SKIP LOCKED), so
+        runners on different servers do not serialize on the same rows.
+        """
+        now = getSqlDatetime()
+        skipLocked = connections['default'].features.has_select_for_update_skip_locked
+        with transaction.atomic():
+            rows = list(
+                DBDelayedTask.objects.select_for_update(skip_locked=skipLocked)
+                .filter(DelayedTaskRunner._dueFilter(now))
+                .order_by('execution_time')
+                .values_list('id', 'type', 'instance')[:maxTasks]
+            )
+            if rows:
+                DBDelayedTask.objects.filter(id__in=[row[0] for row in rows]).delete()
+
+        tasks: list[DelayedTask] = []
+        for _, typeName, instance in rows:
+            try:
+                tasks.append(DelayedTaskRunner._decode(instance))
+            except Exception:
+                # Task can't be loaded, so it will not be run
+                logger.exception('Loading delayed task %s', typeName)
+        return tasks
+
+    def nextWait(self) -> float:
+        """
+        Returns the number of seconds to wait until next task is due, limited to [min_wait, max_wait]
+        """
+        nextExecution = DBDelayedTask.objects.aggregate(next=Min('execution_time'))['next']
+        if nextExecution is None:
+            return self.max_wait
+        wait = (nextExecution - getSqlDatetime()).total_seconds()
+        return min(max(wait, self.min_wait), self.max_wait)
+
+    def queueInfo(self) -> DelayedTaskQueueInfo:
+        """
+        Returns the current metrics of the delayed tasks queue
+        """
+        now = getSqlDatetime()
+        total = DBDelayedTask.objects.count()
+        due = DBDelayedTask.objects.filter(execution_time__lt=now)
+        oldest = due.aggregate(oldest=Min('execution_time'))['oldest']
+        return DelayedTaskQueueInfo(
+            total=total,
+            due=due.count() if oldest else 0,
+            lag=(now - oldest).total_seconds() if oldest else 0.0,
+        )
+
+    def _executePooled(self, taskInstance: DelayedTask) -> None:
+        try:
+            # Re-create environment data
+            taskInstance.env = Environment.getEnvForType(taskInstance.__class__)
+            taskInstance.execute()
+        except Exception as e:
+            logger.exception("Exception executing delayed task %s: %s", e.__class__, e)
+        finally:
+            connections['default'].close()
+            with DelayedTaskRunner._lock:
+                DelayedTaskRunner._running -= 1
+            DelayedTaskRunner._wakeup.set()  # A worker is free
+
+    def executeDelayedTasks(self, pool: ThreadPoolExecutor, maxTasks: int) -> int:
+        """
+        Claims up to maxTasks due tasks and feeds them to the pool.
+        Returns the number of claimed tasks
+        """
+        tasks = self.claimTasks(maxTasks)
+        for taskInstance in tasks:
+            logger.debug('Executing delayedTask:>%s<', taskInstance)
+            with DelayedTaskRunner._lock:
+                DelayedTaskRunner._running += 1
+            pool.submit(self._executePooled, taskInstance)
+        return len(tasks)
+
     def executeOneDelayedTask(self) -> None:
         now = getSqlDatetime()
-        filt = Q(execution_time__lt=now) | Q(insert_date__gt=now + timedelta(seconds=30))
+        filt = DelayedTaskRunner._dueFilter(now)
         # If next execution is before now or last execution is in the future (clock changed on this server, we take that task as executable)
         try:
             with transaction.atomic():  # Encloses
@@ -120,9 +241,8 @@ class DelayedTaskRunner(metaclass=singleton.Singleton):
                 )  # @UndefinedVariable
                 if task.insert_date > now + timedelta(seconds=30):
                     logger.warning('Executed %s due to insert_date being in the future!', task.type)
-                taskInstanceDump = codecs.decode(task.instance.encode(), 'base64')
                 task.delete()
-            taskInstance = pickle.loads(taskInstanceDump)  # nosec: controlled pickle
+            taskInstance = DelayedTaskRunner._decode(task.instance)
         except IndexError:
             return  # No problem, there is no waiting delayed task
         except OperationalError:
@@ -148,7 +268,7 @@ class DelayedTaskRunner(metaclass=singleton.Singleton):
         # Save "env" from delayed task, set it to None and restore it after save
         env = instance.env
         instance.env = None  # type: ignore   # clean env before saving pickle, save space (the env will be created again when executing)
-        instanceDump = codecs.encode(pickle.dumps(instance), 'base64').decode()
+        instanceDump = codecs.encode(pickle.dumps(instance, protocol=pickle.HIGHEST_PROTOCOL), 'base64').decode()
         instance.env = env
 
         typeName = str(cls.__module__ + '.' + cls.__name__)
@@ -201,14 +321,55 @@ class DelayedTaskRunner(metaclass=singleton.Singleton):
             return False
 
         try:
-            number = DBDelayedTask.objects.filter(tag=tag).count()  # @UndefinedVariable
+            # EXISTS is enough, no need to count all of them
+            return DBDelayedTask.objects.filter(tag=tag).exists()  # @UndefinedVariable
         except Exception:
-            number = 0
             logger.error('Exception looking for a delayed task tag %s', tag)
 
-        return number > 0
+        return False
+
+    def runPooled(self, workers: int, batchSize: int) -> None:
+        """
+        Loop that claims due tasks in batches and executes them on a fixed size pool of workers.
+        Instead of polling at a fixed granularity, waits until next task is due (or a task finishes).
+        Only one of this loops is needed per server.
+        """
+        logger.debug('Run pooled delayed task runner with %s workers, batch size %s', workers, batchSize)
+        lastReport = 0.0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='delayedtask') as pool:
+            while DelayedTaskRunner._keepRunning:
+                wait = self.max_wait
+                try:
+                    DelayedTaskRunner._wakeup.clear()
+                    if time.monotonic() - lastReport > self.report_interval:
+                        lastReport = time.monotonic()
+                        logger.info('Delayed tasks queue: %s', self.queueInfo())
+                    with DelayedTaskRunner._lock:
+                        free = workers - DelayedTaskRunner._running
+                    if free > 0:
+                        requested = min(free, batchSize)
+                        claimed = self.executeDelayedTasks(pool, requested)
+                        if claimed < requested:  # No more due tasks right now
+                            wait = self.nextWait()
+                        elif claimed < free:  # Probably more due tasks, and we have free workers
+                            continue
+                except Exception as e:
+                    if not isinstance(e, DatabaseError):
+                        logger.error('Unexpected exception at run loop %s: %s', e.__class__, e)
+                    wait = self.granularity
+                    try:
+                        connections['default'].close()
+                    except Exception:
+                        logger.exception('Exception clossing connection at delayed task')
+                DelayedTaskRunner._wakeup.wait(wait)
+        logger.info('Exiting DelayedTask Runner because stop has been requested')
 
     def run(self) -> None:
+        if DelayedTaskRunner.isPooled():
+            self.runPooled(
+                GlobalConfig.DELAYED_TASKS_THREADS.getInt(), GlobalConfig.DELAYED_TASKS_BATCH_SIZE.getInt()
+            )
+            return
         logger.debug("At loop")
         while DelayedTaskRunner._keepRunning:
             try:
@@ -36,6 +36,7 @@ import platform
 import threading
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
 from django.db import transaction, DatabaseError, connections
@@ -44,6 +45,7 @@ from django.db.models import Q
 from uds.models import Scheduler as DBScheduler
 from uds.core.util.model import getSqlDatetime
 from uds.core.util.state import State
+from uds.core.util.config import GlobalConfig
 from .jobs_factory import JobsFactory
 
 logger = logging.getLogger(__name__)
@@ -53,7 +55,7 @@ if typing.TYPE_CHECKING:
     from .job import Job
 
 
-class JobThread(threading.Thread):
+class JobExecutor:
     """
     Class responsible of executing one job.
     This class:
@@ -66,12 +68,11 @@ class JobThread(threading.Thread):
     _freq: int
 
     def __init__(self, jobInstance: 'Job', dbJob: DBScheduler) -> None:
-        super().__init__()
         self._jobInstance = jobInstance
         self._dbJobId = dbJob.id
         self._freq = dbJob.frecuency
 
-    def run(self) -> None:
+    def execute(self) -> None:
         try:
             self._jobInstance.execute()
         except Exception:
@@ -112,6 +113,19 @@ class JobThread(threading.Thread):
             )
 
 
+class JobThread(JobExecutor, threading.Thread):
+    """
+    Executes one job on its own thread
+    """
+
+    def __init__(self, jobInstance: 'Job', dbJob: DBScheduler) -> None:
+        JobExecutor.__init__(self, jobInstance, dbJob)
+        threading.Thread.__init__(self)
+
+    def run(self) -> None:
+        self.execute()
+
+
 class Scheduler:
     """
     Class responsible of maintain/execute scheduled jobs
@@ -119,14 +133,36 @@ class Scheduler:
 
     granularity = 2  # We check for cron jobs every THIS seconds
 
+    # On pooled mode, we sleep until next job is due, but between this limits
+    min_wait: typing.ClassVar[float] = 0.5
+    max_wait: typing.ClassVar[float] = 10
+
     # to keep singleton Scheduler
     _scheduler: typing.Optional['Scheduler'] = None
 
+    _hostname: str
+    _keepRunning: bool
+    # Pooled mode
+    _wakeup: threading.Event  # Set when a job finishes or termination is requested
+    _running: int  # Jobs being executed by the pool
+    _lock: threading.Lock
+
     def __init__(self) -> None:
         self._hostname = platform.node()
         self._keepRunning = True
+        self._wakeup = threading.Event()
+        self._running = 0
+        self._lock = threading.Lock()
         logger.info('Initialized scheduler for host "%s"', self._hostname)
 
+    @staticmethod
+    def isPooled() -> bool:
+        """
+        Returns True if scheduler runs on "pooled" mode, that is, claiming jobs in batches and
+        executing them on a fixed size worker pool (of SCHEDULER_THREADS workers)
+        """
+        return GlobalConfig.SCHEDULER_BATCH_SIZE.getInt() > 0
+
     @staticmethod
     def scheduler() -> 'Scheduler':
         """
@@ -141,6 +177,104 @@ class Scheduler:
         Invoked to signal that termination of scheduler task(s) is requested
         """
         self._keepRunning = False
+        self._wakeup.set()
+
+    @staticmethod
+    def _dueFilter(now: 'typing.Any') -> Q:
+        # If next execution is before now or last execution is in the future (clock changed on this server, we take that task as executable)
+        return Q(state=State.FOR_EXECUTE) & (Q(last_execution__gt=now) | Q(next_execution__lt=now))
+
+    def claimJobs(self, maxJobs: int) -> list[DBScheduler]:
+        """
+        Claims (marks as running by this server) up to maxJobs due jobs, in just one select.
+
+        Rows locked by other schedulers are skipped if the database supports it (SKIP LOCKED), so
+        schedulers on different servers do not serialize on the same rows. If not supported, rows are
+        locked as usual (and so, waits for other schedulers to release them).
+        """
+        now = getSqlDatetime()  # Datetimes are based on database server times
+        skipLocked = connections['default'].features.has_select_for_update_skip_locked
+        with transaction.atomic():
+            jobs = list(
+                DBScheduler.objects.select_for_update(skip_locked=skipLocked)
+                .filter(Scheduler._dueFilter(now))
+                .order_by('next_execution')[:maxJobs]
+            )
+            if jobs:
+                DBScheduler.objects.filter(id__in=[job.id for job in jobs]).update(
+                    state=State.RUNNING, owner_server=self._hostname, last_execution=now
+                )
+        for job in jobs:
+            if job.last_execution > now:
+                logger.warning('Executed %s due to last_execution being in the future!', job.name)
+        return jobs
+
+    def nextWait(self) -> float:
+        """
+        Returns the number of seconds to wait until next job is due, limited to [min_wait, max_wait]
+        """
+        nextExecution = (
+            DBScheduler.objects.filter(state=State.FOR_EXECUTE)
+            .order_by('next_execution')
+            .values_list('next_execution', flat=True)
+            .first()
+        )
+        if nextExecution is None:
+            return self.max_wait
+        wait = (nextExecution - getSqlDatetime()).total_seconds()
+        return min(max(wait, self.min_wait), self.max_wait)
+
+    def _executePooled(self, executor: JobExecutor) -> None:
+        try:
+            executor.execute()
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._wakeup.set()  # A slot is free, and next_execution has changed
+
+    def executeJobs(self, pool: ThreadPoolExecutor, maxJobs: int) -> int:
+        """
+        Claims up to maxJobs due jobs and feeds them to the pool.
+        Returns the number of claimed jobs
+        """
+        try:
+            jobs = self.claimJobs(maxJobs)
+        except DatabaseError as e:
+            # Same as executeOneJob, retry will happen on main loop
+            raise DatabaseError(f'Database access problems. Retrying connection ({e})') from e
+
+        for job in jobs:
+            try:
+                jobInstance = job.getInstance()
+                if jobInstance is None:
+                    logger.error('Job instance can\'t be resolved for %s, removing it', job)
+                    job.delete()
+                    continue
+                logger.debug('Executing job:>%s<', job.name)
+                with self._lock:
+                    self._running += 1
+                try:
+                    pool.submit(self._executePooled, JobExecutor(jobInstance, job))
+                except Exception:
+                    with self._lock:
+                        self._running -= 1
+                    raise
+            except Exception:
+                # Claimed but not executed, so it is released instead of waiting for the stuck jobs cleanup
+                logger.exception('Could not execute job %s, releasing it', job.name)
+                self.releaseJob(job)
+        return len(jobs)
+
+    def releaseJob(self, job: DBScheduler) -> None:
+        """
+        Returns a job claimed by this server to the waiting state
+        """
+        try:
+            DBScheduler.objects.filter(id=job.id, owner_server=self._hostname, state=State.RUNNING).update(
+                state=State.FOR_EXECUTE, owner_server=''
+            )
+        except DatabaseError:
+            logger.exception('Could not release job %s', job.name)
 
     def executeOneJob(self) -> None:
         """
@@ -149,9 +283,7 @@ class Scheduler:
         jobInstance = None
         try:
             now = getSqlDatetime()  # Datetimes are based on database server times
-            fltr = Q(state=State.FOR_EXECUTE) & (
-                Q(last_execution__gt=now) | Q(next_execution__lt=now)
-            )
+            fltr = Scheduler._dueFilter(now)
             with transaction.atomic():
                 # If next execution is before now or last execution is in the future (clock changed on this server, we take that task as executable)
                 # This params are all set inside fltr (look at __init__)
@@ -213,14 +345,50 @@ class Scheduler:
                 state=State.FOR_EXECUTE
             )  # @UndefinedVariable
 
+    def runPooled(self, workers: int, batchSize: int) -> None:
+        """
+        Loop that claims jobs in batches and executes them on a fixed size pool of workers.
+        Instead of polling at a fixed granularity, waits until next job is due (or a job finishes).
+        Only one of this loops is needed per server.
+        """
+        logger.debug('Run pooled Scheduler with %s workers, batch size %s', workers, batchSize)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scheduler') as pool:
+            while self._keepRunning:
+                wait = self.max_wait
+                try:
+                    self._wakeup.clear()
+                    with self._lock:
+                        free = workers - self._running
+                    if free > 0:
+                        requested = min(free, batchSize)
+                        claimed = self.executeJobs(pool, requested)
+                        if claimed < requested:  # No more due jobs right now
+                            wait = self.nextWait()
+                        elif claimed < free:  # Probably more due jobs, and we have free workers
+                            continue
+                except Exception as e:
+                    if not isinstance(e, DatabaseError):
+                        logger.error('Unexpected exception at run loop %s: %s', e.__class__, e)
+                    wait = self.granularity
+                    try:
+                        connections['default'].close()
+                    except Exception:
+                        logger.exception('Exception clossing connection at scheduler')
+                self._wakeup.wait(wait)
+        logger.info('Exiting Scheduler because stop has been requested')
+        self.releaseOwnShedules()
+
     def run(self) -> None:
         """
         Loop that executes scheduled tasks
-        Can be executed more than once, in differents threads
+        Can be executed more than once, in differents threads (except on pooled mode, where only one is needed)
         """
         # We ensure that the jobs are also in database so we can
         logger.debug('Run Scheduler thread')
         JobsFactory().ensureJobsInDatabase()
+        if Scheduler.isPooled():
+            self.runPooled(GlobalConfig.SCHEDULER_THREADS.getInt(), GlobalConfig.SCHEDULER_BATCH_SIZE.getInt())
+            return
         logger.debug("At loop")
         while self._keepRunning:
             try:
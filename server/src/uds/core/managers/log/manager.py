@@ -35,6 +35,8 @@ import collections.abc
 import logging
 
 from uds.core.util import singleton
+from uds.core.util.buffered_writer import BufferedWriter
+from uds.core.util.config import GlobalConfig
 from uds.core.util.model import getSqlDatetime
 from uds.models.log import Log
 # from uds.core.workers.log
@@ -48,13 +50,24 @@ if typing.TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Buffered writes (if enabled)
+BUFFER_MAX_SIZE: typing.Final[int] = 16384  # Max pending log entries in memory
+BUFFER_FLUSH_SIZE: typing.Final[int] = 256  # Flush when this number of entries are pending
+BUFFER_FLUSH_AGE: typing.Final[int] = 2  # Or when oldest pending entry is older than this (seconds)
+
+
 class LogManager(metaclass=singleton.Singleton):
     """
     Manager for logging (at database) events
+
+    If LOG_BUFFERED is enabled, entries are kept in memory and written in bulk
+    by a background writer. Retention is enforced by LogMaintenance worker.
     """
 
+    writer: BufferedWriter
+
     def __init__(self):
-        pass
+        self.writer = BufferedWriter('log', BUFFER_MAX_SIZE, BUFFER_FLUSH_SIZE, BUFFER_FLUSH_AGE)
 
     @staticmethod
     def manager() -> 'LogManager':
@@ -75,11 +88,9 @@ class LogManager(metaclass=singleton.Singleton):
         # Ensure message fits on space
         message = str(message)[:4096]
 
-        qs = Log.objects.filter(owner_id=owner_id, owner_type=owner_type.value)
-
         # now, we add new log
         try:
-            Log.objects.create(
+            entry = Log(
                 owner_type=owner_type.value,
                 owner_id=owner_id,
                 created=getSqlDatetime(),
@@ -88,10 +99,20 @@ class LogManager(metaclass=singleton.Singleton):
                 data=message,
                 name=logName,
             )
+            if GlobalConfig.LOG_BUFFERED.getBool():
+                self.writer.add(entry)
+            else:
+                entry.save(force_insert=True)
         except Exception:  # nosec
             # Some objects will not get logged, such as System administrator objects, but this is fine
             pass
 
+    def flush(self) -> None:
+        """
+        Writes pending (buffered) log entries to database
+        """
+        self.writer.flush()
+
     def _getLogs(
         self, owner_type: LogObjectType, owner_id: int, limit: int
     ) -> list[dict]:
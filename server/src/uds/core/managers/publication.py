@@ -37,7 +37,7 @@ import datetime
 from django.utils.translation import gettext as _
 from django.db import transaction
 
-from uds.core.util.serializer import serialize
+from uds.core.util.serializer import serialize, deserialize
 from uds.core.jobs.delayed_task import DelayedTask
 from uds.core.jobs.delayed_task_runner import DelayedTaskRunner
 from uds.core.util.config import GlobalConfig
@@ -45,17 +45,50 @@ from uds.core.services.exceptions import PublishException
 from uds.core.util.state import State
 from uds.core.util import log
 
-from uds.models import ServicePoolPublication, ServicePool
-from uds.core.util.model import getSqlDatetime
+from uds.models import ServicePoolPublication, ServicePool, UserService
+from uds.core.util.model import getSqlDatetime, getSqlStampInSeconds
 
 from uds.core.util import singleton
 
 if typing.TYPE_CHECKING:
+    from django.db.models import QuerySet
     from uds.core import services
 
 logger = logging.getLogger(__name__)
 
 PUBTAG = 'pm-'
+ROLLOUT_TAG = 'prollout-'
+# Storage key (on service pool) of the progress of the running publication rollout
+ROLLOUT_PROGRESS_KEY = 'rolloutProgress'
+
+
+class RolloutProgress(typing.NamedTuple):
+    """
+    Progress of the replacement of the cache services of previous publications by a new one
+    """
+
+    publicationId: int
+    started: int  # Stamps, in seconds
+    updated: int
+    replaced: int  # Cache services replaced so far
+    remaining: int  # Cache services of previous publications still to be replaced
+
+    @property
+    def eta(self) -> typing.Optional[int]:
+        """
+        Estimated seconds to finish the rollout at current pace, None if still unknown
+        """
+        elapsed = self.updated - self.started
+        if self.replaced == 0 or elapsed <= 0:
+            return None
+        return self.remaining * elapsed // self.replaced
+
+    def isRunning(self) -> bool:
+        # If not updated for a while, the rollout task is lost (i.e. the publication was removed)
+        return (
+            self.remaining > 0
+            and getSqlStampInSeconds() - self.updated < GlobalConfig.PUBLICATION_ROLLOUT_INTERVAL.getInt() * 4
+        )
 
 
 class PublicationOldMachinesCleaner(DelayedTask):
@@ -89,6 +122,126 @@ class PublicationOldMachinesCleaner(DelayedTask):
             pass
 
 
+class PublicationRollout(DelayedTask):
+    """
+    Replaces, in waves, the cache user services of previous publications of a service pool
+    by new ones of the publication.
+
+    Every PUBLICATION_ROLLOUT_INTERVAL seconds, up to PUBLICATION_ROLLOUT_WAVE cache services
+    are marked for removal and a replacement for each one is created at once, so the cache
+    does not have to wait for the removal to be refilled. Waves never exceed the free preparing
+    slots of the provider, so the hypervisor is not overloaded.
+    """
+
+    def __init__(self, publication: ServicePoolPublication):
+        super().__init__()
+        self._publicationId = publication.id
+
+    @staticmethod
+    def start(publication: ServicePoolPublication) -> None:
+        remaining = PublicationRollout.oldCache(publication).count()
+        if remaining == 0:
+            return
+        now = getSqlStampInSeconds()
+        publication.deployed_service.storeValue(
+            ROLLOUT_PROGRESS_KEY, serialize(RolloutProgress(publication.id, now, now, 0, remaining))
+        )
+        PublicationRollout(publication).register(4, ROLLOUT_TAG + str(publication.id))
+
+    @staticmethod
+    def progress(servicePool: ServicePool) -> typing.Optional[RolloutProgress]:
+        try:
+            return typing.cast(RolloutProgress, deserialize(servicePool.recoverValue(ROLLOUT_PROGRESS_KEY)))
+        except Exception:
+            return None
+
+    @staticmethod
+    def oldCache(publication: ServicePoolPublication) -> 'QuerySet[UserService]':
+        return (
+            UserService.objects.filter(deployed_service=publication.deployed_service, state=State.USABLE)
+            .exclude(cache_level=0)
+            .exclude(publication=publication)
+        )
+
+    def waveSize(self, servicePool: ServicePool) -> int:
+        # pylint: disable=import-outside-toplevel
+        from uds.core.managers.user_service import UserServiceManager
+
+        size = GlobalConfig.PUBLICATION_ROLLOUT_WAVE.getInt()
+        provider = servicePool.service.getInstance().parent()
+        if provider.getIgnoreLimits():
+            return size
+        preparing = UserServiceManager().getUserServicesInStatesForProvider(
+            servicePool.service.provider, [State.PREPARING]
+        )
+        return min(size, provider.getMaxPreparingServices() - preparing)
+
+    def run(self) -> None:
+        # pylint: disable=import-outside-toplevel
+        from uds.core.managers.user_service import UserServiceManager
+
+        try:
+            publication = ServicePoolPublication.objects.get(pk=self._publicationId)
+        except ServicePoolPublication.DoesNotExist:
+            return  # Removed, nothing to do
+        servicePool: ServicePool = publication.deployed_service
+        progress = PublicationRollout.progress(servicePool)
+        if (
+            publication.state != State.USABLE
+            or progress is None
+            or progress.publicationId != publication.id
+        ):
+            return  # Superseded by a newer publication
+
+        replaced = 0
+        if not servicePool.isInMaintenance():
+            oldCache = PublicationRollout.oldCache(publication)
+            # L1 first, as it is the one being assigned to users
+            size = max(self.waveSize(servicePool), 0)
+            wave = list(oldCache.order_by('cache_level').values_list('id', 'cache_level')[:size])
+            now = getSqlDatetime()
+            for userServiceId, cacheLevel in wave:
+                # Only if not assigned meanwhile
+                if (
+                    oldCache.filter(id=userServiceId, cache_level=cacheLevel).update(
+                        state=State.REMOVABLE, state_date=now
+                    )
+                    != 1
+                ):
+                    continue
+                replaced += 1
+                try:
+                    UserServiceManager().createCacheFor(publication, cacheLevel)
+                except Exception as e:
+                    # Cache updater will take care of it
+                    logger.warning('Could not create replacement cache service for %s: %s', servicePool, e)
+
+        remaining = PublicationRollout.oldCache(publication).count()
+        progress = progress._replace(
+            updated=getSqlStampInSeconds(), replaced=progress.replaced + replaced, remaining=remaining
+        )
+        servicePool.storeValue(ROLLOUT_PROGRESS_KEY, serialize(progress))
+        if remaining == 0:
+            log.doLog(
+                servicePool,
+                log.LogLevel.INFO,
+                f'Publication rollout finished, {progress.replaced} cache services replaced in {progress.updated - progress.started} seconds',
+                log.LogSource.INTERNAL,
+            )
+            return
+
+        if replaced:
+            log.doLog(
+                servicePool,
+                log.LogLevel.INFO,
+                f'Publication rollout: {progress.replaced} cache services replaced, {remaining} remaining, ETA {progress.eta} seconds',
+                log.LogSource.INTERNAL,
+            )
+        PublicationRollout(publication).register(
+            GlobalConfig.PUBLICATION_ROLLOUT_INTERVAL.getInt(), ROLLOUT_TAG + str(publication.id), False
+        )
+
+
 class PublicationLauncher(DelayedTask):
     """
     This delayed task if for launching a new publication
@@ -171,6 +324,8 @@ class PublicationFinishChecker(DelayedTask):
             if State.isFinished(state):
                 # Now we mark, if it exists, the previous usable publication as "Removable"
                 if State.isPreparing(prevState):
+                    # On rollout, cache services are replaced in waves instead of removed at once
+                    rollout = GlobalConfig.PUBLICATION_ROLLOUT_WAVE.getInt() > 0
                     old: ServicePoolPublication
                     for old in publication.deployed_service.publications.filter(
                         state=State.USABLE
@@ -193,14 +348,16 @@ class PublicationFinishChecker(DelayedTask):
                                 True,
                             )
                             publication.deployed_service.markOldUserServicesAsRemovables(
-                                publication
+                                publication, skipCache=rollout
                             )
                         else:  # Remove only cache services, not assigned
                             publication.deployed_service.markOldUserServicesAsRemovables(
-                                publication, True
+                                publication, True, skipCache=rollout
                             )
 
                     publication.setState(State.USABLE)
+                    if rollout:
+                        PublicationRollout.start(publication)
                 elif State.isRemoving(prevState):
                     publication.setState(State.REMOVED)
                 else:  # State is canceling
@@ -328,6 +485,12 @@ class PublicationManager(metaclass=singleton.Singleton):
                     logger.info('Could not delete %s', publication)
             raise PublishException(str(e)) from e
 
+    def rolloutProgress(self, servicePool: ServicePool) -> typing.Optional[RolloutProgress]:  # pylint: disable=no-self-use
+        """
+        Returns the progress of the last publication rollout of the service pool, if any
+        """
+        return PublicationRollout.progress(servicePool)
+
     def cancel(
         self, publication: ServicePoolPublication
     ):  # pylint: disable=no-self-use
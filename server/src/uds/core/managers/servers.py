@@ -110,28 +110,54 @@ class ServerManager(metaclass=singleton.Singleton):
     ) -> list[tuple[typing.Optional['types.servers.ServerStats'], 'models.Server']]:
         """
         Returns a list of stats for a list of servers
+
+        Stats are kept up to date on background (see ServersStatsUpdater job), so
+        servers are only requested here if their stored stats are not valid anymore.
         """
-        # Paralelize stats retrieval
         retrievedStats: list[
             tuple[typing.Optional['types.servers.ServerStats'], 'models.Server']
         ] = []
+        staleServers: list['models.Server'] = []
+
+        for server in serversFltr.select_for_update():
+            if server.isRestrained():
+                continue  # Skip restrained servers
+            stats = server.stats
+            if stats and stats.is_valid:
+                retrievedStats.append((stats, server))
+            elif server.type == types.servers.ServerType.UNMANAGED:
+                # Unmanaged servers does not have stats, no request is done
+                retrievedStats.append((requester.ServerApiRequester(server).getStats(), server))
+            else:
+                staleServers.append(server)
 
-        def _retrieveStats(server: 'models.Server') -> None:
+        if staleServers:
+            # Paralelize stats retrieval of servers with stale stats
+            retrievedStats.extend(self.requestServerStats(staleServers))
+
+        return retrievedStats
+
+    def requestServerStats(
+        self, servers: collections.abc.Iterable['models.Server'], force: bool = False
+    ) -> list[tuple[typing.Optional['types.servers.ServerStats'], 'models.Server']]:
+        """
+        Requests, in parallel, the stats of servers (stats are also stored on server)
+
+        Args:
+            servers: Servers to request stats from
+            force: If True, request them even if stored stats are still valid
+        """
+
+        def _retrieveStats(
+            server: 'models.Server',
+        ) -> tuple[typing.Optional['types.servers.ServerStats'], 'models.Server']:
             try:
-                retrievedStats.append(
-                    (requester.ServerApiRequester(server).getStats(), server)
-                )  # Store stats for later use
+                return (requester.ServerApiRequester(server).getStats(force=force), server)
             except Exception:
-                retrievedStats.append((None, server))
+                return (None, server)
 
-        # Retrieve, in parallel, stats for all servers (not restrained)
         with ThreadPoolExecutor(max_workers=10) as executor:
-            for server in serversFltr.select_for_update():
-                if server.isRestrained():
-                    continue  # Skip restrained servers
-                executor.submit(_retrieveStats, server)
-
-        return retrievedStats
+            return list(executor.map(_retrieveStats, servers))
 
     def _findBestServer(
         self,
@@ -29,9 +29,7 @@
 Author: Adolfo Gómez, dkmaster at dkmon dot com
 """
 import datetime
-import os
 import hashlib
-import tempfile
 import contextlib
 import logging
 import typing
@@ -90,15 +88,10 @@ class ServerApiRequester:
         Sets up the request for the server
         """
         minVersion = minVersion or consts.system.MIN_SERVER_VERSION
-        # If server has a cert, save it to a file
-        verify: typing.Union[str, bool] = False
-        try:
-            if self.server.certificate:
-                # Generate temp file, and delete it after
-                with tempfile.NamedTemporaryFile('w', delete=False) as f:
-                    f.write(self.server.certificate)  # Save cert
-                    verify = f.name
-            session = security.secureRequestsSession(verify=verify)
+        # Sessions are pooled by host & certificate, so connections (and TLS sessions) are reused
+        with security.pooledRequestsSession(
+            self.server.getCommsUrl() or '', certificate=self.server.certificate or ''
+        ) as session:
             # Setup headers
             session.headers.update(
                 {
@@ -109,20 +102,7 @@ class ServerApiRequester:
                     AUTH_TOKEN: self.hash,
                 }
             )
-            # And timeout
-        except Exception as e:
-            logger.error('Error setting up request for server %s: %s', self.server.hostname, e)
-            raise
-
-        try:
             yield session
-        finally:
-            session.close()
-            if isinstance(verify, str):
-                try:
-                    os.unlink(verify)
-                except Exception:
-                    logger.error('Error removing temp file %s', verify)
 
     def getCommsUrl(self, method: str, minVersion: typing.Optional[str]) -> typing.Optional[str]:
         """
@@ -237,13 +217,16 @@ class ServerApiRequester:
 
         return True
 
-    def getStats(self) -> typing.Optional['types.servers.ServerStats']:
+    def getStats(self, force: bool = False) -> typing.Optional['types.servers.ServerStats']:
         """
         Returns the stats of a server
+
+        Args:
+            force: If True, stats are requested to server even if stored ones are still valid
         """
         # If stored stats are still valid, return them
         stats = self.server.stats
-        if stats and stats.is_valid:
+        if stats and stats.is_valid and not force:
             return stats
 
         logger.debug('Getting stats from server %s', self.server.host)
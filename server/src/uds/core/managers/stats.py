@@ -37,6 +37,7 @@ import collections.abc
 
 from uds.core.util.config import GlobalConfig
 from uds.core.util import singleton
+from uds.core.util.buffered_writer import BufferedWriter
 from uds.models import StatsCounters, StatsCountersAccum, StatsEvents
 from uds.core.util.model import getSqlDatetime, getSqlStampInSeconds
 
@@ -54,6 +55,11 @@ FLDS_EQUIV: collections.abc.Mapping[str, collections.abc.Iterable[str]] = {
 
 REVERSE_FLDS_EQUIV: collections.abc.Mapping[str, str] = {i: fld for fld, aliases in FLDS_EQUIV.items() for i in aliases}
 
+# Buffered writes (if enabled)
+BUFFER_MAX_SIZE: typing.Final[int] = 16384  # Max pending stats in memory
+BUFFER_FLUSH_SIZE: typing.Final[int] = 256  # Flush when this number of stats are pending
+BUFFER_FLUSH_AGE: typing.Final[int] = 5  # Or when oldest pending stat is older than this (seconds)
+
 
 class AccumStat(typing.NamedTuple):
     stamp: int
@@ -70,15 +76,32 @@ class StatsManager(metaclass=singleton.Singleton):
     Right now, we are going to provide an interface to "counter stats", that is, statistics
     that has counters (such as how many users is at a time active at platform, how many services
     are assigned, are in use, in cache, etc...
+
+    If STATS_BUFFERED is enabled, counters and events are not written when added, but
+    kept in memory and written in bulk by a background writer.
     """
 
+    writer: BufferedWriter
+
     def __init__(self):
-        pass
+        self.writer = BufferedWriter('stats', BUFFER_MAX_SIZE, BUFFER_FLUSH_SIZE, BUFFER_FLUSH_AGE)
 
     @staticmethod
     def manager() -> 'StatsManager':
         return StatsManager()  # Singleton pattern will return always the same instance
 
+    def _save(self, stat: typing.Union['StatsCounters', 'StatsEvents']) -> bool:
+        if GlobalConfig.STATS_BUFFERED.getBool():
+            return self.writer.add(stat)
+        stat.save(force_insert=True)
+        return True
+
+    def flush(self) -> None:
+        """
+        Writes pending (buffered) stats to database
+        """
+        self.writer.flush()
+
     def __doCleanup(
         self,
         model: type[typing.Union['StatsCounters', 'StatsEvents', 'StatsCountersAccum']],
@@ -120,14 +143,15 @@ class StatsManager(metaclass=singleton.Singleton):
         stampInt = int(time.mktime(stamp.timetuple()))  # pylint: disable=maybe-no-member
 
         try:
-            StatsCounters.objects.create(
-                owner_type=owner_type,
-                owner_id=owner_id,
-                counter_type=counterType,
-                value=counterValue,
-                stamp=stampInt,
+            return self._save(
+                StatsCounters(
+                    owner_type=owner_type,
+                    owner_id=owner_id,
+                    counter_type=counterType,
+                    value=counterValue,
+                    stamp=stampInt,
+                )
             )
-            return True
         except Exception:
             logger.error('Exception handling counter stats saving (maybe database is full?)')
         return False
@@ -280,17 +304,18 @@ class StatsManager(metaclass=singleton.Singleton):
             fld3 = getKwarg('fld3')
             fld4 = getKwarg('fld4')
 
-            StatsEvents.objects.create(
-                owner_type=owner_type,
-                owner_id=owner_id,
-                event_type=eventType,
-                stamp=stamp,
-                fld1=fld1,
-                fld2=fld2,
-                fld3=fld3,
-                fld4=fld4,
+            return self._save(
+                StatsEvents(
+                    owner_type=owner_type,
+                    owner_id=owner_id,
+                    event_type=eventType,
+                    stamp=stamp,
+                    fld1=fld1,
+                    fld2=fld2,
+                    fld3=fld3,
+                    fld4=fld4,
+                )
             )
-            return True
         except Exception:
             logger.exception('Exception handling event stats saving (maybe database is full?)')
         return False
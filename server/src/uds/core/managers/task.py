@@ -38,6 +38,8 @@ import collections.abc
 from django.db import connection
 from uds.core.jobs.scheduler import Scheduler
 from uds.core.jobs.delayed_task_runner import DelayedTaskRunner
+from uds.core.managers.stats import StatsManager
+from uds.core.managers.log import LogManager
 from uds.core import jobs
 from uds.core.util.config import GlobalConfig
 from uds.core.util import singleton
@@ -124,8 +126,10 @@ class TaskManager(metaclass=singleton.Singleton):
 
         self.registerScheduledTasks()
 
-        noSchedulers: int = GlobalConfig.SCHEDULER_THREADS.getInt()
-        noDelayedTasks: int = GlobalConfig.DELAYED_TASKS_THREADS.getInt()
+        # On pooled mode, only one scheduler thread is needed (SCHEDULER_THREADS are the workers of its pool)
+        noSchedulers: int = 1 if Scheduler.isPooled() else GlobalConfig.SCHEDULER_THREADS.getInt()
+        # Same for delayed tasks
+        noDelayedTasks: int = 1 if DelayedTaskRunner.isPooled() else GlobalConfig.DELAYED_TASKS_THREADS.getInt()
 
         logger.info(
             'Starting %s schedulers and %s task executors', noSchedulers, noDelayedTasks
@@ -162,4 +166,8 @@ class TaskManager(metaclass=singleton.Singleton):
         for thread in self.threads:
             thread.notifyTermination()
 
+        # Write any pending buffered data before exiting
+        StatsManager.manager().flush()
+        LogManager.manager().flush()
+
         # The join of threads will happen before termination, so its fine to just return here
@@ -56,6 +56,7 @@ from uds.core.util.stats import events
 from uds.models import MetaPool, ServicePool, ServicePoolPublication, Transport, User, UserService
 
 from .userservice import comms
+from .userservice.meta_usage import MetaPoolUsage
 from .userservice.opchecker import UserServiceOpChecker
 
 if typing.TYPE_CHECKING:
@@ -66,7 +67,26 @@ traceLogger = logging.getLogger('traceLog')
 operationsLogger = logging.getLogger('operationsLog')
 
 
+class ClaimCounters:
+    """
+    Counters of cached user services claims on assignation
+    """
+
+    claimed: typing.ClassVar[int] = 0
+    conflicts: typing.ClassVar[int] = 0  # Claims lost against a concurrent assignation (and retried)
+
+    @staticmethod
+    def asDict() -> dict[str, int]:
+        return {'claimed': ClaimCounters.claimed, 'conflicts': ClaimCounters.conflicts}
+
+
 class UserServiceManager(metaclass=singleton.Singleton):
+    # Cached user services read as candidates for a claim
+    CLAIM_CANDIDATES: typing.Final[int] = 32
+    # Max claims tried on each read of candidates, and max reads
+    CLAIM_TRIES: typing.Final[int] = 4
+    CLAIM_ROUNDS: typing.Final[int] = 3
+
     def __init__(self):
         pass
 
@@ -371,6 +391,42 @@ class UserServiceManager(metaclass=singleton.Singleton):
             return existing.first()
         return None
 
+    def __claimCache(
+        self, servicePool: ServicePool, user: User, **stateFilter: typing.Any
+    ) -> typing.Optional[UserService]:
+        """
+        Claims for user one of the L1 cached user services of the pool matching the filter.
+
+        Candidates are read without locks, and one random of them is claimed with a single
+        conditional update, so concurrent assignations on same pool do not serialize on the
+        same row. A claim lost against a concurrent one is retried with another candidate.
+
+        Returns:
+            The user service, already assigned to user, or None if none could be claimed
+        """
+        for _ in range(UserServiceManager.CLAIM_ROUNDS):
+            candidates = list(
+                servicePool.cachedUserServices().filter(cache_level=services.UserService.L1_CACHE, **stateFilter)[
+                    : UserServiceManager.CLAIM_CANDIDATES
+                ]
+            )
+            if not candidates:
+                return None
+            for cache in random.sample(candidates, min(len(candidates), UserServiceManager.CLAIM_TRIES)):
+                now = getSqlDatetime()
+                if (
+                    UserService.objects.filter(
+                        id=cache.id, user=None, cache_level=services.UserService.L1_CACHE, **stateFilter
+                    ).update(user=user, cache_level=0, state_date=now)
+                    == 1
+                ):
+                    ClaimCounters.claimed += 1
+                    cache.user, cache.cache_level, cache.state_date = user, 0, now
+                    return cache
+                ClaimCounters.conflicts += 1
+        logger.debug('Could not claim a cached service from %s, too many conflicts', servicePool)
+        return None
+
     def getAssignationForUser(
         self, servicePool: ServicePool, user: User
     ) -> typing.Optional[UserService]:  # pylint: disable=too-many-branches
@@ -386,64 +442,18 @@ class UserServiceManager(metaclass=singleton.Singleton):
         if servicePool.isRestrained():
             raise InvalidServiceException(_('The requested service is restrained'))
 
-        cache: typing.Optional[UserService] = None
-        # Now try to locate 1 from cache already "ready" (must be usable and at level 1)
-        with transaction.atomic():
-            caches = typing.cast(
-                list[UserService],
-                servicePool.cachedUserServices()
-                .select_for_update()
-                .filter(
-                    cache_level=services.UserService.L1_CACHE,
-                    state=State.USABLE,
-                    os_state=State.USABLE,
-                )[
-                    :1  # type: ignore  # Slicing is not supported by pylance right now
-                ],
-            )
-            if caches:
-                cache = caches[0]
-                # Ensure element is reserved correctly on DB
-                if (
-                    servicePool.cachedUserServices()
-                    .select_for_update()
-                    .filter(user=None, uuid=typing.cast(UserService, cache).uuid)
-                    .update(user=user, cache_level=0)
-                    != 1
-                ):
-                    cache = None
-            else:
-                cache = None
+        # Only cache of active publication is assigned, so while previous publication cache is
+        # being rolled out (see PublicationRollout), users get the new one
+        publication = servicePool.activePublication()
 
-        # Out of previous atomic
-        if not cache:
-            with transaction.atomic():
-                caches = typing.cast(
-                    list[UserService],
-                    servicePool.cachedUserServices()
-                    .select_for_update()
-                    .filter(cache_level=services.UserService.L1_CACHE, state=State.USABLE)[
-                        :1  # type: ignore  # Slicing is not supported by pylance right now
-                    ],
-                )
-                if cache:
-                    cache = caches[0]
-                    if (
-                        servicePool.cachedUserServices()
-                        .select_for_update()
-                        .filter(user=None, uuid=typing.cast(UserService, cache).uuid)
-                        .update(user=user, cache_level=0)
-                        != 1
-                    ):
-                        cache = None
-                else:
-                    cache = None
+        # Now try to locate 1 from cache already "ready" (must be usable and at level 1)
+        # If none is ready from os point of view, any usable one
+        cache = self.__claimCache(
+            servicePool, user, publication=publication, state=State.USABLE, os_state=State.USABLE
+        ) or self.__claimCache(servicePool, user, publication=publication, state=State.USABLE)
 
-        # Out of atomic transaction
         if cache:
-            # Early assign
-            cache.assignToUser(user)
-
+            # Already assigned by the claim
             logger.debug(
                 'Found a cached-ready service from %s for user %s, item %s',
                 servicePool,
@@ -462,31 +472,9 @@ class UserServiceManager(metaclass=singleton.Singleton):
         # Cache missed
 
         # Now find if there is a preparing one
-        with transaction.atomic():
-            caches = (
-                servicePool.cachedUserServices()
-                .select_for_update()
-                .filter(cache_level=services.UserService.L1_CACHE, state=State.PREPARING)[
-                    :1  # type: ignore  # Slicing is not supported by pylance right now
-                ]
-            )
-            if caches:
-                cache = caches[0]  # type: ignore  # Slicing is not supported by pylance right now
-                if (
-                    servicePool.cachedUserServices()
-                    .select_for_update()
-                    .filter(user=None, uuid=typing.cast(UserService, cache).uuid)
-                    .update(user=user, cache_level=0)
-                    != 1
-                ):
-                    cache = None
-            else:
-                cache = None
+        cache = self.__claimCache(servicePool, user, publication=publication, state=State.PREPARING)
 
-        # Out of atomic transaction
         if cache:
-            cache.assignToUser(user)
-
             logger.debug(
                 'Found a cached-preparing service from %s for user %s, item %s',
                 servicePool,
@@ -911,15 +899,23 @@ class UserServiceManager(metaclass=singleton.Singleton):
         if meta.isAccessAllowed() is False:
             raise ServiceAccessDeniedByCalendar()
 
+        # Usage and availability of members are taken from a snapshot shared by all assignations
+        # of this meta pool, and the chosen one is checked again before using it
+        usages = MetaPoolUsage.get(meta)
+
         # Get pool members. Just pools "visible" and "usable"
-        poolMembers = [p for p in meta.members.all() if p.pool.isVisible() and p.pool.isUsable()]
+        poolMembers = [
+            (p, usages[p.pool.id])
+            for p in meta.members.select_related('pool', 'pool__service', 'pool__service__provider')
+            if p.pool.isVisible() and p.pool.id in usages and usages[p.pool.id].usable
+        ]
         # Sort pools array. List of tuples with (priority, pool)
         sortPools: list[tuple[int, ServicePool]]
         # Sort pools based on meta selection
         if meta.policy == types.pools.LoadBalancingPolicy.PRIORITY:
-            sortPools = [(p.priority, p.pool) for p in poolMembers]
+            sortPools = [(p.priority, p.pool) for p, _ in poolMembers]
         elif meta.policy == types.pools.LoadBalancingPolicy.GREATER_PERCENT_FREE:
-            sortPools = [(p.pool.usage()[0], p.pool) for p in poolMembers]
+            sortPools = [(u.usage.percent, p.pool) for p, u in poolMembers]
         else:
             sortPools = [
                 (
@@ -928,7 +924,7 @@ class UserServiceManager(metaclass=singleton.Singleton):
                     ),  # nosec: just a suffle, not a crypto (to get a round robin-like behavior)
                     p.pool,
                 )
-                for p in poolMembers
+                for p, _ in poolMembers
             ]  # Just shuffle them
 
         # Sort pools related to policy now, and xtract only pools, not sort keys
@@ -938,9 +934,7 @@ class UserServiceManager(metaclass=singleton.Singleton):
         pools: list[ServicePool] = []
         poolsFull: list[ServicePool] = []
         for p in sortedPools:
-            if not p[1].isUsable():
-                continue
-            if p[1].usage() == 100:
+            if usages[p[1].id].usage.percent >= 100:
                 poolsFull.append(p[1])
             else:
                 pools.append(p[1])
@@ -1013,9 +1007,14 @@ class UserServiceManager(metaclass=singleton.Singleton):
             for pool in pools:  # Pools are already sorted, and "full" pools are filtered out
                 if meta.ha_policy == types.pools.HighAvailabilityPolicy.ENABLED:
                     # If not available, skip it
-                    if pool.service.getInstance().isAvailable() is False:
+                    if not usages[pool.id].available or pool.service.getInstance().isAvailable() is False:
                         continue
 
+                # Snapshot may be outdated, so check again the chosen pool
+                if not pool.isUsable() or pool.usage().percent >= 100:
+                    MetaPoolUsage.invalidate(meta.id)
+                    continue
+
                 # Ensure transport is available for the OS
                 usable = ensureTransport(pool)
 
@@ -1023,7 +1022,7 @@ class UserServiceManager(metaclass=singleton.Singleton):
                 if usable:
                     try:
                         usable[0].validateUser(user)
-                        return self.getService(
+                        service = self.getService(
                             user,
                             os,
                             srcIp,
@@ -1032,6 +1031,8 @@ class UserServiceManager(metaclass=singleton.Singleton):
                             doTest=False,
                             clientHostname=clientHostName,
                         )
+                        MetaPoolUsage.assigned(meta, usable[0])
+                        return service
                     except Exception as e:
                         logger.info(
                             'Meta service %s:%s could not be assigned, trying a new one',
@@ -31,13 +31,11 @@ Author: Adolfo Gómez, dkmaster at dkmon dot com
 import base64
 import json
 import logging
-import os
-import tempfile
 import typing
 import collections.abc
 
 from uds.core import exceptions, types
-from uds.core.util.security import secureRequestsSession
+from uds.core.util.security import pooledRequestsSession
 
 if typing.TYPE_CHECKING:
     from uds.models import UserService
@@ -76,32 +74,18 @@ def _requestActor(
     url += '/' + method
 
     try:
-        verify: typing.Union[bool, str]
         cert = userService.properties.get('cert', '')
         # cert = ''  # Uncomment to test without cert
-        if cert:
-            # Generate temp file, and delete it after
-            with tempfile.NamedTemporaryFile('wb', delete=False) as f:
-                f.write(cert.encode())  # Save cert
-                verify = f.name
-        else:
-            verify = False
-        session = secureRequestsSession(verify=cert)
-        if data is None:
-            r = session.get(url, verify=verify, timeout=TIMEOUT)
-        else:
-            r = session.post(
-                url,
-                data=json.dumps(data),
-                headers={'content-type': 'application/json'},
-                verify=verify,
-                timeout=TIMEOUT,
-            )
-        if verify:
-            try:
-                os.remove(typing.cast(str, verify))
-            except Exception:
-                logger.exception('removing verify')
+        with pooledRequestsSession(url, certificate=cert) as session:
+            if data is None:
+                r = session.get(url, timeout=TIMEOUT)
+            else:
+                r = session.post(
+                    url,
+                    data=json.dumps(data),
+                    headers={'content-type': 'application/json'},
+                    timeout=TIMEOUT,
+                )
         js = r.json()
 
         if version >= '3.0.0':
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2019 Virtual Cable S.L.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+'''
+import datetime
+import logging
+import threading
+import time
+import typing
+
+from django.db.models import Count, Q
+
+from uds.core import types
+from uds.core.util import states
+from uds.core.util.config import GlobalConfig
+from uds.core.util.model import getSqlDatetime
+from uds.models import MetaPool, MetaPoolMember, ServicePool
+
+logger = logging.getLogger(__name__)
+
+# Seconds that the usage of the members of a meta pool is shared among all its assignations
+META_USAGE_VALIDITY = 10
+
+
+class MemberUsage(typing.NamedTuple):
+    active: bool  # Pool is in active state
+    usable: bool  # Active, not in maintenance and not restrained
+    available: bool  # Service is available (only checked for meta pools with high availability enabled)
+    usage: types.pools.UsageInfo
+
+
+class MetaPoolUsage:
+    """
+    Keeps a snapshot of the usage and availability of the member pools of each meta pool, obtained with
+    a single aggregated query, and shared by all its assignations for META_USAGE_VALIDITY seconds.
+
+    Assignations done by this process are added to the snapshot, so the load is balanced even
+    before the next refresh. The snapshot is only used for ordering the members, the chosen one
+    is checked again before assigning from it.
+    """
+
+    # meta pool id -> (expiration, pool id -> usage)
+    _snapshots: typing.ClassVar[dict[int, tuple[float, dict[int, MemberUsage]]]] = {}
+    _lock: typing.ClassVar[threading.Lock] = threading.Lock()
+
+    @staticmethod
+    def get(meta: MetaPool) -> dict[int, MemberUsage]:
+        """
+        Returns the usage of the members of the meta pool, by pool id
+        """
+        snapshot = MetaPoolUsage._snapshots.get(meta.id)
+        if snapshot is not None and snapshot[0] > time.monotonic():
+            return snapshot[1]
+        members = MetaPoolUsage.compute(meta)
+        with MetaPoolUsage._lock:
+            MetaPoolUsage._snapshots[meta.id] = (time.monotonic() + META_USAGE_VALIDITY, members)
+        return members
+
+    @staticmethod
+    def compute(meta: MetaPool) -> dict[int, MemberUsage]:
+        restraintTime = GlobalConfig.RESTRAINT_TIME.getInt()
+        restraintCount = GlobalConfig.RESTRAINT_COUNT.getInt()
+        since = typing.cast(datetime.datetime, getSqlDatetime()) - datetime.timedelta(
+            seconds=max(restraintTime, 0)
+        )
+
+        members: dict[int, MemberUsage] = {}
+        for member in (
+            MetaPoolMember.objects.filter(meta_pool=meta)
+            .select_related('pool', 'pool__service', 'pool__service__provider')
+            .annotate(
+                usage_count=Count(
+                    'pool__userServices',
+                    filter=Q(
+                        pool__userServices__state__in=states.userService.VALID_STATES,
+                        pool__userServices__cache_level=0,
+                    ),
+                    distinct=True,
+                ),
+                errors_count=Count(
+                    'pool__userServices',
+                    filter=Q(
+                        pool__userServices__state=states.userService.ERROR,
+                        pool__userServices__state_date__gt=since,
+                    ),
+                    distinct=True,
+                ),
+            )
+        ):
+            pool: ServicePool = member.pool
+            active = pool.state == states.servicePool.ACTIVE
+            # Same as pool.isUsable, but with the errors already counted
+            usable = (
+                active
+                and not pool.isInMaintenance()
+                and not (restraintTime > 0 and member.errors_count >= restraintCount)  # type: ignore  # Annotated
+            )
+            available = True
+            if usable and meta.ha_policy == types.pools.HighAvailabilityPolicy.ENABLED:
+                try:
+                    available = pool.service.getInstance().isAvailable()
+                except Exception:
+                    logger.exception('Checking availability of %s', pool)
+                    available = False
+            members[pool.id] = MemberUsage(
+                active, usable, available, pool.usage(member.usage_count)  # type: ignore  # Annotated
+            )
+        return members
+
+    @staticmethod
+    def assigned(meta: MetaPool, pool: ServicePool) -> None:
+        """
+        Adds a new assignation from pool to the snapshot of meta pool
+        """
+        with MetaPoolUsage._lock:
+            snapshot = MetaPoolUsage._snapshots.get(meta.id)
+            if snapshot is None or pool.id not in snapshot[1]:
+                return
+            members = dict(snapshot[1])
+            member = members[pool.id]
+            members[pool.id] = member._replace(usage=member.usage._replace(used=member.usage.used + 1))
+            MetaPoolUsage._snapshots[meta.id] = (snapshot[0], members)
+
+    @staticmethod
+    def invalidate(metaId: typing.Optional[int] = None) -> None:
+        """
+        Discards the snapshot of the meta pool with this id, or all of them if no id is given
+        """
+        with MetaPoolUsage._lock:
+            if metaId is None:
+                MetaPoolUsage._snapshots.clear()
+            else:
+                MetaPoolUsage._snapshots.pop(metaId, None)
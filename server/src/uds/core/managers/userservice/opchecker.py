@@ -31,6 +31,7 @@
 @author: Adolfo Gómez, dkmaster at dkmon dot com
 '''
 import logging
+import threading
 import typing
 import collections.abc
 
@@ -38,6 +39,8 @@ from uds.core import services
 from uds.core.jobs.delayed_task import DelayedTask
 from uds.core.jobs.delayed_task_runner import DelayedTaskRunner
 from uds.core.util import log
+from uds.core.util.cache import Cache
+from uds.core.util.model import getSqlStampInSeconds
 from uds.core.util.state import State
 from uds.models import UserService
 
@@ -45,6 +48,61 @@ logger = logging.getLogger(__name__)
 
 USERSERVICE_TAG = 'cm-'
 
+# Seconds that the states obtained in bulk from a provider are shared among the checks of its user services
+PROVIDER_STATES_VALIDITY = 10
+
+
+class ProviderStates:
+    """
+    Shares the states obtained in bulk from a provider (see ServiceProvider.getServicesStates)
+    among all the checks of its user services, so the hypervisor is queried once per provider
+    every PROVIDER_STATES_VALIDITY seconds, instead of once for every user service.
+    """
+
+    cache: typing.ClassVar[Cache] = Cache('opcheckerStates', local=True)
+    _locks: typing.ClassVar[dict[str, threading.Lock]] = {}
+    _locksLock: typing.ClassVar[threading.Lock] = threading.Lock()
+
+    @staticmethod
+    def _lockFor(key: str) -> threading.Lock:
+        with ProviderStates._locksLock:
+            return ProviderStates._locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def get(userService: UserService, since: int) -> typing.Optional[collections.abc.Mapping[str, typing.Any]]:
+        """
+        Returns the states of the provider of the user service, obtained after "since" (sql stamp)
+
+        Returns None if the provider does not support bulk state checking, or states could not be obtained
+        """
+        provider = userService.deployed_service.service.provider  # type: ignore
+        providerType = provider.getType()
+        # Not overriden, no bulk support. Checked on type, so no instance is needed
+        if providerType.getServicesStates is services.ServiceProvider.getServicesStates:
+            return None
+
+        key = provider.uuid
+        value: typing.Optional[tuple[int, collections.abc.Mapping[str, typing.Any]]] = ProviderStates.cache.get(key)
+        if value is not None and value[0] >= since:
+            return value[1]
+
+        # Only one thread per provider will query it, the rest will use its result
+        with ProviderStates._lockFor(key):
+            value = ProviderStates.cache.get(key)
+            if value is not None and value[0] >= since:
+                return value[1]
+
+            stamp = getSqlStampInSeconds()
+            try:
+                states = provider.getInstance().getServicesStates()
+            except Exception as e:
+                logger.warning('Could not get states of provider %s: %s', provider.name, e)
+                return None
+
+            if states is not None:
+                ProviderStates.cache.put(key, (stamp, states), PROVIDER_STATES_VALIDITY)
+            return states
+
 
 # State updaters
 # This will be executed on current service state for checking transitions to new state, task states, etc..
@@ -208,6 +266,8 @@ class UserServiceOpChecker(DelayedTask):
         super().__init__()
         self._svrId = service.id
         self._state = service.state
+        # States obtained in bulk from provider must be newer than this, so they reflect current operation
+        self._since = getSqlStampInSeconds()
 
     @staticmethod
     def makeUnique(userService: UserService, userServiceInstance: services.UserService, state: str):
@@ -273,14 +333,19 @@ class UserServiceOpChecker(DelayedTask):
         logger.debug('Checking user service finished %s', self._svrId)
         uService = None
         try:
-            uService = UserService.objects.get(pk=self._svrId)
+            uService = UserService.objects.select_related('deployed_service__service__provider').get(
+                pk=self._svrId
+            )
             if uService.state != self._state:
                 logger.debug('Task overrided by another task (state of item changed)')
                 # This item is no longer valid, returning will not check it again (no checkLater called)
                 return
             ci = uService.getInstance()
             logger.debug("uService instance class: %s", ci.__class__)
-            state = ci.checkState()
+            # Tasks created before bulk checking existed do not have _since
+            since: typing.Optional[int] = getattr(self, '_since', None)
+            states = ProviderStates.get(uService, since) if since is not None else None
+            state = ci.checkState() if states is None else ci.checkStateFrom(states)
             UserServiceOpChecker.checkAndUpdateState(uService, ci, state)
         except UserService.DoesNotExist as e:  # pylint: disable=no-member
             logger.error('User service not found (erased from database?) %s : %s', e.__class__, e)
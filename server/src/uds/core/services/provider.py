@@ -220,6 +220,23 @@ class ServiceProvider(module.Module):
         val = getattr(val, 'value', val)
         return val is True or val == consts.TRUE_STR
 
+    def getServicesStates(self) -> typing.Optional[collections.abc.Mapping[str, typing.Any]]:
+        """
+        Optional bulk state check.
+
+        Returns the state of all the elements (machines, tasks, ...) that the user services of this
+        provider checks periodically, obtained with a single request to the hypervisor, so the
+        state of lots of user services can be checked at once.
+
+        Keys and values are provider dependent, and are only used by the user services of this provider
+        (see :py:meth:`uds.core.services.UserService.checkStateFrom`)
+
+        Default implementation returns None, meaning that bulk checking is not supported.
+
+        :note: The result must be serializable, because it's shared using the cache
+        """
+        return None
+
     def doLog(self, level: log.LogLevel, message: str) -> None:
         """
         Logs a message with requested level associated with this service
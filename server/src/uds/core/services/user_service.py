@@ -445,6 +445,19 @@ class UserService(Environmentable, Serializable):
         """
         raise NotImplementedError(f'Base check state invoked! for class {self.__class__.__name__}')
 
+    def checkStateFrom(self, states: collections.abc.Mapping[str, typing.Any]) -> str:
+        """
+        Same as :py:meth:`.checkState`, but invoked when the provider supports bulk
+        state checking, with the states it has returned from
+        :py:meth:`uds.core.services.ServiceProvider.getServicesStates`.
+
+        The states can be some seconds old, but always obtained after the current
+        operation was started.
+
+        Default implementation ignores states and invokes :py:meth:`.checkState`
+        """
+        return self.checkState()
+
     def finish(self) -> None:
         """
         Invoked when the core notices that the deployment of a service has finished.
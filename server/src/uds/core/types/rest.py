@@ -49,4 +49,30 @@ class TypeInfo(typing.NamedTuple):
     
 class ModelCustomMethod(typing.NamedTuple):
     name: str
-    needs_parent: bool = True
\ No newline at end of file
+    needs_parent: bool = True
+
+class Paging(typing.NamedTuple):
+    """
+    Paging requested by a client for a REST listing
+    """
+
+    offset: int = 0
+    limit: int = 0  # 0 means "no limit"
+    cursor: typing.Optional[int] = None  # pk of last item already received by client
+
+
+class ItemsStream:
+    """
+    Wraps an iterable of items of a listing, so it can be rendered item by item
+    (i.e. as a StreamingHttpResponse) instead of being materialized as a whole
+    """
+
+    __slots__ = ('items',)
+
+    items: 'collections.abc.Iterable[typing.Any]'
+
+    def __init__(self, items: 'collections.abc.Iterable[typing.Any]') -> None:
+        self.items = items
+
+    def __iter__(self) -> 'collections.abc.Iterator[typing.Any]':
+        return iter(self.items)
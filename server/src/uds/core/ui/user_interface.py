@@ -263,9 +263,19 @@ class gui:
         so if you use both, the used one will be "value". This is valid for
         all form fields. (Anyway, default is part of the "value" property, so
         if you use "value", you will get the default value if not set)
+
+        Fields of UserInterface instances are clones of the declared ones, that share the
+        declared field info until they are modified (copy on write). The value is kept
+        apart from the field info, so setting it does not needs a copy.
         """
 
         _fieldsInfo: types.ui.FieldInfo
+        # Current value of the field (initially, the declared one)
+        _value: typing.Any
+        # If True, _fieldsInfo is the one of the declared field, and must be copied before modifying it
+        _sharedInfo: bool = False
+        # If True, this is a clone of a declared field (i.e. belongs to an UserInterface instance)
+        _isClone: bool = False
 
         def __init__(self, label: str, type: types.ui.FieldType, **kwargs) -> None:
             # if defvalue or defaultValue or defValue in kwargs, emit a warning
@@ -307,6 +317,37 @@ class gui:
                 value=kwargs.get('value') if kwargs.get('value') is not None else default,
                 tab=types.ui.Tab.fromStr(kwargs.get('tab')),
             )
+            self._value = self._fieldsInfo.value
+
+        def clone(self) -> 'gui.InputField':
+            """
+            Returns a copy of this field, that shares the field info with this one until modified
+            """
+            field = self.__class__.__new__(self.__class__)
+            field.__dict__.update(self.__dict__)
+            field._sharedInfo = field._isClone = True
+            return field
+
+        def _writableFieldsInfo(self) -> types.ui.FieldInfo:
+            """
+            Returns the field info to be modified, copying it first if it is shared
+            """
+            if self._sharedInfo:
+                self._fieldsInfo = copy.copy(self._fieldsInfo)
+                self._sharedInfo = False
+            return self._fieldsInfo
+
+        def _resolve(self, attr: str) -> typing.Any:
+            """
+            Returns an attribute of the field info, evaluating it if it is a callable.
+            On clones, the callable is evaluated only once, on first use
+            """
+            value = getattr(self._fieldsInfo, attr)
+            if value and callable(value):
+                value = value()
+                if self._isClone:
+                    setattr(self._writableFieldsInfo(), attr, value)
+            return value
 
         @property
         def type(self) -> 'types.ui.FieldType':
@@ -320,7 +361,7 @@ class gui:
             Args:
                 type: Type to set (from constants of this class)
             """
-            self._fieldsInfo.type = type_
+            self._writableFieldsInfo().type = type_
 
         def isType(self, *type_: types.ui.FieldType) -> bool:
             """
@@ -351,9 +392,9 @@ class gui:
             returns default value instead.
             This is mainly used for hidden fields, so we have correctly initialized
             """
-            if callable(self._fieldsInfo.value):
-                return self._fieldsInfo.value()
-            return self._fieldsInfo.value if self._fieldsInfo.value is not None else self.default
+            if callable(self._value):
+                return self._value()
+            return self._value if self._value is not None else self.default
 
         @value.setter
         def value(self, value: typing.Any) -> None:
@@ -366,7 +407,7 @@ class gui:
             """
             So we can override value setter at descendants
             """
-            self._fieldsInfo.value = value
+            self._value = value
 
         def guiDescription(self) -> dict[str, typing.Any]:
             """
@@ -375,7 +416,10 @@ class gui:
             and don't want to
             alter original values.
             """
+            choices = self._resolve('choices')  # Callable choices are only evaluated when needed
             data = typing.cast(dict, self._fieldsInfo.asDict())
+            if choices is not None:
+                data['choices'] = choices
             if 'value' in data:
                 del data['value']  # We don't want to send value on guiDescription
             data['label'] = _(data['label']) if data['label'] else ''
@@ -390,8 +434,7 @@ class gui:
             """
             Returns the default value for this field
             """
-            defValue = self._fieldsInfo.default
-            return defValue() if callable(defValue) else defValue
+            return self._resolve('default')
 
         @default.setter
         def default(self, value: typing.Any) -> None:
@@ -404,7 +447,7 @@ class gui:
             Args:
                 value: Default value (string)
             """
-            self._fieldsInfo.default = value
+            self._writableFieldsInfo().default = value
 
         @property
         def label(self) -> str:
@@ -412,7 +455,7 @@ class gui:
 
         @label.setter
         def label(self, value: str) -> None:
-            self._fieldsInfo.label = value
+            self._writableFieldsInfo().label = value
 
         @property
         def required(self) -> bool:
@@ -420,7 +463,7 @@ class gui:
 
         @required.setter
         def required(self, value: bool) -> None:
-            self._fieldsInfo.required = value
+            self._writableFieldsInfo().required = value
 
         def validate(self) -> bool:
             """
@@ -603,7 +646,7 @@ class gui:
             """
             Set the values for this choice field
             """
-            self._fieldsInfo.choices = gui.convertToChoices(values)
+            self._writableFieldsInfo().choices = gui.convertToChoices(values)
 
     class NumericField(InputField):
         """
@@ -908,7 +951,7 @@ class gui:
             """
             Override to set value to True or False (bool)
             """
-            self._fieldsInfo.value = gui.toBool(value)
+            super()._setValue(gui.toBool(value))
 
         def isTrue(self):
             """
@@ -1065,7 +1108,7 @@ class gui:
             """
             Set the values for this choice field
             """
-            self._fieldsInfo.choices = gui.convertToChoices(values)
+            self._writableFieldsInfo().choices = gui.convertToChoices(values)
 
     class ImageChoiceField(InputField):
         def __init__(
@@ -1103,7 +1146,7 @@ class gui:
             """
             Set the values for this choice field
             """
-            self._fieldsInfo.choices = gui.convertToChoices(values)
+            self._writableFieldsInfo().choices = gui.convertToChoices(values)
 
     class MultiChoiceField(InputField):
         """
@@ -1178,7 +1221,7 @@ class gui:
             """
             Set the values for this choice field
             """
-            self._fieldsInfo.choices = gui.convertToChoices(choices)
+            self._writableFieldsInfo().choices = gui.convertToChoices(choices)
 
     class EditableListField(InputField):
         """
@@ -1254,8 +1297,8 @@ class gui:
 class UserInterfaceType(type):
     """
     Metaclass definition for moving the user interface descriptions to a usable
-    better place. This is done this way because we will "deepcopy" these fields
-    later, and update references on class 'self' to the new copy. (so everyone has a different copy)
+    better place. This is done this way because we will "clone" these fields
+    later, and update references on class 'self' to the clones. (so everyone has a different copy)
     """
 
     def __new__(
@@ -1307,28 +1350,15 @@ class UserInterface(metaclass=UserInterfaceType):
         # : If there is an array of elements to initialize, simply try to store
         # values on form fields.
 
-        # Generate a deep copy of inherited Gui, so each User Interface instance
+        # Generate a clone of inherited Gui, so each User Interface instance
         # has its own "field" set, and do not share the "fielset" with others, what
-        # can be really dangerous. Till now, nothing bad happened cause there where
-        # being used "serialized", but this do not have to be this way
-
-        # Ensure "gui" points to a copy of original gui, not the original one
-        # this is done to avoid modifying the original gui description
-
-        self._gui = copy.deepcopy(self._base_gui)
-
-        # If a field has a callable on defined attributes(value, default, choices)
-        # update the reference to the new copy
+        # can be really dangerous.
+        # Clones shares the declared field info until modified, and callable choices or default
+        # values are evaluated on first use (i.e. when rendered), not here
+        self._gui = {key: field.clone() for key, field in self._base_gui.items()}
         for key, val in self._gui.items():  # And refresh self references to them
             setattr(self, key, val)  # Reference to self._gui[key]
 
-            # Check for "callable" fields and update them if needed
-            for field in ['choices', 'default']:  # Update references to self for callable fields
-                attr = getattr(val._fieldsInfo, field, None)
-                if attr and callable(attr):
-                    # val is an InputField derived instance, so it is a reference to self._gui[key]
-                    setattr(val._fieldsInfo, field, attr())
-
         if values is not None:
             for k, v in self._gui.items():
                 if k in values:
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2023 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import atexit
+import os
+import threading
+import time
+import logging
+import typing
+import collections.abc
+
+from django.db import connections
+
+if typing.TYPE_CHECKING:
+    from django.db import models
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWriter:
+    """
+    Keeps model instances (not yet saved) in memory, and writes them to database in bulk,
+    from a background thread, when "flush_size" instances are pending or the oldest pending
+    instance is older than "flush_age" seconds.
+
+    The buffer is bounded to "max_size" instances. If it is full, the caller flushes it
+    (so producers are slowed down to database speed), and if it can't be emptied, the instance is
+    dropped and accounted on "dropped".
+
+    Pending instances are flushed on process exit, or when "stop" is invoked.
+    """
+
+    name: str
+    max_size: int
+    flush_size: int
+    flush_age: float
+
+    # Counters, for monitoring
+    written: int
+    dropped: int
+
+    _buffer: list['models.Model']
+    _oldest: float  # monotonic time of oldest pending instance
+    _cond: threading.Condition
+    _flushLock: threading.Lock  # Only one flush at a time, to keep order of writes
+    _thread: typing.Optional[threading.Thread]
+    _pid: int  # Pid of process that started the thread (so we restart it after a fork)
+    _stopEvent: threading.Event  # Stop event of current thread (every thread has its own)
+
+    def __init__(self, name: str, max_size: int, flush_size: int, flush_age: float) -> None:
+        self.name = name
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_age = flush_age
+        self.written = self.dropped = 0
+        self._buffer = []
+        self._oldest = 0.0
+        self._cond = threading.Condition()
+        self._flushLock = threading.Lock()
+        self._thread = None
+        self._pid = 0
+        self._stopEvent = threading.Event()
+        atexit.register(self.stop)  # Pending instances are written on exit
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def _append(self, instance: 'models.Model') -> bool:
+        with self._cond:
+            if len(self._buffer) >= self.max_size:
+                return False
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(instance)
+            if len(self._buffer) >= self.flush_size:
+                self._cond.notify()
+            return True
+
+    def add(self, instance: 'models.Model') -> bool:
+        """
+        Adds an instance to be written. Returns False if it has been dropped (buffer full)
+        """
+        self._ensureRunning()
+        if self._append(instance):
+            return True
+        # Buffer is full, flush it here (backpressure) and try again
+        self.flush()
+        if self._append(instance):
+            return True
+        with self._cond:
+            self.dropped += 1
+        logger.warning('Buffer %s is full, dropped instance %s', self.name, instance)
+        return False
+
+    def flush(self) -> int:
+        """
+        Writes all pending instances to database, and returns the number of instances written
+        """
+        with self._flushLock:
+            with self._cond:
+                pending, self._buffer = self._buffer, []
+            if not pending:
+                return 0
+            # Group by model, keeping order
+            byModel: dict[type['models.Model'], list['models.Model']] = {}
+            for instance in pending:
+                byModel.setdefault(type(instance), []).append(instance)
+            try:
+                for model, instances in byModel.items():
+                    model.objects.bulk_create(instances, batch_size=self.flush_size)  # type: ignore
+            except Exception as e:
+                with self._cond:
+                    self.dropped += len(pending)
+                logger.error('Error writing %s buffered instances of %s: %s', len(pending), self.name, e)
+                return 0
+            with self._cond:
+                self.written += len(pending)
+            return len(pending)
+
+    def _ensureRunning(self) -> None:
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._cond:
+            # Not started, or we are on a forked process (threads are not inherited)
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                # A new event, so a previous thread that has not seen its stop yet does not keeps running
+                self._stopEvent = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._stopEvent,), name=f'BufferedWriter-{self.name}', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self, stopEvent: threading.Event) -> None:
+        while not stopEvent.is_set():
+            with self._cond:
+                if self._buffer:
+                    timeout = self.flush_age - (time.monotonic() - self._oldest)
+                else:
+                    timeout = self.flush_age
+                if len(self._buffer) < self.flush_size and timeout > 0 and not stopEvent.is_set():
+                    self._cond.wait(timeout)
+            try:
+                if self.flush():
+                    connections['default'].close()
+            except Exception:  # Should not happen, but keep thread alive
+                logger.exception('Flushing %s', self.name)
+
+    def stop(self) -> None:
+        """
+        Stops the background writer, writing all pending instances
+        """
+        with self._cond:
+            self._stopEvent.set()
+            self._thread = None  # Will be started again if needed
+            self._cond.notify_all()
+        self.flush()
+
+    def __str__(self) -> str:
+        return f'BufferedWriter {self.name}: pending={len(self._buffer)}, written={self.written}, dropped={self.dropped}'
@@ -31,6 +31,9 @@
 """
 import datetime
 import codecs
+import pickle  # nosec: only used for in-process copies of already trusted values
+import threading
+import time
 import typing
 import collections.abc
 import logging
@@ -39,6 +42,7 @@ import logging
 from django.db import transaction
 from django.db.utils import OperationalError
 from uds.models.cache import Cache as DBCache
+from uds.core import consts
 from uds.core.util.model import getSqlDatetime
 from uds.core.util import serializer
 
@@ -46,6 +50,120 @@ from .hash import hash_key
 
 logger = logging.getLogger(__name__)
 
+# Marker for "key known not to exist" on local cache
+_NEGATIVE: typing.Final[bytes] = b''
+
+
+class LocalCacheStats(typing.NamedTuple):
+    hits: int
+    misses: int
+
+
+class LocalCache:
+    """
+    In-process, size bounded LRU with TTL, used as first level (L1) in front of
+    the database backed cache (L2).
+
+    Values are stored pickled, so callers can't modify the stored copy by accident,
+    and without the compression/crypt/base64 overhead of the shared cache.
+    Entries can be invalidated by key or by owner, and misses on L2 can be stored
+    as "negative" entries for a short time, so repeated lookups of non existing
+    keys do not hit the database either.
+    """
+
+    _lock: threading.Lock
+    # key -> (owner, expiration (monotonic), pickled value or _NEGATIVE)
+    _data: 'collections.OrderedDict[str, tuple[str, float, bytes]]'
+    _owners: dict[str, set[str]]
+    _stats: dict[str, list[int]]  # owner -> [hits, misses]
+
+    max_items: int
+
+    def __init__(self, max_items: int) -> None:
+        self._lock = threading.Lock()
+        self._data = collections.OrderedDict()
+        self._owners = {}
+        self._stats = {}
+        self.max_items = max_items
+
+    def _discard(self, key: str) -> None:
+        # Must be called with lock held
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            keys = self._owners.get(entry[0])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._owners[entry[0]]
+
+    def _count(self, owner: str, hit: bool) -> None:
+        # Must be called with lock held
+        counters = self._stats.setdefault(owner, [0, 0])
+        counters[0 if hit else 1] += 1
+
+    def get(self, owner: str, key: str) -> tuple[bool, typing.Any]:
+        """
+        Returns a tuple (found, value). If found is True but value is _NEGATIVE,
+        the key is known to not exist on L2 (value is returned as _NEGATIVE)
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._discard(key)
+                self._count(owner, False)
+                return False, None
+            self._data.move_to_end(key)
+            self._count(owner, True)
+            payload = entry[2]
+        if payload is _NEGATIVE:
+            return True, _NEGATIVE
+        return True, pickle.loads(payload)  # nosec: stored by ourselves
+
+    def put(self, owner: str, key: str, value: typing.Any, validity: float) -> None:
+        if validity <= 0:
+            self.remove(key)
+            return
+        try:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # Not picklable, do not store it locally
+            self.remove(key)
+            return
+        self._store(owner, key, payload, validity)
+
+    def putNegative(self, owner: str, key: str, validity: float) -> None:
+        if validity > 0:
+            self._store(owner, key, _NEGATIVE, validity)
+
+    def _store(self, owner: str, key: str, payload: bytes, validity: float) -> None:
+        with self._lock:
+            self._discard(key)
+            self._data[key] = (owner, time.monotonic() + validity, payload)
+            self._owners.setdefault(owner, set()).add(key)
+            while len(self._data) > self.max_items:
+                self._discard(next(iter(self._data)))
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._discard(key)
+
+    def clear(self, owner: typing.Optional[str] = None) -> None:
+        with self._lock:
+            if owner is None:
+                self._data.clear()
+                self._owners.clear()
+                return
+            for key in self._owners.pop(owner, set()):
+                self._data.pop(key, None)
+
+    def stats(self) -> dict[str, LocalCacheStats]:
+        with self._lock:
+            return {owner: LocalCacheStats(*counters) for owner, counters in self._stats.items()}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
 
 class Cache:
     # Simple hits vs missses counters
@@ -57,8 +175,12 @@ class Cache:
     SHORT_VALIDITY = 5
     LONG_VALIDITY = 3600
 
+    # In-process first level cache, shared by all Cache instances
+    local: typing.ClassVar[LocalCache] = LocalCache(consts.system.CACHE_LOCAL_MAX_ITEMS)
+
     _owner: str
     _bowner: bytes
+    _local: bool
 
     @staticmethod
     def _basic_serialize(value: typing.Any) -> str:
@@ -73,9 +195,18 @@ class Cache:
         collections.abc.Callable[[str], typing.Any]
     ] = _basic_deserialize
 
-    def __init__(self, owner: typing.Union[str, bytes]):
+    def __init__(self, owner: typing.Union[str, bytes], local: bool = False):
+        """
+        Args:
+            owner: Owner of the cache entries
+            local: If True, entries are also kept on the in-process cache (L1), and
+                reads are served from there while valid, without touching the database.
+                Local entries are kept at most CACHE_LOCAL_MAX_TTL seconds, so changes made
+                by other processes are seen after that time at most.
+        """
         self._owner = typing.cast(str, owner.decode('utf-8') if isinstance(owner, bytes) else owner)
         self._bowner = self._owner.encode('utf8')
+        self._local = local
 
     def __getKey(self, key: typing.Union[str, bytes]) -> str:
         if isinstance(key, str):
@@ -83,16 +214,40 @@ class Cache:
         return hash_key(self._bowner + key)
 
     def get(
-        self, skey: typing.Union[str, bytes], defValue: typing.Any = None
+        self,
+        skey: typing.Union[str, bytes],
+        defValue: typing.Any = None,
+        local: typing.Optional[bool] = None,
     ) -> typing.Any:
+        """
+        Gets a value from cache, or defValue if not found or expired
+
+        Args:
+            skey: Key to get
+            defValue: Value to return if key is not found
+            local: If provided, overrides the "local" setting of this cache instance
+        """
+        useLocal = self._local if local is None else local
+        key = self.__getKey(skey)
+        if useLocal:
+            found, val = Cache.local.get(self._owner, key)
+            if found:
+                if val is _NEGATIVE:
+                    Cache.misses += 1
+                    return defValue
+                Cache.hits += 1
+                return val
+
         now = getSqlDatetime()
         # logger.debug('Requesting key "%s" for cache "%s"', skey, self._owner)
         try:
-            key = self.__getKey(skey)
             # logger.debug('Key: %s', key)
             c: DBCache = DBCache.objects.get(pk=key)  # @UndefinedVariable
             # If expired
-            if now > c.created + datetime.timedelta(seconds=c.validity):
+            expires = c.created + datetime.timedelta(seconds=c.validity)
+            if now > expires:
+                if useLocal:
+                    Cache.local.putNegative(self._owner, key, consts.system.CACHE_LOCAL_NEGATIVE_TTL)
                 return defValue
 
             try:
@@ -103,9 +258,18 @@ class Cache:
                 c.delete()
                 return defValue
 
+            if useLocal:
+                Cache.local.put(
+                    self._owner,
+                    key,
+                    val,
+                    min((expires - now).total_seconds(), consts.system.CACHE_LOCAL_MAX_TTL),
+                )
             Cache.hits += 1
             return val
         except DBCache.DoesNotExist:  # @UndefinedVariable
+            if useLocal:
+                Cache.local.putNegative(self._owner, key, consts.system.CACHE_LOCAL_NEGATIVE_TTL)
             Cache.misses += 1
             # logger.debug('key not found: %s', skey)
             return defValue
@@ -140,8 +304,9 @@ class Cache:
         If cached item does not exists, nothing happens (no exception thrown)
         """
         # logger.debug('Removing key "%s" for uService "%s"' % (skey, self._owner))
+        key = self.__getKey(skey)
+        Cache.local.remove(key)
         try:
-            key = self.__getKey(skey)
             DBCache.objects.get(pk=key).delete()  # @UndefinedVariable
             return True
         except DBCache.DoesNotExist:  # @UndefinedVariable
@@ -162,33 +327,47 @@ class Cache:
         skey: typing.Union[str, bytes],
         value: typing.Any,
         validity: typing.Optional[int] = None,
+        local: typing.Optional[bool] = None,
     ) -> None:
+        """
+        Stores a value in cache
+
+        Args:
+            skey: Key to store
+            value: Value to store
+            validity: Validity of the value, in seconds. If None, DEFAULT_VALIDITY is used
+            local: If provided, overrides the "local" setting of this cache instance
+        """
         # logger.debug('Saving key "%s" for cache "%s"' % (skey, self._owner,))
         if validity is None:
             validity = Cache.DEFAULT_VALIDITY
         key = self.__getKey(skey)
+        if self._local if local is None else local:
+            Cache.local.put(self._owner, key, value, min(validity, consts.system.CACHE_LOCAL_MAX_TTL))
+        else:
+            Cache.local.remove(key)  # Ensure no stale value is kept locally
         strValue = Cache._serializer(value)
         now = getSqlDatetime()
         try:
-            DBCache.objects.create(
+            # Update first, so refreshing an existing key is a single query and a failed
+            # insert does not breaks the transaction in course (if any)
+            if not DBCache.objects.filter(pk=key).update(
                 owner=self._owner,
-                key=key,
                 value=strValue,
                 created=now,
                 validity=validity,
-            )  # @UndefinedVariable
-        except Exception:
-            try:
-                # Already exists, modify it
-                c: DBCache = DBCache.objects.get(pk=key)  # @UndefinedVariable
-                c.owner = self._owner
-                c.key = key
-                c.value = strValue
-                c.created = now
-                c.validity = validity
-                c.save()
-            except transaction.TransactionManagementError:
-                logger.debug('Transaction in course, cannot store value')
+            ):
+                DBCache.objects.create(
+                    owner=self._owner,
+                    key=key,
+                    value=strValue,
+                    created=now,
+                    validity=validity,
+                )  # @UndefinedVariable
+        except transaction.TransactionManagementError:
+            logger.debug('Transaction in course, cannot store value')
+        except Exception as e:  # Created concurrently by someone else, losing our value is fine
+            logger.debug('Could not store cache key %s: %s', key, e)
 
     def __setitem__(self, key: typing.Union[str, bytes], value: typing.Any) -> None:
         """
@@ -198,8 +377,9 @@ class Cache:
 
     def refresh(self, skey: typing.Union[str, bytes]) -> None:
         # logger.debug('Refreshing key "%s" for cache "%s"' % (skey, self._owner,))
+        key = self.__getKey(skey)
+        Cache.local.remove(key)  # Next read will get it again from db
         try:
-            key = self.__getKey(skey)
             c = DBCache.objects.get(pk=key)  # @UndefinedVariable
             c.created = getSqlDatetime()
             c.save()
@@ -209,6 +389,7 @@ class Cache:
 
     @staticmethod
     def purge() -> None:
+        Cache.local.clear()
         DBCache.objects.all().delete()  # @UndefinedVariable
 
     @staticmethod
@@ -218,8 +399,16 @@ class Cache:
     @staticmethod
     def delete(owner: typing.Optional[str] = None) -> None:
         # logger.info("Deleting cache items")
+        Cache.local.clear(owner)
         if owner is None:
             objects = DBCache.objects.all()  # @UndefinedVariable
         else:
             objects = DBCache.objects.filter(owner=owner)  # @UndefinedVariable
         objects.delete()
+
+    @staticmethod
+    def localStats() -> dict[str, LocalCacheStats]:
+        """
+        Returns the hits/misses of the in-process cache, by owner
+        """
+        return Cache.local.stats()
@@ -63,7 +63,7 @@ class CalendarChecker:
     cache_hit: typing.ClassVar[int] = 0
     hits: typing.ClassVar[int] = 0
 
-    cache: typing.ClassVar[Cache] = Cache('calChecker')
+    cache: typing.ClassVar[Cache] = Cache('calChecker', local=True)
 
     def __init__(self, calendar: Calendar) -> None:
         self.calendar = calendar
@@ -30,12 +30,16 @@
 @author: Adolfo Gómez, dkmaster at dkmon dot com
 """
 import sys
+import threading
+import time
 import typing
 import collections.abc
 import logging
 import enum
+import uuid
 
 from django.apps import apps
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _, gettext
 from uds.models.config import Config as DBConfig
 from uds.core.managers.crypto import CryptoManager
@@ -48,6 +52,13 @@ _getLater: list['Config.Value'] = []
 # For custom params (for choices mainly)
 _configParams: dict[str, typing.Any] = {}
 
+# Section and key of the version stamp of config values, changed every time a value is changed
+# (Sections starting with "__" are hidden)
+VERSION_SECTION: typing.Final[str] = '__Internal'
+VERSION_KEY: typing.Final[str] = 'configVersion'
+# Seconds between checks of the version stamp, so changes done by other processes are seen after this time at most
+VERSION_CHECK_INTERVAL: typing.Final[int] = 5
+
 # Pair of section/value removed from current UDS version
 # Note: As of version 4.0, all previous REMOVED values has been moved to migration script 0043
 REMOVED_CONFIG_ELEMENTS = {
@@ -64,6 +75,100 @@ REMOVED_CONFIG_ELEMENTS = {
 }
 
 
+class _ConfigSnapshot:
+    """
+    All config values of database, loaded with just one query.
+    Reloaded only when the version stamp on database changes, that is checked
+    at most once every VERSION_CHECK_INTERVAL seconds.
+
+    Changes are stored on snapshot only once commited. Until then, the thread that
+    made them reads the changed values from database.
+    """
+
+    _lock: typing.ClassVar[threading.Lock] = threading.Lock()
+    _values: typing.ClassVar[dict[tuple[str, str], DBConfig]] = {}
+    _version: typing.ClassVar[typing.Optional[str]] = None
+    _checked: typing.ClassVar[float] = 0
+    _local: typing.ClassVar[threading.local] = threading.local()
+
+    @staticmethod
+    def _pending() -> set[tuple[str, str]]:
+        """
+        Keys changed by current thread on a transaction not commited yet
+        """
+        pending: typing.Optional[set[tuple[str, str]]] = getattr(_ConfigSnapshot._local, 'pending', None)
+        if pending is None:
+            pending = _ConfigSnapshot._local.pending = set()
+        return pending
+
+    @staticmethod
+    def _refresh() -> None:
+        now = time.monotonic()
+        if _ConfigSnapshot._version is not None and now - _ConfigSnapshot._checked < VERSION_CHECK_INTERVAL:
+            return
+        version = (
+            DBConfig.objects.filter(section=VERSION_SECTION, key=VERSION_KEY)
+            .values_list('value', flat=True)
+            .first()
+        ) or ''
+        if version != _ConfigSnapshot._version:
+            logger.debug('Config version changed (%s), reloading', version)
+            values = {(cfg.section, cfg.key): cfg for cfg in DBConfig.objects.all()}
+            version = values[(VERSION_SECTION, VERSION_KEY)].value if (VERSION_SECTION, VERSION_KEY) in values else ''
+            with _ConfigSnapshot._lock:
+                _ConfigSnapshot._values = values
+                _ConfigSnapshot._version = version
+        _ConfigSnapshot._checked = now
+
+    @staticmethod
+    def get(section: str, key: str) -> typing.Optional[DBConfig]:
+        pending = _ConfigSnapshot._pending()
+        if pending:
+            if not transaction.get_connection().in_atomic_block:
+                pending.clear()  # Transaction finished without commit, changes were rolled back
+            elif (section, key) in pending:
+                return DBConfig.objects.filter(section=section, key=key).first()
+            else:
+                # A reload now would read (and share) our uncommited changes
+                return _ConfigSnapshot._values.get((section, key))
+        _ConfigSnapshot._refresh()
+        return _ConfigSnapshot._values.get((section, key))
+
+    @staticmethod
+    def changed(cfg: DBConfig) -> None:
+        """
+        Stamps a new version so other processes reloads their values, and stores
+        the changed value on snapshot once the transaction is commited
+        (a rolled back change is never seen)
+        """
+        version = uuid.uuid4().hex
+        DBConfig.objects.update_or_create(
+            section=VERSION_SECTION,
+            key=VERSION_KEY,
+            defaults={'value': version, 'field_type': Config.FieldType.HIDDEN},
+        )
+        key = (cfg.section, cfg.key)
+
+        def store() -> None:
+            with _ConfigSnapshot._lock:
+                _ConfigSnapshot._values = {**_ConfigSnapshot._values, key: cfg}
+                if _ConfigSnapshot._version is not None:  # If not loaded, will be loaded on next get
+                    _ConfigSnapshot._version = version
+            _ConfigSnapshot._pending().discard(key)
+
+        if transaction.get_connection().in_atomic_block:
+            _ConfigSnapshot._pending().add(key)
+        transaction.on_commit(store)  # Outside a transaction, executed right now
+
+    @staticmethod
+    def invalidate() -> None:
+        """
+        Forces a reload on next access
+        """
+        _ConfigSnapshot._version = None
+        _ConfigSnapshot._pending().clear()
+
+
 class Config:
     # Fields types, so inputs get more "beautiful"
     class FieldType(enum.IntEnum):
@@ -125,6 +230,7 @@ class Config:
         _default: str
         _help: str
         _data: typing.Optional[str] = None
+        _decrypted: typing.Optional[tuple[str, str]] = None  # (crypted, decrypted)
 
         def __init__(
             self,
@@ -159,40 +265,59 @@ class Config:
                 _getLater.append(self)
                 return self._default
 
+            # Values are always read from the snapshot, kept up to date with changes of any process,
+            # so "force" is not needed anymore (kept for compatibility)
             try:
-                if force or self._data is None:
-                    # logger.debug('Accessing db config {0}.{1}'.format(self._section.name(), self._key))
-                    readed = DBConfig.objects.get(section=self._section.name(), key=self._key)
+                readed = _ConfigSnapshot.get(self._section.name(), self._key)
+                if readed is None:
+                    # Not found, so we create it
+                    self._data = None
+                    if self._default and self._crypt:
+                        self.set(CryptoManager().decrypt(self._default))
+                    elif not self._crypt:
+                        self.set(self._default)
+                    if self._data is None:  # Not stored (yet)
+                        self._data = self._default
+                else:
                     self._data = readed.value
                     # Ensure password are not encrypted again on DB, even if legacy values were
                     self._crypt = (
                         (readed.crypt or self._crypt) if self._type != Config.FieldType.PASSWORD else False
                     )
                     self._longText = readed.long
-                    if self._type not in (-1, readed.field_type):
-                        readed.field_type = self._type
-                        readed.save(update_fields=['field_type'])
-                    if self._help not in ('', readed.help):
-                        readed.help = self._help
-                        readed.save(update_fields=['help'])  # Append help field if not exists
-                    self._type = readed.field_type
-                    self._help = readed.help or self._help
-            except DBConfig.DoesNotExist:
-                # Not found, so we create it
-                if self._default and self._crypt:
-                    self.set(CryptoManager().decrypt(self._default))
-                elif not self._crypt:
-                    self.set(self._default)
-                self._data = self._default
+                    # Type & help on code prevails, are updated on db on initialization (see syncToDb)
+                    if self._type == -1:
+                        self._type = readed.field_type
+                    self._help = self._help or readed.help
             except Exception as e:
                 logger.info('Error accessing db config %s.%s', self._section.name(), self._key)
                 logger.exception(e)
                 self._data = self._default
 
             if self._crypt:
-                return CryptoManager().decrypt(typing.cast(str, self._data))
+                data = typing.cast(str, self._data)
+                if self._decrypted is None or self._decrypted[0] != data:
+                    self._decrypted = (data, CryptoManager().decrypt(data))
+                return self._decrypted[1]
             return typing.cast(str, self._data)
 
+        def syncToDb(self) -> None:
+            """
+            Updates type and help of database value with the ones defined on code, if they differ
+            """
+            readed = _ConfigSnapshot.get(self._section.name(), self._key)
+            if readed is None:
+                return
+            fields: list[str] = []
+            if self._type not in (-1, readed.field_type):
+                readed.field_type = self._type
+                fields.append('field_type')
+            if self._help not in ('', readed.help):
+                readed.help = self._help
+                fields.append('help')
+            if fields:
+                readed.save(update_fields=fields)
+
         def setParams(self, params: typing.Any) -> None:
             _configParams[self._section.name() + self._key] = params
 
@@ -269,6 +394,7 @@ class Config:
                     self._help,
                 )
                 obj.save()
+                _ConfigSnapshot.changed(obj)
             except Exception:
                 if 'migrate' in sys.argv:  # During migration, set could be saved as part of initialization...
                     return
@@ -334,6 +460,7 @@ class Config:
 
             cfg.value = value
             cfg.save()
+            _ConfigSnapshot.changed(cfg)
             logger.debug('Updated value for %s.%s to %s', section, key, value)
             return True
         except Exception:
@@ -394,6 +521,49 @@ class GlobalConfig:
             'Delay between cache checks. Reducing this number will increase cache generation speed but also will load service providers'
         ),
     )
+    # Max number of user services created or removed for a service pool on every cache check
+    CACHE_UPDATE_STEPS: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
+        'cacheUpdateSteps',
+        '4',
+        type=Config.FieldType.NUMERIC,
+        help=_(
+            'Maximum number of user services created or removed for a service pool on every cache check'
+        ),
+    )
+    # Max number of user services created or removed on every cache check, for all service pools
+    CACHE_UPDATE_BUDGET: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
+        'cacheUpdateBudget',
+        '64',
+        type=Config.FieldType.NUMERIC,
+        help=_(
+            'Maximum number of user services created or removed on every cache check for all service pools (0 = unlimited). Every service pool gets at least one operation, even if this is exceeded'
+        ),
+    )
+    # Number of cache user services of previous publications replaced on every wave of a publication rollout
+    PUBLICATION_ROLLOUT_WAVE: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
+        'publicationRolloutWave',
+        '0',
+        type=Config.FieldType.NUMERIC,
+        help=_(
+            'Number of cache services of previous publications replaced at once on every wave after a new publication, always within the limits of preparing services of the provider (0 = disabled, previous cache services are removed at once and recreated by the cache updater)'
+        ),
+    )
+    # Seconds between waves of a publication rollout
+    PUBLICATION_ROLLOUT_INTERVAL: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
+        'publicationRolloutInterval',
+        '30',
+        type=Config.FieldType.NUMERIC,
+        help=_('Seconds between waves of replacement of cache services after a new publication'),
+    )
+    # Number of unique ids (macs, names, ...) reserved at once by every process
+    UNIQUEID_BLOCK_SIZE: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
+        'uniqueIdBlockSize',
+        '0',
+        type=Config.FieldType.NUMERIC,
+        help=_(
+            'Number of unique ids (macs, names, ...) reserved at once by every server process, so they are assigned without locking the database (0 = disabled, ids are assigned one by one)'
+        ),
+    )
     # Delayed task number of threads PER SERVER, with higher number of threads, deplayed task will complete sooner, but it will give more load to overall system
     DELAYED_TASKS_THREADS: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
         'delayedTasksThreads',
@@ -403,6 +573,16 @@ class GlobalConfig:
             'Delayed task number of threads PER SERVER, with higher number of threads, deployed task will complete sooner, but it will give more load to overall system'
         ),
     )
+    # Number of delayed tasks claimed at once. If > 0, one runner thread per server claims tasks in batches
+    # and executes them on a pool of DELAYED_TASKS_THREADS workers
+    DELAYED_TASKS_BATCH_SIZE: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
+        'delayedTasksBatchSize',
+        '0',
+        type=Config.FieldType.NUMERIC,
+        help=_(
+            'Max number of delayed tasks claimed at once, executed by a pool of "delayedTasksThreads" workers. If 0, each delayed task thread claims tasks one by one'
+        ),
+    )
     # Number of scheduler threads running PER SERVER, with higher number of threads, deplayed task will complete sooner, but it will give more load to overall system
     SCHEDULER_THREADS: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
         'schedulerThreads',
@@ -412,6 +592,16 @@ class GlobalConfig:
             'Number of scheduler threads running PER SERVER, with higher number of threads, deployed task will complete sooner, but it will give more load to overall system'
         ),
     )
+    # Number of jobs claimed at once by the scheduler. If > 0, one scheduler thread per server claims jobs in batches
+    # and executes them on a pool of SCHEDULER_THREADS workers
+    SCHEDULER_BATCH_SIZE: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
+        'schedulerBatchSize',
+        '0',
+        type=Config.FieldType.NUMERIC,
+        help=_(
+            'Max number of jobs claimed at once by the scheduler, executed by a pool of "schedulerThreads" workers. If 0, each scheduler thread claims jobs one by one'
+        ),
+    )
     # Waiting time before removing "errored" and "removed" publications, cache, and user assigned machines. Time is in seconds
     CLEANUP_CHECK: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
         'cleanupCheck',
@@ -596,6 +786,25 @@ class GlobalConfig:
         help=_('Maximum number of time to accumulate on one run. Default is 7 (1 week)'),
     )
 
+    # If True, stats are buffered in memory and written in bulk
+    STATS_BUFFERED: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
+        'statsBuffered',
+        '0',
+        type=Config.FieldType.BOOLEAN,
+        help=_(
+            'If enabled, statistics counters and events are kept in memory and written in bulk every few seconds, instead of on every operation'
+        ),
+    )
+    # If True, object logs are buffered in memory and written in bulk
+    LOG_BUFFERED: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
+        'logBuffered',
+        '0',
+        type=Config.FieldType.BOOLEAN,
+        help=_(
+            'If enabled, logs of objects (services, users, ...) are kept in memory and written in bulk every few seconds, instead of on every operation'
+        ),
+    )
+
     # If disallow login showing authenticatiors
     DISALLOW_GLOBAL_LOGIN: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
         'disallowGlobalLogin',
@@ -666,6 +875,15 @@ class GlobalConfig:
         type=Config.FieldType.NUMERIC,
         help=_('Max session length for User'),
     )
+    # Session expiry is only refreshed (and so, session saved) when this percentage of its duration has elapsed
+    SESSION_REFRESH_RATIO: Config.Value = Config.section(Config.SectionType.SECURITY).value(
+        'Session refresh ratio',
+        '10',
+        type=Config.FieldType.NUMERIC,
+        help=_(
+            'Percentage of the session timeout that must elapse before the session expiration is extended (0 = on every request)'
+        ),
+    )
 
     RELOAD_TIME: Config.Value = Config.section(Config.SectionType.GLOBAL).value(
         'Page reload Time',
@@ -793,11 +1011,13 @@ class GlobalConfig:
                 for v in GlobalConfig.__dict__.values():
                     if isinstance(v, Config.Value):
                         v.get()
+                        v.syncToDb()
                         logger.debug('Initialized global config value %s=%s', v.key(), v.get())
 
                 for c in _getLater:
                     logger.debug('Get later: %s', c)
                     c.get()
+                    c.syncToDb()
 
                 _getLater[:] = []
 
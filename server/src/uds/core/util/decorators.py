@@ -37,7 +37,6 @@ import time
 import typing
 import collections.abc
 
-from django.db import transaction
 from uds.core import consts
 from uds.core.exceptions import BlockAccess
 
@@ -183,6 +182,38 @@ def ensureConnected(func: collections.abc.Callable[..., RT]) -> collections.abc.
 
 # Decorator for caching
 # This decorator will cache the result of the function for a given time, and given parameters
+class _CachedValue(typing.NamedTuple):
+    """
+    Value stored by @cached, with its own expiration (it is stored for longer, to be served stale while refreshing)
+    """
+
+    expires: float
+    data: typing.Any
+
+
+class _Flight:
+    """
+    A call in course of a @cached function, that other callers of same key can wait for
+    """
+
+    __slots__ = ('done', 'result', 'error')
+
+    done: threading.Event
+    result: typing.Any
+    error: typing.Optional[Exception]
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self) -> typing.Any:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
 def cached(
     cachePrefix: str,
     cacheTimeout: typing.Union[collections.abc.Callable[[], int], int] = -1,
@@ -203,6 +234,12 @@ def cached(
     Note:
         If cachingArgs and cachingKWArgs are not provided, the whole arguments will be used for cache key
 
+        Concurrent misses of the same key (on same process) are coalesced, so only one call is done
+        and the rest of callers get its result. Once expired, values are kept for another "timeout"
+        period, and served stale to other callers while one of them refreshes it.
+
+        The call is not executed inside a transaction, so remote calls do not keep db transactions open.
+
     """
     cacheTimeout = Cache.DEFAULT_VALIDITY if cacheTimeout == -1 else cacheTimeout
     cachingArgList: list[int] = (
@@ -213,6 +250,8 @@ def cached(
     )
 
     lock = threading.Lock()
+    # Calls in course, by cache key. Concurrent misses for the same key wait for them instead of calling again
+    inflight: dict[str, _Flight] = {}
 
     hits = misses = exec_time = 0
 
@@ -243,60 +282,85 @@ def cached(
 
         @functools.wraps(fnc)
         def wrapper(*args, **kwargs) -> RT:
-            with transaction.atomic(): # On its own transaction (for cache operations, that are on DB)
-                nonlocal hits, misses, exec_time
-                keyHash = hashlib.sha256(usedforsecurity=False)
-                for i in cachingArgList:
-                    if i < len(args):
-                        keyHash.update(str(args[i]).encode('utf-8'))
-                for s in cachingKwargList:
-                    keyHash.update(str(kwargs.get(s, '')).encode('utf-8'))
-                # Append key data
-                keyHash.update(keyFnc(args[0] if len(args) > 0 else fnc.__name__).encode('utf-8'))
-                # compute cache key
-                cacheKey = f'{cachePrefix}-{keyHash.hexdigest()}'
-
-                # Get cache from object, or create a new one (generic, common to all objects)
-                cache = getattr(args[0], 'cache', None) or Cache('functionCache')
-
-                # if cacheTimeout is a function, call it
-                timeout = cacheTimeout() if callable(cacheTimeout) else cacheTimeout
-
-                data: typing.Any = None
-                if not kwargs.get('force', False) and timeout > 0:
-                    data = cache.get(cacheKey)
-                    if data:
+            nonlocal hits, misses, exec_time
+            keyHash = hashlib.sha256(usedforsecurity=False)
+            for i in cachingArgList:
+                if i < len(args):
+                    keyHash.update(str(args[i]).encode('utf-8'))
+            for s in cachingKwargList:
+                keyHash.update(str(kwargs.get(s, '')).encode('utf-8'))
+            # Append key data
+            keyHash.update(keyFnc(args[0] if len(args) > 0 else fnc.__name__).encode('utf-8'))
+            # compute cache key
+            cacheKey = f'{cachePrefix}-{keyHash.hexdigest()}'
+
+            # Get cache from object, or create a new one (generic, common to all objects)
+            cache = getattr(args[0], 'cache', None) or Cache('functionCache')
+
+            # if cacheTimeout is a function, call it
+            timeout = cacheTimeout() if callable(cacheTimeout) else cacheTimeout
+
+            force = kwargs.pop('force', False)
+
+            stale: typing.Optional[_CachedValue] = None
+            if not force and timeout > 0:
+                value = cache.get(cacheKey, local=True)  # Served from in-process cache if possible
+                if isinstance(value, _CachedValue) and value.data:
+                    if value.expires > time.time():
                         with lock:
                             hits += 1
                             stats.add_hit(exec_time // hits)  # Use mean execution time
-                        return data
+                        return value.data
+                    stale = value
 
-                with lock:
+            with lock:
+                flight = None if force else inflight.get(cacheKey)
+                if flight is None:
+                    leading = _Flight()
+                    inflight.setdefault(cacheKey, leading)
                     misses += 1
                     stats.add_miss()
+                else:
+                    hits += 1
+                    stats.add_hit(exec_time // hits)
 
-                if 'force' in kwargs:
-                    # Remove force key
-                    del kwargs['force']
+            if flight is not None:
+                # Someone is already requesting it, use the stale value if we have one, or wait for its result
+                if stale is not None:
+                    return stale.data
+                return flight.wait()
 
+            try:
                 t = time.thread_time_ns()
+                # Note that no transaction is opened here, so remote calls do not keep db transactions open
                 data = fnc(*args, **kwargs)
                 # Compute duration
                 with lock:
                     exec_time += time.thread_time_ns() - t
 
-                try:
-                    # Maybe returned data is not serializable. In that case, cache will fail but no harm is done with this
-                    cache.put(cacheKey, data, timeout)
-                except Exception as e:
-                    logger.debug(
-                        'Data for %s is not serializable on call to %s, not cached. %s (%s)',
-                        cacheKey,
-                        fnc.__name__,
-                        data,
-                        e,
-                    )
+                leading.result = data
+                if data and timeout > 0:
+                    try:
+                        # Maybe returned data is not serializable. In that case, cache will fail but no harm is done with this
+                        # Stored for twice the timeout, so stale value can be served while it's being refreshed
+                        cache.put(cacheKey, _CachedValue(time.time() + timeout, data), timeout * 2, local=True)
+                    except Exception as e:
+                        logger.debug(
+                            'Data for %s is not serializable on call to %s, not cached. %s (%s)',
+                            cacheKey,
+                            fnc.__name__,
+                            data,
+                            e,
+                        )
                 return data
+            except Exception as e:
+                leading.error = e
+                raise
+            finally:
+                with lock:
+                    if inflight.get(cacheKey) is leading:
+                        del inflight[cacheKey]
+                leading.done.set()
 
         def cache_info() -> CacheInfo:
             """Report cache statistics"""
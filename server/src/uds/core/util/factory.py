@@ -1,6 +1,7 @@
 import typing
 import collections.abc
 import logging
+import threading
 
 from uds.core.util import singleton
 from uds.core import module
@@ -15,17 +16,84 @@ V = typing.TypeVar('V')
 class Factory(typing.Generic[V], metaclass=singleton.Singleton):
     '''
     Generic factory class.
+
+    Objects can be registered at once (using put), or on demand, adding loaders (see addLoader)
+    that are executed on first access to the factory contents.
     '''
 
     _objects: collections.abc.MutableMapping[str, type[V]]
+    # Pending loaders, executed (and removed) on first access to objects
+    _loaders: list[collections.abc.Callable[[], None]]
+    # Partial loaders, that tries to register a single type by its name
+    _lookups: list[collections.abc.Callable[[str], None]]
+    _lock: threading.RLock
+    _loading: bool
 
     def __init__(self) -> None:
         self._objects = {}
+        self._loaders = []
+        self._lookups = []
+        self._lock = threading.RLock()
+        self._loading = False
+
+    def addLoader(
+        self,
+        loader: collections.abc.Callable[[], None],
+        lookup: typing.Optional[collections.abc.Callable[[str], None]] = None,
+    ) -> None:
+        '''
+        Adds a loader, that will register its objects on first access to the factory.
+
+        Args:
+            loader: Registers all the objects it knows of
+            lookup: If provided, used to try to register just one type (by its name) when
+                it is requested and not already present, avoiding the execution of the full loader
+        '''
+        with self._lock:
+            self._loaders.append(loader)
+            if lookup:
+                self._lookups.append(lookup)
+
+    def _load(self, loader: collections.abc.Callable[[], None]) -> bool:
+        '''
+        Executes a loader, avoiding reentrant loads from the loader itself (i.e. an insert
+        that checks the already registered objects)
+
+        Returns:
+            False if a load was already in progress on this thread, True otherwise
+        '''
+        with self._lock:
+            if self._loading:
+                return False
+            self._loading = True
+            try:
+                loader()
+            finally:
+                self._loading = False
+        return True
+
+    def ensureLoaded(self) -> None:
+        '''
+        Executes all pending loaders
+        '''
+
+        def loadAll() -> None:
+            while self._loaders:
+                try:
+                    self._loaders[0]()
+                finally:
+                    # Not removed until executed, so concurrent accesses waits for it to finish
+                    self._loaders.pop(0)
+            self._lookups.clear()
+
+        if self._loaders:
+            self._load(loadAll)
 
     def objects(self) -> collections.abc.Mapping[str, type[V]]:
         '''
         Returns all providers.
         '''
+        self.ensureLoaded()
         return self._objects
 
     def put(self, typeName: str, type_: type[V]) -> None:
@@ -42,7 +110,21 @@ class Factory(typing.Generic[V], metaclass=singleton.Singleton):
         '''
         Returns an object from the factory.
         '''
-        return self._objects.get(typeName.lower())
+        typeName = typeName.lower()
+        type_ = self._objects.get(typeName)
+        if type_ is None and self._loaders:
+            # Try first to register just the requested one, and, if not possible, everything
+            def findOne() -> None:
+                for finder in self._lookups:
+                    if typeName in self._objects:
+                        break
+                    finder(typeName)
+
+            self._load(findOne)
+            if typeName not in self._objects:
+                self.ensureLoaded()
+            type_ = self._objects.get(typeName)
+        return type_
 
     # aliases for get
     lookup = get
@@ -30,7 +30,10 @@
 """
 @author: Adolfo Gómez, dkmaster at dkmon dot com
 """
+import contextlib
 import logging
+import threading
+import time
 import typing
 import collections.abc
 import tempfile
@@ -49,12 +52,17 @@ from django.conf import settings
 
 from ldap.ldapobject import LDAPObject
 
+from uds.core import consts
 from uds.core.util import utils
+from uds.core.util.cache import Cache
+from uds.core.util.hash import hash_key
 
 logger = logging.getLogger(__name__)
 
 LDAPResultType = collections.abc.MutableMapping[str, typing.Any]
 
+T = typing.TypeVar('T')
+
 # About ldap filters: (just for reference)
 # https://ldap.com/ldap-filters/
 
@@ -193,6 +201,183 @@ def connection(
     raise LDAPError(_('Unknown error'))
 
 
+def disconnect(con: 'LDAPObject') -> None:
+    """
+    Closes the connection, ignoring any error (it may be already closed)
+    """
+    try:
+        con.unbind_s()
+    except Exception:  # nosec: this is a "best effort" close
+        pass
+
+
+class ConnectionPool:
+    """
+    Pool of connections to an ldap server, bound with the service credentials
+    used by authenticators to search users and groups.
+
+    Connections are kept open between requests, so the bind (and TLS handshake) is
+    paid only once per connection instead of once per authenticator instance.
+    Up to consts.system.LDAP_MAX_IDLE_CONNECTIONS idle connections are kept per pool.
+    """
+
+    # Connections idle for more than this are tested before being reused, so a connection
+    # closed by the server (idle timeout, restart, ...) is replaced instead of failing the search
+    CHECK_INTERVAL: typing.Final[int] = 60
+
+    _pools: typing.ClassVar[dict[str, 'ConnectionPool']] = {}
+    _poolsLock: typing.ClassVar[threading.Lock] = threading.Lock()
+
+    _key: str
+    _connect: collections.abc.Callable[[], 'LDAPObject']
+    _lock: threading.Lock
+    _idle: list[tuple['LDAPObject', float]]
+    _closed: bool
+
+    def __init__(self, key: str, connect: collections.abc.Callable[[], 'LDAPObject']) -> None:
+        self._key = key
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._idle = []
+        self._closed = False
+
+    @staticmethod
+    def get(
+        username: str,
+        passwd: str,
+        host: str,
+        *,
+        port: int = -1,
+        ssl: bool = False,
+        timeout: int = 3,
+        verify_ssl: bool = False,
+        certificate: typing.Optional[str] = None,
+        owner: typing.Optional[str] = None,
+    ) -> 'ConnectionPool':
+        """
+        Returns the pool for the server & credentials, creating it if needed.
+        Parameters are the same as for connection(), plus:
+
+        @param owner: If provided (usually, an authenticator), pool is kept per owner, and replaced (closing
+                      the old one) if the owner changes its server or credentials. If not, pool is kept per
+                      server & credentials.
+        """
+        key = hash_key(
+            '\t'.join(
+                str(i)
+                for i in (username, passwd, host, port, ssl, timeout, verify_ssl, (certificate or '').strip())
+            )
+        )
+        with ConnectionPool._poolsLock:
+            pool = ConnectionPool._pools.get(owner or key)
+            if pool is not None and pool._key != key:
+                logger.debug('Configuration of %s changed, replacing its ldap pool', owner)
+                pool.close()
+                pool = None
+            if pool is None:
+                pool = ConnectionPool(
+                    key,
+                    lambda: connection(
+                        username,
+                        passwd,
+                        host,
+                        port=port,
+                        ssl=ssl,
+                        timeout=timeout,
+                        verify_ssl=verify_ssl,
+                        certificate=certificate,
+                    )
+                )
+                ConnectionPool._pools[owner or key] = pool
+            return pool
+
+    @staticmethod
+    def closeAll() -> None:
+        """
+        Closes all idle connections of all pools, and forgets them
+        """
+        with ConnectionPool._poolsLock:
+            pools, ConnectionPool._pools = ConnectionPool._pools, {}
+        for pool in pools.values():
+            pool.close()
+
+    def __borrow(self) -> 'LDAPObject':
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                # Last used is the most probable to be still alive
+                con, lastUsed = self._idle.pop()
+
+            if time.monotonic() - lastUsed < ConnectionPool.CHECK_INTERVAL:
+                return con
+            try:
+                con.whoami_s()
+                return con
+            except Exception:
+                logger.debug('Discarding stale ldap connection')
+                disconnect(con)
+
+        return self._connect()
+
+    def __return(self, con: 'LDAPObject') -> None:
+        with self._lock:
+            if not self._closed and len(self._idle) < consts.system.LDAP_MAX_IDLE_CONNECTIONS:
+                self._idle.append((con, time.monotonic()))
+                return
+        disconnect(con)
+
+    @contextlib.contextmanager
+    def connection(self) -> typing.Iterator['LDAPObject']:
+        """
+        Borrows a connection from the pool for the duration of the block.
+
+        If the block fails, the connection is discarded instead of returned to the pool,
+        as we can't know if it is still usable.
+        """
+        con = self.__borrow()
+        try:
+            yield con
+        except BaseException:
+            disconnect(con)
+            raise
+        self.__return(con)
+
+    def idleCount(self) -> int:
+        with self._lock:
+            return len(self._idle)
+
+    def close(self) -> None:
+        """
+        Closes all idle connections of the pool. Connections in use are closed when returned
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for con, _ in idle:
+            disconnect(con)
+
+
+def cached(owner: str, key: str, fetch: collections.abc.Callable[[], typing.Optional[T]]) -> typing.Optional[T]:
+    """
+    Returns the value for key from the in-process cache, or fetchs it and keeps it there
+    for consts.system.LDAP_CACHE_TIME seconds.
+    Not found (None) values are not cached, so new entries on the server are seen at once.
+
+    Args:
+        owner: Owner of the entries, so each authenticator (and configuration) has its own ones
+        key: Key of the value
+        fetch: Callable that reads the value from the server
+    """
+    found, value = Cache.local.get(owner, key)
+    if found:
+        return value
+    value = fetch()
+    if value is not None:
+        Cache.local.put(owner, key, value, consts.system.LDAP_CACHE_TIME)
+    return value
+
+
 def getAsDict(
     con: 'LDAPObject',
     base: str,
@@ -41,15 +41,23 @@ import collections.abc
 
 from django.conf import settings
 
-from uds.core import module
+from uds.core import consts, module
 
 logger = logging.getLogger(__name__)
 
 T = typing.TypeVar('T', bound=module.Module)
 V = typing.TypeVar('V')
 
+# Validity of the type name -> package index of modules. It is just a hint, so it can be long
+INDEX_VALIDITY: typing.Final[int] = 7 * 24 * 3600  # One week
+
 patterns: list[typing.Any] = []
 
+# Factories with modules pending to be loaded
+_lazyFactories: list['ModuleFactory[typing.Any]'] = []
+# Indexes already read from cache on this process
+_indexes: dict[str, dict[str, str]] = {}
+
 
 if typing.TYPE_CHECKING:
     from uds.core.util.factory import ModuleFactory
@@ -145,7 +153,19 @@ def dynamicLoadAndRegisterPackages(
     # Ensures all modules under modName (and optionally packageName) are imported
     importModules(modName, packageName=packageName)
 
-    checkFnc = checker or (lambda x: True)
+    logger.info('* Start registering %s', modName)
+    _registerSubclasses(adder, type_, checker or (lambda x: True))
+    logger.info('* Done Registering %s', modName)
+
+
+def _registerSubclasses(
+    adder: collections.abc.Callable[[type[V]], None],
+    type_: type[V],
+    checker: collections.abc.Callable[[type[V]], bool],
+) -> None:
+    '''
+    Registers all already imported subclasses (recursively) of type_ that passes the checker
+    '''
 
     def process(classes: collections.abc.Iterable[typing.Type]) -> None:
         cls: type[V]
@@ -155,7 +175,7 @@ def dynamicLoadAndRegisterPackages(
             if clsSubCls:
                 process(clsSubCls)  # recursive add sub classes
 
-            if not checkFnc(cls):
+            if not checker(cls):
                 logger.debug('Node is a not accepted, skipping: %s.%s', cls.__module__, cls.__name__)
                 continue
 
@@ -167,9 +187,37 @@ def dynamicLoadAndRegisterPackages(
                     logger.exception('***** Error registering %s.%s: %s *****', cls.__module__, cls.__name__, e)
                 logger.error('   - Error registering %s.%s: %s', cls.__module__, cls.__name__, e)
 
-    logger.info('* Start registering %s', modName)
     process(type_.__subclasses__())
-    logger.info('* Done Registering %s', modName)
+
+
+def _indexKey(modName: str) -> str:
+    # Index changes with code, so it is bound to the version
+    return f'{modName}:{consts.system.VERSION}:{consts.system.VERSION_STAMP}'
+
+
+def _readIndex(modName: str) -> dict[str, str]:
+    '''
+    Returns the type name -> package index of modName, as stored by the last full load (on any process)
+    '''
+    from uds.core.util.cache import Cache  # pylint: disable=import-outside-toplevel
+
+    if modName not in _indexes:
+        try:
+            _indexes[modName] = Cache('modfinder').get(_indexKey(modName)) or {}
+        except Exception as e:  # Database not ready, or whatever, index is just a hint
+            logger.debug('Could not read modules index of %s: %s', modName, e)
+            return {}
+    return _indexes[modName]
+
+
+def _storeIndex(modName: str, index: dict[str, str]) -> None:
+    from uds.core.util.cache import Cache  # pylint: disable=import-outside-toplevel
+
+    _indexes[modName] = index
+    try:
+        Cache('modfinder').put(_indexKey(modName), index, INDEX_VALIDITY)
+    except Exception as e:
+        logger.debug('Could not store modules index of %s: %s', modName, e)
 
 
 def dynamicLoadAndRegisterModules(
@@ -181,11 +229,55 @@ def dynamicLoadAndRegisterModules(
 
     This is an specialisation of dynamicLoadAndRegisterPackages that uses a ModuleFactory to register the modules
 
+    Unless LAZY_MODULES_LOADING is disabled, modules are not imported here, but on first access to the factory.
+    If the factory is asked for a single type, and it is found on the index stored by a previous full load
+    (by this or any other process), only the package containing it is imported.
+
     Args:
         factory (ModuleFactory): Factory to use to create the objects, must support "insert" method
         type_ (type[T]): Type of the objects to load
         modName (str): Name of the package to load
     '''
-    dynamicLoadAndRegisterPackages(
-        factory.insert, type_, modName, checker=lambda x: not x.isBase
-    )
+
+    def checker(cls: type[T]) -> bool:
+        return not cls.isBase
+
+    def loader() -> None:
+        index: dict[str, str] = {}
+
+        def adder(cls: type[T]) -> None:
+            factory.insert(cls)
+            # Package (direct child of modName) that contains the class
+            if cls.__module__.startswith(modName + '.'):
+                index[cls.getType().lower()] = '.'.join(cls.__module__.split('.')[: modName.count('.') + 2])
+
+        dynamicLoadAndRegisterPackages(adder, type_, modName, checker=checker)
+        _storeIndex(modName, index)
+
+    def lookup(typeName: str) -> None:
+        package = _readIndex(modName).get(typeName)
+        if not package:
+            return
+        logger.info('* Importing %s for %s', package, typeName)
+        try:
+            importlib.import_module(package)
+        except Exception as e:
+            logger.error('   - Error importing module %s: %s', package, e)
+            return
+        _registerSubclasses(factory.insert, type_, checker)
+
+    if not consts.system.LAZY_MODULES_LOADING:
+        loader()
+        return
+
+    factory.addLoader(loader, lookup)
+    _lazyFactories.append(factory)
+
+
+def ensureModulesLoaded() -> None:
+    '''
+    Loads all modules pending to be loaded, so every module is imported (and so, also all its
+    side effects, as jobs registration, are done)
+    '''
+    for factory in _lazyFactories:
+        factory.ensureLoaded()
@@ -31,6 +31,7 @@
 @author: Adolfo Gómez, dkmaster at dkmon dot com
 """
 import enum
+import functools
 import re
 import logging
 import typing
@@ -40,6 +41,8 @@ from uds.core import types, consts
 
 logger = logging.getLogger(__name__)
 
+# Number of different user agents whose detection result is kept
+UA_CACHE_SIZE: typing.Final[int] = 1024
 
 
 def getOsFromUA(
@@ -47,9 +50,14 @@ def getOsFromUA(
 ) -> types.os.DetectedOsInfo:
     """
     Basic OS Client detector (very basic indeed :-))
+
+    Results are cached by user agent (just a few different ones are repeated on every request)
     """
-    ua = ua or types.os.KnownOS.UNKNOWN.value[0]
+    return _detectOs(ua or types.os.KnownOS.UNKNOWN.value[0])
+
 
+@functools.lru_cache(maxsize=UA_CACHE_SIZE)
+def _detectOs(ua: str) -> types.os.DetectedOsInfo:
     res = types.os.DetectedOsInfo(os=types.os.KnownOS.UNKNOWN, browser=types.os.KnownBrowser.OTHER, version='0.0')
     found: bool = False
     for os in consts.os.KNOWN_OS_LIST:
@@ -35,6 +35,7 @@ import typing
 import collections.abc
 
 # from django.utils.translation import gettext as _
+from django.db.models import Q
 
 from uds import models
 from uds.core.types.permissions import PermissionType
@@ -87,6 +88,64 @@ def getEffectivePermission(
         return PermissionType.NONE
 
 
+def getEffectivePermissions(
+    user: 'models.User',
+    objs: collections.abc.Iterable['Model'],
+    groups: typing.Optional[collections.abc.Iterable['models.Group']] = None,
+) -> dict[tuple[int, int], PermissionType]:
+    """
+    Resolves the effective permissions of an user over a collection of objects (of any type) using a single query
+
+    Args:
+        user: User to check permissions for
+        objs: Objects to resolve permissions for
+        groups: Groups of the user. If not provided, they will be obtained from user
+
+    Returns:
+        A dict, indexed by (object type, object pk), with the effective permission over every object
+        (objects that are not of a known object type are not included)
+    """
+    keys: list[tuple[int, int]] = []
+    for obj in objs:
+        try:
+            keys.append((objtype.ObjectType.from_model(obj).type, obj.pk))
+        except ValueError:
+            pass
+    if user.is_admin or not keys:
+        return {k: PermissionType.ALL if user.is_admin else PermissionType.NONE for k in keys}
+
+    result: dict[tuple[int, int], PermissionType] = {k: PermissionType.NONE for k in keys}
+    try:
+        ids_by_type: dict[int, set[int]] = {}
+        for object_type, object_id in keys:
+            ids_by_type.setdefault(object_type, set()).add(object_id)
+
+        objs_filter = Q()
+        for object_type, ids in ids_by_type.items():
+            objs_filter |= Q(object_type=object_type) & (Q(object_id=None) | Q(object_id__in=ids))
+
+        owner_filter = Q(user=user) | Q(group__in=user.groups.all() if groups is None else groups)
+
+        # Permissions for object type (object_id is None) are applied to all objects of that type
+        for_type: dict[int, PermissionType] = {}
+        for object_type, object_id, permission in models.Permissions.objects.filter(
+            objs_filter, owner_filter
+        ).values_list('object_type', 'object_id', 'permission'):
+            if object_id is None:
+                for_type[object_type] = max(for_type.get(object_type, PermissionType.NONE), PermissionType(permission))
+            elif (object_type, object_id) in result:
+                result[(object_type, object_id)] = max(result[(object_type, object_id)], PermissionType(permission))
+
+        for object_type, object_id in result:
+            if object_type in for_type:
+                result[(object_type, object_id)] = max(result[(object_type, object_id)], for_type[object_type])
+    except Exception as e:
+        logger.error('Error resolving permissions: %s', e)
+        return {k: PermissionType.NONE for k in keys}
+
+    return result
+
+
 def addUserPermission(
     user: 'models.User',
     obj: 'Model',
@@ -1,10 +1,15 @@
+import collections
+import contextlib
+import hashlib
 import ipaddress
 import logging
 import random
 import secrets
 import ssl
+import threading
 import typing
 import collections.abc
+import urllib.parse
 from datetime import datetime, timedelta
 
 import certifi
@@ -196,6 +201,255 @@ def secureRequestsSession(
 
     return session
 
+class _ResumableSslSocket(ssl.SSLSocket):
+    """
+    SSLSocket that hands its TLS session back to its context when closed.
+    (On TLS 1.3 the session tickets arrive after the handshake, so they are only
+    known once some data has been read)
+    """
+
+    _resumeKey: typing.Any = None
+
+    def _real_close(self) -> None:
+        try:
+            if self._resumeKey is not None and isinstance(self.context, _ResumingSslContext):
+                self.context._rememberSession(self._resumeKey, self.session)
+        except Exception:  # nosec: Not resumable, nothing to remember
+            pass
+        super()._real_close()  # type: ignore  # private method of ssl.SSLSocket
+
+
+class _ResumingSslContext(ssl.SSLContext):
+    """
+    SSLContext that remembers the last TLS session negotiated with each host,
+    and offers it again on next connection, so the server can resume it
+    instead of doing a full handshake.
+    """
+
+    sslsocket_class = _ResumableSslSocket
+
+    _tlsSessions: 'collections.OrderedDict[typing.Any, ssl.SSLSession]'
+    _tlsLock: threading.Lock
+
+    def _rememberedSession(self, key: typing.Any) -> typing.Optional[ssl.SSLSession]:
+        with self._tlsLock:
+            return self._tlsSessions.get(key)
+
+    def _rememberSession(self, key: typing.Any, session: typing.Optional[ssl.SSLSession]) -> None:
+        with self._tlsLock:
+            if session is None or not session.has_ticket and not session.id:
+                return
+            self._tlsSessions[key] = session
+            self._tlsSessions.move_to_end(key)
+            while len(self._tlsSessions) > 8:
+                self._tlsSessions.popitem(last=False)
+
+    def _forgetSession(self, key: typing.Any) -> None:
+        with self._tlsLock:
+            self._tlsSessions.pop(key, None)
+
+    def wrap_socket(self, sock: typing.Any, *args: typing.Any, **kwargs: typing.Any) -> typing.Any:  # type: ignore[override]
+        key = kwargs.get('server_hostname')
+        if key is None:
+            try:
+                key = sock.getpeername()
+            except Exception:  # Not connected, nothing to resume
+                return super().wrap_socket(sock, *args, **kwargs)
+
+        if kwargs.get('session') is None:
+            kwargs['session'] = self._rememberedSession(key)
+        try:
+            ssock = super().wrap_socket(sock, *args, **kwargs)
+        except Exception:
+            # Forget the session, if any, so next try starts from scratch
+            self._forgetSession(key)
+            raise
+        ssock._resumeKey = key
+        self._rememberSession(key, ssock.session)
+        return ssock
+
+
+def createPinnedSslContext(certificate: str = '') -> ssl.SSLContext:
+    """
+    Creates a SSLContext for client connections to a server with a known certificate.
+    The certificate (PEM) is loaded from memory, no temporary files are needed.
+    The context also remembers negotiated TLS sessions, so new connections to same
+    server can be resumed instead of doing a full handshake.
+
+    Args:
+        certificate: Certificate, in PEM format, that the server must present. If empty,
+            server certificate will not be verified.
+
+    Returns:
+        A SSLContext object.
+    """
+    sslContext = _ResumingSslContext(ssl.PROTOCOL_TLS_CLIENT)
+    sslContext._tlsSessions = collections.OrderedDict()
+    sslContext._tlsLock = threading.Lock()
+    # Hostname is checked by urllib3 itself, as with the temp file approach
+    sslContext.check_hostname = False
+    if certificate:
+        sslContext.load_verify_locations(cadata=certificate)
+        sslContext.verify_mode = ssl.VerifyMode.CERT_REQUIRED
+    else:
+        sslContext.verify_mode = ssl.VerifyMode.CERT_NONE
+
+    if hasattr(settings, 'SECURE_MIN_TLS_VERSION') and settings.SECURE_MIN_TLS_VERSION:
+        sslContext.minimum_version = getattr(
+            ssl.TLSVersion, 'TLSv' + settings.SECURE_MIN_TLS_VERSION.replace('.', '_')
+        )
+    else:
+        sslContext.minimum_version = ssl.TLSVersion.TLSv1_2
+
+    sslContext.maximum_version = ssl.TLSVersion.MAXIMUM_SUPPORTED
+    if hasattr(settings, 'SECURE_CIPHERS') and settings.SECURE_CIPHERS:
+        sslContext.set_ciphers(settings.SECURE_CIPHERS)
+
+    return sslContext
+
+
+class _PinnedHTTPAdapter(requests.adapters.HTTPAdapter):
+    """
+    Adapter that uses an already configured (pinned) SSLContext, so no ca files are read
+    on new connections.
+    """
+
+    sslContext: ssl.SSLContext
+    verify: bool
+
+    def __init__(self, sslContext: ssl.SSLContext, verify: bool) -> None:
+        self.sslContext = sslContext
+        self.verify = verify
+        super().__init__()
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        kwargs["ssl_context"] = self.sslContext
+        return super().init_poolmanager(*args, **kwargs)
+
+    def cert_verify(self, conn, url, verify, cert) -> None:
+        # Certificates are already loaded on the ssl context, so no ca file
+        conn.cert_reqs = 'CERT_REQUIRED' if self.verify else 'CERT_NONE'
+        conn.ca_certs = None
+        conn.ca_cert_dir = None
+
+
+class RequestsSessionsPool:
+    """
+    Pool of requests sessions, keyed by (host, pinned certificate).
+
+    Sessions are kept between uses, so their connections are kept alive and TLS
+    handshakes (and temp files for certificates) are avoided. The number of idle
+    sessions is limited, evicting the least recently used ones.
+    """
+
+    _lock: threading.Lock
+    _idle: 'collections.OrderedDict[tuple[str, str], list[requests.Session]]'
+    _contexts: dict[tuple[str, str], ssl.SSLContext]
+    _idleCount: int
+    maxIdle: int
+
+    def __init__(self, maxIdle: int = consts.system.COMMS_MAX_IDLE_SESSIONS) -> None:
+        self._lock = threading.Lock()
+        self._idle = collections.OrderedDict()
+        self._contexts = {}
+        self._idleCount = 0
+        self.maxIdle = maxIdle
+
+    @staticmethod
+    def key(url: str, certificate: str = '') -> tuple[str, str]:
+        return (
+            urllib.parse.urlsplit(url).netloc.lower(),
+            hashlib.sha256(certificate.encode()).hexdigest() if certificate else '',
+        )
+
+    def _newSession(self, key: tuple[str, str], certificate: str) -> 'requests.Session':
+        with self._lock:
+            sslContext = self._contexts.get(key)
+        if sslContext is None:
+            sslContext = createPinnedSslContext(certificate)
+            with self._lock:
+                sslContext = self._contexts.setdefault(key, sslContext)
+
+        session = requests.Session()
+        session.mount("https://", _PinnedHTTPAdapter(sslContext, verify=bool(certificate)))
+        session.verify = bool(certificate)
+        session.headers.update({"User-Agent": consts.system.USER_AGENT})
+        return session
+
+    def acquire(self, url: str, certificate: str = '') -> 'requests.Session':
+        key = RequestsSessionsPool.key(url, certificate)
+        with self._lock:
+            sessions = self._idle.get(key)
+            if sessions:
+                session = sessions.pop()
+                if not sessions:
+                    del self._idle[key]
+                self._idleCount -= 1
+                return session
+        return self._newSession(key, certificate)
+
+    def release(self, url: str, certificate: str, session: 'requests.Session') -> None:
+        key = RequestsSessionsPool.key(url, certificate)
+        # Clean up anything that a user of the session could have left
+        session.headers = requests.utils.default_headers()
+        session.headers.update({"User-Agent": consts.system.USER_AGENT})
+        session.cookies.clear()
+
+        evicted: list['requests.Session'] = []
+        with self._lock:
+            self._idle.setdefault(key, []).append(session)
+            self._idle.move_to_end(key)
+            self._idleCount += 1
+            while self._idleCount > self.maxIdle:
+                oldKey, oldSessions = next(iter(self._idle.items()))
+                evicted.append(oldSessions.pop(0))
+                self._idleCount -= 1
+                if not oldSessions:
+                    del self._idle[oldKey]
+                    self._contexts.pop(oldKey, None)
+
+        for s in evicted:  # Close out of lock, may take a while
+            s.close()
+
+    @contextlib.contextmanager
+    def session(self, url: str, certificate: str = '') -> typing.Iterator['requests.Session']:
+        """
+        Borrows a session for the host of url, that will only trust certificate (if provided).
+        The session is returned to the pool on exit.
+        """
+        session = self.acquire(url, certificate)
+        try:
+            yield session
+        finally:
+            self.release(url, certificate, session)
+
+    def clear(self) -> None:
+        with self._lock:
+            sessions = [s for keySessions in self._idle.values() for s in keySessions]
+            self._idle.clear()
+            self._contexts.clear()
+            self._idleCount = 0
+        for s in sessions:
+            s.close()
+
+    def idleCount(self) -> int:
+        return self._idleCount
+
+
+# Shared pool, for actors & servers communications
+sessionsPool = RequestsSessionsPool()
+
+
+def pooledRequestsSession(
+    url: str, *, certificate: str = ''
+) -> typing.ContextManager['requests.Session']:
+    """
+    Returns a context manager that borrows a session from the shared pool for the host of url.
+    If certificate (PEM) is provided, only that certificate will be accepted from the server.
+    """
+    return sessionsPool.session(url, certificate)
+
+
 def checkServerCertificateIsValid(cert: str) -> bool:
     """
     Checks if a certificate is valid.
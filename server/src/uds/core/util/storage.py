@@ -246,7 +246,9 @@ class Storage:
         dataStr = codecs.encode(data, 'base64').decode()
         attr1 = attr1 or ''
         try:
-            DBStorage.objects.create(owner=self._owner, key=key, data=dataStr, attr1=attr1)
+            # On its own savepoint, so a duplicated key does not break an enclosing transaction
+            with transaction.atomic():
+                DBStorage.objects.create(owner=self._owner, key=key, data=dataStr, attr1=attr1)
         except Exception:
             with transaction.atomic():
                 DBStorage.objects.filter(key=key).select_for_update().update(
@@ -30,15 +30,21 @@
 """
 @author: Adolfo Gómez, dkmaster at dkmon dot com
 """
+import collections
 import logging
+import os
+import random
+import threading
 import time
 import typing
 import collections.abc
+import uuid
 
 from django.db import transaction, OperationalError, connection
 from django.db.utils import IntegrityError
 
 from uds.models.unique_id import UniqueId
+from uds.core.util.config import GlobalConfig
 from uds.core.util.model import getSqlStampInSeconds
 
 if typing.TYPE_CHECKING:
@@ -48,11 +54,60 @@ logger = logging.getLogger(__name__)
 
 MAX_SEQ = 1000000000000000
 
+# Owner of ids reserved by a process (see UNIQUEID_BLOCK_SIZE), but still not assigned
+RESERVED_OWNER_PREFIX: typing.Final[str] = '#reserved:'
+# Reserved ids not assigned after this time (in seconds) are returned to the free ones
+RESERVATION_TTL: typing.Final[int] = 3600
+
 
 class CreateNewIdException(Exception):
     pass
 
 
+class _ReservedIds:
+    """
+    Ids reserved in blocks by this process, handed out from memory.
+    Blocks are kept by (basename, rangeStart, rangeEnd)
+    """
+
+    _lock: typing.ClassVar[threading.Lock] = threading.Lock()
+    _blocks: typing.ClassVar[dict[tuple[str, int, int], 'collections.deque[tuple[int, int]]']] = {}
+    _owner: typing.ClassVar[str] = ''
+    _pid: typing.ClassVar[int] = 0
+
+    @staticmethod
+    def owner() -> str:
+        """
+        Returns the owner used for the reservations of this process
+        (Forked processes gets their own reservations)
+        """
+        with _ReservedIds._lock:
+            if _ReservedIds._pid != os.getpid():
+                _ReservedIds._pid = os.getpid()
+                _ReservedIds._owner = RESERVED_OWNER_PREFIX + uuid.uuid4().hex
+                _ReservedIds._blocks = {}
+            return _ReservedIds._owner
+
+    @staticmethod
+    def pop(key: tuple[str, int, int], reservedSince: int) -> typing.Optional[int]:
+        """
+        Returns next reserved id, skipping the ones reserved before reservedSince
+        (that may have been freed already on database)
+        """
+        with _ReservedIds._lock:
+            block = _ReservedIds._blocks.get(key)
+            while block:
+                seq, stamp = block.popleft()
+                if stamp >= reservedSince:
+                    return seq
+            return None
+
+    @staticmethod
+    def push(key: tuple[str, int, int], seqs: collections.abc.Iterable[int], stamp: int) -> None:
+        with _ReservedIds._lock:
+            _ReservedIds._blocks.setdefault(key, collections.deque()).extend((seq, stamp) for seq in seqs)
+
+
 class UniqueIDGenerator:
     __slots__ = ('_owner', '_baseName')
 
@@ -85,6 +140,10 @@ class UniqueIDGenerator:
         Tries to generate a new unique id in the range provided. This unique id
         is global to "unique ids' database
         """
+        blockSize = GlobalConfig.UNIQUEID_BLOCK_SIZE.getInt()
+        if blockSize > 0:
+            return self.__getReserved(rangeStart, rangeEnd, blockSize)
+
         # First look for a name in the range defined
         stamp = getSqlStampInSeconds()
         seq = rangeStart
@@ -147,6 +206,93 @@ class UniqueIDGenerator:
         # logger.debug('Seq: {}'.format(seq))
         return seq
 
+    def __getReserved(self, rangeStart: int, rangeEnd: int, blockSize: int) -> int:
+        """
+        Gets an id from the ones reserved by this process, reserving a new block if needed.
+        Ids are reserved on database (owned by the reservation), so they keep being unique,
+        and only the reservation of a block needs to lock the database.
+        """
+        key = (self._baseName, rangeStart, rangeEnd)
+        reserver = _ReservedIds.owner()
+        reclaimed = False
+        while True:
+            stamp = getSqlStampInSeconds()
+            seq = _ReservedIds.pop(key, stamp - RESERVATION_TTL // 2)
+            if seq is None:
+                seqs = self.__reserve(rangeStart, rangeEnd, blockSize, reserver, stamp)
+                if not seqs:
+                    if reclaimed:
+                        return -1  # No ids free in range
+                    # Range is full, but other processes may have reserved ids still not assigned
+                    self.__filter(rangeStart, rangeEnd).filter(owner__startswith=RESERVED_OWNER_PREFIX).update(
+                        owner='', assigned=False, stamp=stamp
+                    )
+                    reclaimed = True
+                    continue
+                _ReservedIds.push(key, seqs, stamp)
+                continue
+
+            # If the reservation has been reclaimed meanwhile, this will not update anything
+            if (
+                UniqueId.objects.filter(basename=self._baseName, seq=seq, owner=reserver).update(
+                    owner=self._owner, stamp=stamp
+                )
+                > 0
+            ):
+                return seq
+
+    def __reserve(self, rangeStart: int, rangeEnd: int, count: int, reserver: str, stamp: int) -> list[int]:
+        """
+        Reserves up to count ids of the range for reserver, reusing free ones first.
+        """
+        counter = 0
+        while True:
+            counter += 1
+            try:
+                with transaction.atomic():
+                    # Reservations not used for a long time (i.e. of a dead process) are free again
+                    self.__filter(rangeStart, rangeEnd).filter(
+                        owner__startswith=RESERVED_OWNER_PREFIX, stamp__lt=stamp - RESERVATION_TTL
+                    ).update(owner='', assigned=False, stamp=stamp)
+
+                    flt = self.__filter(rangeStart, rangeEnd, forUpdate=True)
+                    free = list(flt.filter(assigned=False).order_by('seq').values_list('id', 'seq')[:count])
+                    if free:
+                        UniqueId.objects.filter(id__in=[i[0] for i in free]).update(
+                            owner=reserver, assigned=True, stamp=stamp
+                        )
+                    seqs = [i[1] for i in free]
+
+                    if len(seqs) < count:  # Not enough free ones, add new ones after last assigned
+                        last = flt.filter(assigned=True).values_list('seq', flat=True).first()
+                        first = rangeStart if last is None else last + 1
+                        end = min(rangeEnd, first + count - len(seqs) - 1)
+                        if first <= end:
+                            # Concurrent reservations will get a "duplicate key error", and retry
+                            UniqueId.objects.bulk_create(
+                                [
+                                    UniqueId(
+                                        owner=reserver,
+                                        basename=self._baseName,
+                                        seq=seq,
+                                        assigned=True,
+                                        stamp=stamp,
+                                    )
+                                    for seq in range(first, end + 1)
+                                ]
+                            )
+                            seqs.extend(range(first, end + 1))
+                    return seqs
+            except OperationalError:  # Locked, wait a bit (random, so concurrent reservations do not collide again)
+                if counter % 5 == 0:
+                    connection.close()
+                time.sleep(random.uniform(0.05, 0.25))  # nosec: not a security random
+            except IntegrityError:  # Concurrent creation, simply retry
+                pass
+            except Exception:
+                logger.exception('Error')
+                return []
+
     def transfer(self, seq: int, toUidGen: 'UniqueIDGenerator') -> bool:
         self.__filter(0, forUpdate=True).filter(owner=self._owner, seq=seq).update(
             owner=toUidGen._owner,  # pylint: disable=protected-access
@@ -52,6 +52,9 @@ def initialize() -> None:
             logger.debug('Registering job: %s', cls.__module__)
             taskManager().registerJob(cls)
 
+    # Modules (services, notifiers, ...) can register their own jobs when imported, so ensure all are
+    modfinder.ensureModulesLoaded()
+
     modfinder.dynamicLoadAndRegisterPackages(
         registerer,
         jobs.Job,
@@ -31,7 +31,8 @@
 """
 import logging
 
-from django.db.models import Count
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
 
 from uds.core.jobs import Job
 from uds import models
@@ -42,6 +43,9 @@ from uds.core.managers.log import objects
 
 logger = logging.getLogger(__name__)
 
+# Max number of owners whose logs are trimmed on a single delete
+DELETE_CHUNK_SIZE = 64
+
 
 class LogMaintenance(Job):
     frecuency = 7200  # Once every two hours
@@ -49,25 +53,30 @@ class LogMaintenance(Job):
     friendly_name = 'Log maintenance'
 
     def run(self) -> None:
-        # Select all disctinct owner_id and owner_type and count of each
-        # For each one, check if it has more than max_elements, and if so, delete the oldest ones
-        for owner_id, owner_type, count in (
-            models.Log.objects.values_list('owner_id', 'owner_type')
-            .annotate(count=Count('owner_id'))
-            .order_by('owner_id')
-        ):
-            # First, ensure we do not have more than requested logs, and we can put one more log item
-            try:
-                ownerType = objects.LogObjectType(owner_type)
-            except ValueError:
-                # If we do not know the owner type, we will delete all logs for this owner
-                models.Log.objects.filter(owner_id=owner_id, owner_type=owner_type).delete()
-                continue
+        # If we do not know the owner type, we will delete all logs for it
+        models.Log.objects.exclude(owner_type__in=[t.value for t in objects.LogObjectType]).delete()
 
+        for ownerType in objects.LogObjectType:
             max_elements = ownerType.get_max_elements()
-            if 0 < max_elements < count:  # Negative max elements means "unlimited"
-                # We will delete the oldest ones
-                for record in models.Log.objects.filter(owner_id=owner_id, owner_type=owner_type).order_by(
-                    'created', 'id'
-                )[: count - max_elements + 1]:
-                    record.delete()
+            if max_elements <= 0:  # Negative max elements means "unlimited"
+                continue
+            # For every owner with too many logs, get (in just one query) the id of the newest record
+            # to remove. We keep max_elements - 1 records, so we can put one more log item
+            thresholds = list(
+                models.Log.objects.filter(owner_type=ownerType.value)
+                .annotate(
+                    position=Window(
+                        expression=RowNumber(),
+                        partition_by=[F('owner_id')],
+                        order_by=F('id').desc(),
+                    )
+                )
+                .filter(position=max_elements)
+                .values_list('owner_id', 'id')
+            )
+            # And remove older records of several owners at once
+            for i in range(0, len(thresholds), DELETE_CHUNK_SIZE):
+                fltr = Q()
+                for owner_id, threshold in thresholds[i : i + DELETE_CHUNK_SIZE]:
+                    fltr |= Q(owner_id=owner_id, id__lte=threshold)
+                models.Log.objects.filter(fltr, owner_type=ownerType.value).delete()
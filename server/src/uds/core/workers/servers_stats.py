@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2023 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import logging
+
+from uds import models
+from uds.core import types
+from uds.core.jobs import Job
+from uds.core.managers.servers import ServerManager
+
+logger = logging.getLogger(__name__)
+
+
+class ServersStatsUpdater(Job):
+    """
+    Keeps the stats of managed servers up to date, so assignation
+    does not need to request them (unless they are too old)
+    """
+
+    frecuency = 60  # Once every minute, stats are valid for 3 minutes (see ServerStats.is_valid)
+    friendly_name = 'Servers stats updater'
+
+    def run(self) -> None:
+        servers = [
+            server
+            # Tunnels & actors does not provide the stats used on assignation
+            for server in models.Server.objects.filter(
+                type=types.servers.ServerType.SERVER, maintenance_mode=False
+            )
+            if not server.isRestrained()
+        ]
+        if not servers:
+            return
+
+        logger.debug('Updating stats of %s servers', len(servers))
+        for stats, server in ServerManager.manager().requestServerStats(servers, force=True):
+            if stats is None:
+                logger.debug('Could not update stats of server %s', server.hostname)
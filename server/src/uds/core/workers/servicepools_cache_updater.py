@@ -32,12 +32,15 @@
 import logging
 import typing
 import collections.abc
+from datetime import timedelta
 
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Q, Count
 from uds.core.util.config import GlobalConfig
 from uds.core.util.state import State
+from uds.core.util.model import getSqlDatetime
 from uds.core.managers.user_service import UserServiceManager
+from uds.core.managers.publication import PublicationRollout
 from uds.core.services.exceptions import MaxServicesReachedError
 from uds.models import ServicePool, ServicePoolPublication, UserService
 from uds.core import services
@@ -46,6 +49,9 @@ from uds.core.jobs import Job
 
 logger = logging.getLogger(__name__)
 
+# Counters of a service pool: (cache L1, cache L2, assigned)
+CacheCounters = tuple[int, int, int]
+
 
 class ServiceCacheUpdater(Job):
     """
@@ -71,29 +77,155 @@ class ServiceCacheUpdater(Job):
         )
         logger.info('%s is restrained, will check this later', servicePool.name)
 
+    @staticmethod
+    def countersFor(
+        servicePools: collections.abc.Iterable[ServicePool],
+    ) -> tuple[dict[int, CacheCounters], dict[int, int]]:
+        """
+        Computes, with a single query, the cache counters of all the service pools provided
+        (only user services in a state valid for the accounting method of its service are counted)
+        and the number of errors of every one of them inside the restraint window.
+
+        Returns:
+            A tuple with two dictionaries, keyed by service pool id:
+                * (cache L1, cache L2, assigned) counters
+                * number of recent errors
+        """
+        validStates: dict[int, collections.abc.Container[str]] = {
+            servicePool.id: (
+                (State.PREPARING, State.USABLE)
+                if servicePool.service.oldMaxAccountingMethod  # type: ignore
+                else (State.PREPARING, State.USABLE, State.REMOVING, State.REMOVABLE)
+            )
+            for servicePool in servicePools
+        }
+        counters: dict[int, list[int]] = {poolId: [0, 0, 0] for poolId in validStates}
+        errors: dict[int, int] = {poolId: 0 for poolId in validStates}
+
+        restraintDate = getSqlDatetime() - timedelta(seconds=max(GlobalConfig.RESTRAINT_TIME.getInt(), 0))
+        for row in (
+            UserService.objects.filter(
+                deployed_service_id__in=validStates.keys(),
+                state__in=(State.PREPARING, State.USABLE, State.REMOVING, State.REMOVABLE, State.ERROR),
+            )
+            .values('deployed_service_id', 'cache_level', 'state')
+            .annotate(
+                total=Count('id'),
+                recent=Count('id', filter=Q(state_date__gt=restraintDate)),
+            )
+            .order_by()
+        ):
+            poolId = row['deployed_service_id']
+            if row['state'] == State.ERROR:
+                errors[poolId] += row['recent']
+            elif row['state'] in validStates[poolId]:
+                level = row['cache_level']
+                # Cache levels are L1 = 1 and L2 = 2, assigned ones are 0 and goes to the end
+                counters[poolId][level - 1 if level else 2] += row['total']
+
+        return {poolId: (c[0], c[1], c[2]) for poolId, c in counters.items()}, errors
+
+    @staticmethod
+    def isRestrained(servicePool: ServicePool, errors: int) -> bool:
+        """
+        Same as ServicePool.isRestrained, but using the already counted number of recent errors
+        """
+        if GlobalConfig.RESTRAINT_TIME.getInt() <= 0:
+            return False
+        return errors >= GlobalConfig.RESTRAINT_COUNT.getInt()
+
+    def needsCacheUpdate(self, servicePool: ServicePool, cacheL1: int, cacheL2: int, assigned: int) -> bool:
+        """
+        Checks, using the counters provided, if the cache of the service pool needs to be updated
+        (cacheL2 must be 0 for services that do not use L2 cache)
+        """
+        # if we bypasses max cache, we will reduce it in first place. This is so because this will free resources on service provider
+        logger.debug(
+            "Examining %s with %s in cache L1 and %s in cache L2, %s inAssigned",
+            servicePool.name,
+            cacheL1,
+            cacheL2,
+            assigned,
+        )
+        totalL1Assigned = cacheL1 + assigned
+
+        # We have more than we want
+        if totalL1Assigned > servicePool.max_srvs:
+            logger.debug('We have more services than max configured. skipping.')
+            return True
+        # We have more in L1 cache than needed
+        if totalL1Assigned > servicePool.initial_srvs and cacheL1 > servicePool.cache_l1_srvs:
+            logger.debug('We have more services in cache L1 than configured, appending')
+            return True
+
+        # If we have more in L2 cache than needed, decrease L2 cache, but int this case, we continue checking cause L2 cache removal
+        # has less priority than l1 creations or removals, but higher. In this case, we will simply take last l2 oversized found and reduce it
+        if cacheL2 > servicePool.cache_l2_srvs:
+            logger.debug('We have more services in L2 cache than configured, appending')
+            return True
+
+        # If wee need to grow l2 cache, annotate it
+        # Whe check this before checking the total, because the l2 cache is independent of max services or l1 cache.
+        # It reflects a value that must be keeped in cache for futre fast use.
+        needsL2 = cacheL2 < servicePool.cache_l2_srvs
+        # We skip L1 growing if already at max
+        needsL1 = totalL1Assigned < servicePool.max_srvs and (
+            totalL1Assigned < servicePool.initial_srvs or cacheL1 < servicePool.cache_l1_srvs
+        )
+
+        if not needsL1 and not needsL2:
+            return False
+
+        # If this service don't allows more starting user services, continue
+        if not UserServiceManager().canGrowServicePool(servicePool):
+            logger.debug(
+                'This pool cannot grow rithg now: %s',
+                servicePool,
+            )
+            return False
+
+        logger.debug('Needs to grow %s cache for %s', 'L2' if needsL2 else 'L1', servicePool)
+        return True
+
     def servicesPoolsNeedingCacheUpdate(
         self,
     ) -> list[tuple[ServicePool, int, int, int]]:
         # State filter for cached and inAssigned objects
         # First we get all deployed services that could need cache generation
         # We start filtering out the deployed services that do not need caching at all.
-        servicePoolsNeedingCaching: collections.abc.Iterable[ServicePool] = (
+        servicePoolsNeedingCaching: list[ServicePool] = list(
             ServicePool.objects.filter(Q(initial_srvs__gte=0) | Q(cache_l1_srvs__gte=0))
             .filter(
                 max_srvs__gt=0,
                 state=State.ACTIVE,
                 service__provider__maintenance_mode=False,
             )
-            .iterator()
+            .select_related('service', 'service__provider')
         )
 
+        if not servicePoolsNeedingCaching:
+            return []
+
+        # Publications states and user services counters are obtained for all pools at once
+        publicationStates: dict[int, set[str]] = {}
+        for poolId, pubState in (
+            ServicePoolPublication.objects.filter(
+                deployed_service__in=servicePoolsNeedingCaching,
+                state__in=(State.USABLE, State.PREPARING),
+            )
+            .values_list('deployed_service_id', 'state')
+            .distinct()
+        ):
+            publicationStates.setdefault(poolId, set()).add(pubState)
+
+        counters, errors = ServiceCacheUpdater.countersFor(servicePoolsNeedingCaching)
+
         # We will get the one that proportionally needs more cache
         servicesPools: list[tuple[ServicePool, int, int, int]] = []
         for servicePool in servicePoolsNeedingCaching:
-            servicePool.userServices.update()  # Cleans cached queries
             # If this deployedService don't have a publication active and needs it, ignore it
             spServiceInstance = servicePool.service.getInstance()  # type: ignore
-            
+
             if spServiceInstance.usesCache is False:
                 logger.debug(
                     'Skipping cache generation for service pool that does not uses cache: %s',
@@ -101,21 +233,22 @@ class ServiceCacheUpdater(Job):
                 )
                 continue
 
-            if servicePool.activePublication() is None and spServiceInstance.publicationType is not None:
+            poolPublications = publicationStates.get(servicePool.id, set())
+            if State.USABLE not in poolPublications and spServiceInstance.publicationType is not None:
                 logger.debug(
                     'Skipping. %s Needs publication but do not have one',
                     servicePool.name,
                 )
                 continue
             # If it has any running publication, do not generate cache anymore
-            if servicePool.publications.filter(state=State.PREPARING).count() > 0:
+            if State.PREPARING in poolPublications:
                 logger.debug(
                     'Skipping cache generation for service pool with publication running: %s',
                     servicePool.name,
                 )
                 continue
 
-            if servicePool.isRestrained():
+            if ServiceCacheUpdater.isRestrained(servicePool, errors[servicePool.id]):
                 logger.debug(
                     'StopSkippingped cache generation for restrained service pool: %s',
                     servicePool.name,
@@ -126,71 +259,11 @@ class ServiceCacheUpdater(Job):
             # Get data related to actual state of cache
             # Before we were removing the elements marked to be destroyed after creation, but this makes us
             # to create new items over the limit stablisshed, so we will not remove them anymore
-            inCacheL1: int = (
-                servicePool.cachedUserServices()
-                .filter(UserServiceManager().getCacheStateFilter(servicePool, services.UserService.L1_CACHE))
-                .count()
-            )
-            inCacheL2: int = (
-                servicePool.cachedUserServices()
-                .filter(UserServiceManager().getCacheStateFilter(servicePool, services.UserService.L2_CACHE))
-                .count()
-            ) if spServiceInstance.usesCache_L2 else 0
-            inAssigned: int = (
-                servicePool.assignedUserServices()
-                .filter(UserServiceManager().getStateFilter(servicePool.service))  # type: ignore
-                .count()
-            )
-            # if we bypasses max cache, we will reduce it in first place. This is so because this will free resources on service provider
-            logger.debug(
-                "Examining %s with %s in cache L1 and %s in cache L2, %s inAssigned",
-                servicePool.name,
-                inCacheL1,
-                inCacheL2,
-                inAssigned,
-            )
-            totalL1Assigned = inCacheL1 + inAssigned
-
-            # We have more than we want
-            if totalL1Assigned > servicePool.max_srvs:
-                logger.debug('We have more services than max configured. skipping.')
-                servicesPools.append((servicePool, inCacheL1, inCacheL2, inAssigned))
-                continue
-            # We have more in L1 cache than needed
-            if totalL1Assigned > servicePool.initial_srvs and inCacheL1 > servicePool.cache_l1_srvs:
-                logger.debug('We have more services in cache L1 than configured, appending')
-                servicesPools.append((servicePool, inCacheL1, inCacheL2, inAssigned))
-                continue
-
-            # If we have more in L2 cache than needed, decrease L2 cache, but int this case, we continue checking cause L2 cache removal
-            # has less priority than l1 creations or removals, but higher. In this case, we will simply take last l2 oversized found and reduce it
-            if spServiceInstance.usesCache_L2 and inCacheL2 > servicePool.cache_l2_srvs:
-                logger.debug('We have more services in L2 cache than configured, appending')
-                servicesPools.append((servicePool, inCacheL1, inCacheL2, inAssigned))
-                continue
-
-            # If this service don't allows more starting user services, continue
-            if not UserServiceManager().canGrowServicePool(servicePool):
-                logger.debug(
-                    'This pool cannot grow rithg now: %s',
-                    servicePool,
-                )
-                continue
-
-            # If wee need to grow l2 cache, annotate it
-            # Whe check this before checking the total, because the l2 cache is independent of max services or l1 cache.
-            # It reflects a value that must be keeped in cache for futre fast use.
-            if inCacheL2 < servicePool.cache_l2_srvs:
-                logger.debug('Needs to grow L2 cache for %s', servicePool)
-                servicesPools.append((servicePool, inCacheL1, inCacheL2, inAssigned))
-                continue
-
-            # We skip it if already at max
-            if totalL1Assigned == servicePool.max_srvs:
-                continue
+            inCacheL1, inCacheL2, inAssigned = counters[servicePool.id]
+            if not spServiceInstance.usesCache_L2:
+                inCacheL2 = 0
 
-            if totalL1Assigned < servicePool.initial_srvs or inCacheL1 < servicePool.cache_l1_srvs:
-                logger.debug('Needs to grow L1 cache for %s', servicePool)
+            if self.needsCacheUpdate(servicePool, inCacheL1, inCacheL2, inAssigned):
                 servicesPools.append((servicePool, inCacheL1, inCacheL2, inAssigned))
 
         # We also return calculated values so we can reuse then
@@ -199,16 +272,19 @@ class ServiceCacheUpdater(Job):
     def growL1Cache(
         self,
         servicePool: ServicePool,
-        cacheL1: int,  # pylint: disable=unused-argument
+        cacheL1: int,
         cacheL2: int,
-        assigned: int,  # pylint: disable=unused-argument
-    ) -> None:
+        assigned: int,
+    ) -> typing.Optional[CacheCounters]:
         """
         This method tries to enlarge L1 cache.
 
         If for some reason the number of deployed services (Counting all, ACTIVE
         and PREPARING, assigned, L1 and L2) is over max allowed service deployments,
         this method will not grow the L1 cache
+
+        Returns:
+            The updated counters, or None if the cache could not be grown
         """
         logger.debug('Growing L1 cache creating a new service for %s', servicePool.name)
         # First, we try to assign from L2 cache
@@ -233,13 +309,14 @@ class ServiceCacheUpdater(Job):
 
             if valid is not None:
                 valid.moveToLevel(services.UserService.L1_CACHE)
-                return
+                return cacheL1 + 1, cacheL2 - 1, assigned
         try:
             # This has a velid publication, or it will not be here
             UserServiceManager().createCacheFor(
                 typing.cast(ServicePoolPublication, servicePool.activePublication()),
                 services.UserService.L1_CACHE,
             )
+            return cacheL1 + 1, cacheL2, assigned
         except MaxServicesReachedError:
             log.doLog(
                 servicePool,
@@ -254,20 +331,24 @@ class ServiceCacheUpdater(Job):
             )
         except Exception:
             logger.exception('Exception')
+        return None
 
     def growL2Cache(
         self,
         servicePool: ServicePool,
-        cacheL1: int,  # pylint: disable=unused-argument
-        cacheL2: int,  # pylint: disable=unused-argument
-        assigned: int,  # pylint: disable=unused-argument
-    ) -> None:
+        cacheL1: int,
+        cacheL2: int,
+        assigned: int,
+    ) -> typing.Optional[CacheCounters]:
         """
         Tries to grow L2 cache of service.
 
         If for some reason the number of deployed services (Counting all, ACTIVE
         and PREPARING, assigned, L1 and L2) is over max allowed service deployments,
         this method will not grow the L1 cache
+
+        Returns:
+            The updated counters, or None if the cache could not be grown
         """
         logger.debug("Growing L2 cache creating a new service for %s", servicePool.name)
         try:
@@ -276,6 +357,7 @@ class ServiceCacheUpdater(Job):
                 typing.cast(ServicePoolPublication, servicePool.activePublication()),
                 services.UserService.L2_CACHE,
             )
+            return cacheL1, cacheL2 + 1, assigned
         except MaxServicesReachedError:
             logger.warning(
                 'Max user services reached for %s: %s. Cache not created',
@@ -283,14 +365,15 @@ class ServiceCacheUpdater(Job):
                 servicePool.max_srvs,
             )
             # TODO: When alerts are ready, notify this
+        return None
 
     def reduceL1Cache(
         self,
         servicePool: ServicePool,
-        cacheL1: int,  # pylint: disable=unused-argument
+        cacheL1: int,
         cacheL2: int,
-        assigned: int,  # pylint: disable=unused-argument
-    ):
+        assigned: int,
+    ) -> typing.Optional[CacheCounters]:
         logger.debug("Reducing L1 cache erasing a service in cache for %s", servicePool)
         # We will try to destroy the newest cacheL1 element that is USABLE if the deployer can't cancel a new service creation
         # Here, we will take into account the "remove_after" marked user services, so we don't try to remove them
@@ -307,7 +390,7 @@ class ServiceCacheUpdater(Job):
             logger.debug(
                 'There is more services than max configured, but could not reduce cache L1 cause its already empty'
             )
-            return
+            return None
 
         if cacheL2 < servicePool.cache_l2_srvs:
             valid = None
@@ -322,18 +405,19 @@ class ServiceCacheUpdater(Job):
 
             if valid is not None:
                 valid.moveToLevel(services.UserService.L2_CACHE)
-                return
+                return cacheL1 - 1, cacheL2 + 1, assigned
 
         cache = cacheItems[0]
         cache.removeOrCancel()
+        return cacheL1 - 1, cacheL2, assigned
 
     def reduceL2Cache(
         self,
         servicePool: ServicePool,
-        cacheL1: int,  # pylint: disable=unused-argument
+        cacheL1: int,
         cacheL2: int,
-        assigned: int,  # pylint: disable=unused-argument
-    ):
+        assigned: int,
+    ) -> typing.Optional[CacheCounters]:
         logger.debug("Reducing L2 cache erasing a service in cache for %s", servicePool.name)
         if cacheL2 > 0:
             cacheItems = (
@@ -342,35 +426,89 @@ class ServiceCacheUpdater(Job):
                 .order_by('creation_date')
             )
             # TODO: Look first for non finished cache items and cancel them?
-            cache: UserService = cacheItems[0]
-            cache.removeOrCancel()
+            cache: typing.Optional[UserService] = cacheItems.first()
+            if cache is not None:
+                cache.removeOrCancel()
+                return cacheL1, cacheL2 - 1, assigned
+        return None
+
+    @staticmethod
+    def isRollingOut(servicePool: ServicePool) -> bool:
+        progress = PublicationRollout.progress(servicePool)
+        return progress is not None and progress.isRunning()
+
+    def updateCache(
+        self,
+        servicePool: ServicePool,
+        cacheL1: int,
+        cacheL2: int,
+        assigned: int,
+    ) -> typing.Optional[CacheCounters]:
+        """
+        Executes one step (one user service created, moved or removed) of the cache update of a service pool
+
+        Returns:
+            The updated counters, or None if nothing could be done
+        """
+        # We have cache to update??
+        logger.debug("Updating cache for %s", servicePool)
+        totalL1Assigned = cacheL1 + assigned
+
+        # We try first to reduce cache before tring to increase it.
+        # This means that if there is excesive number of user deployments
+        # for L1 or L2 cache, this will be reduced untill they have good numbers.
+        # This is so because service can have limited the number of services and,
+        # if we try to increase cache before having reduced whatever needed
+        # first, the service will get lock until someone removes something.
+        if (
+            totalL1Assigned > servicePool.max_srvs
+            or (totalL1Assigned > servicePool.initial_srvs and cacheL1 > servicePool.cache_l1_srvs)
+            or cacheL2 > servicePool.cache_l2_srvs
+        ) and self.isRollingOut(servicePool):
+            # Services of previous publication being replaced are still counted,
+            # so the excess is only apparent and will be gone as they are removed
+            logger.debug('Not reducing cache of %s, publication rollout in progress', servicePool)
+            return None
+        if totalL1Assigned > servicePool.max_srvs:
+            return self.reduceL1Cache(servicePool, cacheL1, cacheL2, assigned)
+        if totalL1Assigned > servicePool.initial_srvs and cacheL1 > servicePool.cache_l1_srvs:
+            return self.reduceL1Cache(servicePool, cacheL1, cacheL2, assigned)
+        if cacheL2 > servicePool.cache_l2_srvs:  # We have excesives L2 items
+            return self.reduceL2Cache(servicePool, cacheL1, cacheL2, assigned)
+        if totalL1Assigned < servicePool.max_srvs and (
+            totalL1Assigned < servicePool.initial_srvs or cacheL1 < servicePool.cache_l1_srvs
+        ):  # We need more services
+            return self.growL1Cache(servicePool, cacheL1, cacheL2, assigned)
+        if cacheL2 < servicePool.cache_l2_srvs:  # We need more L2 items
+            return self.growL2Cache(servicePool, cacheL1, cacheL2, assigned)
+
+        logger.warning("We have more services than max requested for %s", servicePool.name)
+        return None
 
     def run(self) -> None:
         logger.debug('Starting cache checking')
+        maxSteps = max(GlobalConfig.CACHE_UPDATE_STEPS.getInt(), 1)
+        budget = GlobalConfig.CACHE_UPDATE_BUDGET.getInt()
+        unlimited = budget <= 0
+
         # We need to get
-        servicesThatNeedsUpdate = self.servicesPoolsNeedingCacheUpdate()
-        for servicePool, cacheL1, cacheL2, assigned in servicesThatNeedsUpdate:
-            # We have cache to update??
-            logger.debug("Updating cache for %s", servicePool)
-            totalL1Assigned = cacheL1 + assigned
-
-            # We try first to reduce cache before tring to increase it.
-            # This means that if there is excesive number of user deployments
-            # for L1 or L2 cache, this will be reduced untill they have good numbers.
-            # This is so because service can have limited the number of services and,
-            # if we try to increase cache before having reduced whatever needed
-            # first, the service will get lock until someone removes something.
-            if totalL1Assigned > servicePool.max_srvs:
-                self.reduceL1Cache(servicePool, cacheL1, cacheL2, assigned)
-            elif totalL1Assigned > servicePool.initial_srvs and cacheL1 > servicePool.cache_l1_srvs:
-                self.reduceL1Cache(servicePool, cacheL1, cacheL2, assigned)
-            elif cacheL2 > servicePool.cache_l2_srvs:  # We have excesives L2 items
-                self.reduceL2Cache(servicePool, cacheL1, cacheL2, assigned)
-            elif totalL1Assigned < servicePool.max_srvs and (
-                totalL1Assigned < servicePool.initial_srvs or cacheL1 < servicePool.cache_l1_srvs
-            ):  # We need more services
-                self.growL1Cache(servicePool, cacheL1, cacheL2, assigned)
-            elif cacheL2 < servicePool.cache_l2_srvs:  # We need more L2 items
-                self.growL2Cache(servicePool, cacheL1, cacheL2, assigned)
-            else:
-                logger.warning("We have more services than max requested for %s", servicePool.name)
+        pending = self.servicesPoolsNeedingCacheUpdate()
+        # Pools are updated in rounds, one step for every pool on each round, so the budget
+        # is shared among them. The first step of every pool is always done, as before, so
+        # no pool can starve waiting for budget
+        for step in range(maxSteps):
+            nextRound: list[tuple[ServicePool, int, int, int]] = []
+            for servicePool, cacheL1, cacheL2, assigned in pending:
+                if step > 0:
+                    if not unlimited and budget <= 0:
+                        break
+                    # First step counters were already checked by servicesPoolsNeedingCacheUpdate
+                    if not self.needsCacheUpdate(servicePool, cacheL1, cacheL2, assigned):
+                        continue
+                counters = self.updateCache(servicePool, cacheL1, cacheL2, assigned)
+                budget -= 1
+                if counters is not None:
+                    nextRound.append((servicePool, *counters))
+            pending = nextRound
+            if not pending:
+                break
@@ -28,15 +28,22 @@
 """
  Author: Adolfo Gómez, dkmaster at dkmon dot com
 """
+import collections
+import copy
 import datetime
 import logging
+import threading
+import time
 import typing
 import collections.abc
+import uuid
 
+from django.db.models import signals
 from django.http import HttpResponseForbidden
 from django.utils import timezone
 
 from uds.core.util import os_detector as OsDetector
+from uds.core.util.cache import Cache
 from uds.core.util.config import GlobalConfig
 from uds.core.auths.auth import (
     AUTHORIZED_KEY,
@@ -46,7 +53,7 @@ from uds.core.auths.auth import (
     getRootUser,
     webLogout,
 )
-from uds.models import User
+from uds.models import Authenticator, User
 
 from . import builder
 
@@ -60,6 +67,103 @@ logger = logging.getLogger(__name__)
 # How often to check the requests cache for stuck objects
 CHECK_SECONDS = 3600 * 24  # Once a day is more than enough
 
+# Max number of users kept on the (in process) users cache
+USERS_CACHE_SIZE: typing.Final[int] = 4096
+
+
+class _UsersCache:
+    """
+    Users resolved from sessions (with their authenticator), kept for the session lifetime.
+
+    Every change of an user or an authenticator stores a new stamp for it on the shared cache, so
+    the users cached by any process are discarded when they (or their authenticator) change
+    (stamps are read through the local cache, so this is seen in a few seconds at most)
+
+    Every request gets its own copy of the user and its authenticator, so no instance
+    (nor the authenticator module instantiated from it) is shared among requests
+    """
+
+    lock: typing.ClassVar[threading.Lock] = threading.Lock()
+    users: typing.ClassVar[
+        'collections.OrderedDict[int, tuple[User, typing.Any, typing.Any, float]]'
+    ] = collections.OrderedDict()
+    stamps: typing.ClassVar[Cache] = Cache('middlewareUsers', local=True)
+
+    @staticmethod
+    def get(userId: int, lifetime: int) -> typing.Optional[User]:
+        stamp = _UsersCache.stamps.get(str(userId))
+        with _UsersCache.lock:
+            cached = _UsersCache.users.get(userId)
+        if (
+            cached
+            and cached[1] == stamp
+            and cached[2] == _UsersCache.stamps.get(f'a{cached[0].manager_id}')
+            and cached[3] > time.monotonic()
+        ):
+            return _UsersCache.fresh(cached[0])
+
+        user = User.objects.select_related('manager').get(pk=userId)
+        # Ensure there are stamps, so "no stamp" is not requested to db again and again
+        if stamp is None:
+            stamp = _UsersCache.changed(str(userId), lifetime)
+        authKey = f'a{user.manager_id}'
+        authStamp = _UsersCache.stamps.get(authKey) or _UsersCache.changed(authKey, lifetime)
+        with _UsersCache.lock:
+            _UsersCache.users[userId] = (user, stamp, authStamp, time.monotonic() + lifetime)
+            _UsersCache.users.move_to_end(userId)
+            while len(_UsersCache.users) > USERS_CACHE_SIZE:
+                _UsersCache.users.popitem(last=False)
+        return _UsersCache.fresh(user)
+
+    @staticmethod
+    def fresh(user: User) -> User:
+        """
+        Returns a copy of the cached user, with a copy of its authenticator (not instantiated)
+        and no other related object cached
+        """
+        manager = copy.copy(user.manager)
+        manager._state.fields_cache = {}
+        manager.__dict__.pop('_cachedInstance', None)
+        res = copy.copy(user)
+        res._state.fields_cache = {'manager': manager}
+        res.__dict__.pop('_prefetched_objects_cache', None)
+        return res
+
+    @staticmethod
+    def changed(key: str, lifetime: typing.Optional[int] = None) -> str:
+        stamp = uuid.uuid4().hex
+        _UsersCache.stamps.put(key, stamp, lifetime or GlobalConfig.SESSION_DURATION_ADMIN.getInt())
+        return stamp
+
+    @staticmethod
+    def userChanged(sender: typing.Any, instance: User, **kwargs: typing.Any) -> None:
+        _UsersCache.changed(str(instance.pk))
+        with _UsersCache.lock:
+            _UsersCache.users.pop(instance.pk, None)
+
+    @staticmethod
+    def authenticatorChanged(sender: typing.Any, instance: Authenticator, **kwargs: typing.Any) -> None:
+        _UsersCache.changed(f'a{instance.pk}')
+
+
+signals.post_save.connect(_UsersCache.userChanged, sender=User)
+signals.post_delete.connect(_UsersCache.userChanged, sender=User)
+signals.post_save.connect(_UsersCache.authenticatorChanged, sender=Authenticator)
+signals.post_delete.connect(_UsersCache.authenticatorChanged, sender=Authenticator)
+
+
+class SessionCounters:
+    """
+    Counters of session expiry refreshes
+    """
+
+    refreshed: typing.ClassVar[int] = 0
+    skipped: typing.ClassVar[int] = 0  # Requests where the session did not need to be saved because of expiry
+
+    @staticmethod
+    def asDict() -> dict[str, int]:
+        return {'refreshed': SessionCounters.refreshed, 'skipped': SessionCounters.skipped}
+
 
 def _fill_ips(request: 'ExtendedHttpRequest') -> None:
     """
@@ -109,6 +213,14 @@ def _fill_ips(request: 'ExtendedHttpRequest') -> None:
     logger.debug('ip: %s, ip_proxy: %s', request.ip, request.ip_proxy)
 
 
+def _sessionDuration(user: User) -> int:
+    return (
+        GlobalConfig.SESSION_DURATION_ADMIN.getInt()
+        if user.isStaff()
+        else GlobalConfig.SESSION_DURATION_USER.getInt()
+    )
+
+
 def _get_user(request: 'ExtendedHttpRequest') -> None:
     """
     Ensures request user is the correct user
@@ -120,7 +232,14 @@ def _get_user(request: 'ExtendedHttpRequest') -> None:
             if user_id == ROOT_ID:
                 user = getRootUser()
             else:
-                user = User.objects.get(pk=user_id)
+                # Cached for as long as the longest session
+                user = _UsersCache.get(
+                    user_id,
+                    max(
+                        GlobalConfig.SESSION_DURATION_ADMIN.getInt(),
+                        GlobalConfig.SESSION_DURATION_USER.getInt(),
+                    ),
+                )
         except User.DoesNotExist:
             user = None
 
@@ -155,22 +274,27 @@ def _process_request(request: 'ExtendedHttpRequest') -> typing.Optional['HttpRes
             except Exception:  # nosec: intentionaly catching all exceptions and ignoring them
                 pass  # If fails, we don't care, we just want to logout
             return HttpResponseForbidden(content='Session Expired', content_type='text/plain')
-        # Update session timeout..self.
-        request.session[EXPIRY_KEY] = (
-            now
-            + datetime.timedelta(
-                seconds=GlobalConfig.SESSION_DURATION_ADMIN.getInt()
-                if request.user.isStaff()
-                else GlobalConfig.SESSION_DURATION_USER.getInt()
-            )
-        ).isoformat()  # store as ISO format, str, json serilizable
+        # Update session timeout, but only if enough time has elapsed since last update
+        # (Updating it means that the session will be saved)
+        duration = _sessionDuration(request.user)
+        newExpiry = now + datetime.timedelta(seconds=duration)
+        if newExpiry - expiry >= datetime.timedelta(
+            seconds=duration * GlobalConfig.SESSION_REFRESH_RATIO.getInt() / 100
+        ):
+            request.session[EXPIRY_KEY] = newExpiry.isoformat()  # store as ISO format, str, json serilizable
+            SessionCounters.refreshed += 1
+        else:
+            SessionCounters.skipped += 1
 
     return None
 
 
 def _process_response(request: 'ExtendedHttpRequest', response: 'HttpResponse') -> 'HttpResponse':
     # Update authorized on session
-    if hasattr(request, 'session'):
+    # (only if changed, setting it marks the session as modified, and so, saved)
+    if hasattr(request, 'session') and (
+        AUTHORIZED_KEY not in request.session or request.session[AUTHORIZED_KEY] != request.authorized
+    ):
         request.session[AUTHORIZED_KEY] = request.authorized
     return response
 
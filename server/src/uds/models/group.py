@@ -127,5 +127,17 @@ class Group(UUIDModel):
 
         logger.debug('Deleted group %s', toDelete)
 
+    @staticmethod
+    def afterChange(sender, **kwargs) -> None:  # pylint: disable=unused-argument
+        """
+        Used to discard the cached groups of the authenticator of the changed group
+        """
+        from uds.core.auths.groups_manager import GroupsManager  # pylint: disable=import-outside-toplevel
+
+        GroupsManager.invalidate(kwargs['instance'].manager_id)
+
 
 models.signals.pre_delete.connect(Group.beforeDelete, sender=Group)
+models.signals.post_save.connect(Group.afterChange, sender=Group)
+models.signals.post_delete.connect(Group.afterChange, sender=Group)
+models.signals.m2m_changed.connect(Group.afterChange, sender=Group.groups.through)
@@ -162,41 +162,25 @@ class MetaPool(UUIDModel, TaggingMixin):  # type: ignore
         If no "maximum" number of services, will return 0% ofc
         cachedValue is used to optimize (if known the number of assigned services, we can avoid to query the db)
         """
+        # pylint: disable=import-outside-toplevel
+        from uds.core.managers.userservice.meta_usage import MetaPoolUsage
+
+        members = MetaPoolUsage.get(self)
         # If no pools, return 0%
-        if self.members.count() == 0:
+        if not members:
             return types.pools.UsageInfo(0, 0)
 
-        query = (
-            ServicePool.objects.filter(
-                memberOfMeta__meta_pool=self,
-                state=states.servicePool.ACTIVE,
-            )
-            .annotate(
-                usage_count=models.Count(
-                    'userServices',
-                    filter=models.Q(
-                        userServices__state__in=states.userService.VALID_STATES,
-                        userServices__cache_level=0,
-                    ),
-                    distinct=True,
-                )
-            )
-            .prefetch_related(
-                'service',
-                'service__provider',
-            )
-        )
-
         usage_count = 0
         max_count = 0
-        for pool in query:
-            poolInfo = pool.usage(pool.usage_count)  # type:ignore  # Anotated field
-            usage_count += poolInfo.used
+        for member in members.values():
+            if not member.active:
+                continue
+            usage_count += member.usage.used
             # If any of the pools has no max, then max is -1
-            if max_count == consts.UNLIMITED or poolInfo.total == consts.UNLIMITED:
+            if max_count == consts.UNLIMITED or member.usage.total == consts.UNLIMITED:
                 max_count = consts.UNLIMITED
             else:
-                max_count += poolInfo.total
+                max_count += member.usage.total
 
         if max_count == 0 or max_count == consts.UNLIMITED:
             return types.pools.UsageInfo(usage_count, consts.UNLIMITED)
@@ -235,9 +219,6 @@ class MetaPool(UUIDModel, TaggingMixin):  # type: ignore
             'members__pool',
             'members__pool__service',
             'members__pool__service__provider',
-            'members__pool__image',
-            'members__pool__transports',
-            'members__pool__transports__networks',
             'calendarAccess',
             'calendarAccess__calendar',
             'calendarAccess__calendar__rules',
@@ -278,12 +259,26 @@ class MetaPool(UUIDModel, TaggingMixin):  # type: ignore
         # Clears related permissions
         clean(toDelete)
 
+    @staticmethod
+    def afterChange(sender, **kwargs) -> None:  # pylint: disable=unused-argument
+        """
+        Used to discard the usage snapshot of the changed meta pool (or of the meta pool of the changed member)
+        """
+        from uds.core.managers.userservice.meta_usage import (  # pylint: disable=import-outside-toplevel
+            MetaPoolUsage,
+        )
+
+        instance = kwargs['instance']
+        MetaPoolUsage.invalidate(instance.id if isinstance(instance, MetaPool) else instance.meta_pool_id)
+
     def __str__(self):
         return f'Meta pool: {self.name}, no. pools: {self.members.all().count()}, visible: {self.visible}, policy: {self.policy}'
 
 
 # Connects a pre deletion signal
 signals.pre_delete.connect(MetaPool.beforeDelete, sender=MetaPool)
+signals.post_save.connect(MetaPool.afterChange, sender=MetaPool)
+signals.post_delete.connect(MetaPool.afterChange, sender=MetaPool)
 
 
 class MetaPoolMember(UUIDModel):
@@ -302,3 +297,7 @@ class MetaPoolMember(UUIDModel):
 
     def __str__(self) -> str:
         return f'Meta pool member: {self.pool.name}/{self.meta_pool.name}, priority: {self.priority}, enabled: {self.enabled}'
+
+
+signals.post_save.connect(MetaPool.afterChange, sender=MetaPoolMember)
+signals.post_delete.connect(MetaPool.afterChange, sender=MetaPoolMember)
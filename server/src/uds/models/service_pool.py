@@ -421,6 +421,7 @@ class ServicePool(UUIDModel, TaggingMixin):  #  type: ignore
         self,
         activePub: typing.Optional['ServicePoolPublication'],
         skipAssigned: bool = False,
+        skipCache: bool = False,
     ):
         """
         Used when a new publication is finished.
@@ -434,6 +435,8 @@ class ServicePool(UUIDModel, TaggingMixin):  #  type: ignore
 
         Args:
             activePub: Active publication used as "current" publication to make checks
+            skipAssigned: If True, assigned user services are not marked
+            skipCache: If True, cache user services are not marked (they are replaced by a publication rollout)
         """
         now = getSqlDatetime()
         nonActivePub: 'ServicePoolPublication'
@@ -446,9 +449,10 @@ class ServicePool(UUIDModel, TaggingMixin):  #  type: ignore
             for userService in nonActivePub.userServices.filter(state=states.userService.PREPARING):
                 userService.cancel()
             with transaction.atomic():
-                nonActivePub.userServices.exclude(cache_level=0).filter(state=states.userService.USABLE).update(
-                    state=states.userService.REMOVABLE, state_date=now
-                )
+                if not skipCache:
+                    nonActivePub.userServices.exclude(cache_level=0).filter(state=states.userService.USABLE).update(
+                        state=states.userService.REMOVABLE, state_date=now
+                    )
                 if not skipAssigned:
                     nonActivePub.userServices.filter(
                         cache_level=0, state=states.userService.USABLE, in_use=False
@@ -39,15 +39,19 @@ The registration of modules is done locating subclases of :py:class:`uds.core.re
 Author: Adolfo Gómez, dkmaster at dkmon dot com
 """
 import logging
+import threading
 import typing
 import collections.abc
 
-from uds.core import reports
+from uds.core import consts, reports
 from uds.core.util import modfinder
 
 logger = logging.getLogger(__name__)
 
-availableReports: list[type['reports.Report']] = []
+# Filled on first access (see __getattr__), unless LAZY_MODULES_LOADING is disabled
+availableReports: list[type['reports.Report']]
+
+_loadLock = threading.Lock()
 
 
 def __loadModules() -> None:
@@ -55,10 +59,11 @@ def __loadModules() -> None:
     This imports all packages that are descendant of this package, and, after that,
     """
     alreadyAdded: typing.Set[str] = set()
+    loaded: list[type[reports.Report]] = []
 
     def addReportCls(cls: type[reports.Report]) -> None:
         alreadyAdded.add(cls.uuid)
-        availableReports.append(cls)
+        loaded.append(cls)
 
     modfinder.dynamicLoadAndRegisterPackages(
         addReportCls,
@@ -66,5 +71,18 @@ def __loadModules() -> None:
         __name__,
         checker=lambda x: x.uuid and x.uuid not in alreadyAdded,  # type: ignore
     )
+    globals()['availableReports'] = loaded
+
+
+def __getattr__(name: str) -> typing.Any:
+    # Reports (and the graphic libraries they use) are only imported when they are needed
+    if name == 'availableReports':
+        with _loadLock:
+            if name not in globals():
+                __loadModules()
+        return globals()[name]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
-__loadModules()
+if not consts.system.LAZY_MODULES_LOADING:
+    __loadModules()
@@ -28,8 +28,10 @@
 """
 Author: Adolfo Gómez, dkmaster at dkmon dot com
 """
+import contextlib
 import threading
 import logging
+import time
 import typing
 import collections.abc
 
@@ -48,33 +50,165 @@ if typing.TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
-lock = threading.Lock()
 
+class ConnectionPool:
+    """
+    Pool of authenticated connections to an oVirt engine.
 
-class Client:
+    Connections are kept open between requests, so the SSO login and TLS handshake are
+    paid only once per connection, and at most MAX_CONNECTIONS requests are issued
+    concurrently to the same engine.
     """
-    Module to manage oVirt connections using ovirtsdk.
 
-    Due to the fact that we can't create two proxy connections at same time, we serialize all access to ovirt platform.
-    Only one request and one live connection can exists at a time.
+    MAX_CONNECTIONS: typing.Final[int] = 4
+    # Connections idle for more than this are tested before being reused, so an expired
+    # session is replaced instead of failing the request
+    CHECK_INTERVAL: typing.Final[int] = 60
 
-    This can waste a lot of time, so use of cache here is more than important to achieve aceptable performance.
+    _pools: typing.ClassVar[dict[str, 'ConnectionPool']] = {}
+    _poolsLock: typing.ClassVar[threading.Lock] = threading.Lock()
 
+    _host: str
+    _username: str
+    _password: str
+    _timeout: int
+    _lock: threading.Lock
+    _semaphore: threading.BoundedSemaphore
+    _idle: list[tuple[ovirt.Connection, float]]
+    _closed: bool
+
+    def __init__(self, host: str, username: str, password: str, timeout: int) -> None:
+        self._host = host
+        self._username = username
+        self._password = password
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(ConnectionPool.MAX_CONNECTIONS)
+        self._idle = []
+        self._closed = False
+
+    @staticmethod
+    def get(owner: str, host: str, username: str, password: str, timeout: int) -> 'ConnectionPool':
+        """
+        Returns the pool of owner (usually, a provider), creating it if needed.
+
+        If the owner had a pool for another engine or credentials, that pool is closed and replaced,
+        so connections of an outdated configuration are not kept open.
+        """
+        with ConnectionPool._poolsLock:
+            pool = ConnectionPool._pools.get(owner)
+            if pool is not None and pool.config() != (host, username, password, timeout):
+                logger.debug('Configuration of %s changed, replacing its connection pool', owner)
+                pool.close()
+                pool = None
+            if pool is None:
+                pool = ConnectionPool(host, username, password, timeout)
+                ConnectionPool._pools[owner] = pool
+            return pool
+
+    def config(self) -> tuple[str, str, str, int]:
+        return (self._host, self._username, self._password, self._timeout)
+
+    def __connect(self) -> ovirt.Connection:
+        try:
+            return ovirt.Connection(
+                url='https://' + self._host + '/ovirt-engine/api',
+                username=self._username,
+                password=self._password,
+                timeout=self._timeout,
+                insecure=True,
+            )  # , debug=True, log=logger )
+        except Exception:
+            logger.exception('Exception connection ovirt at %s', self._host)
+            raise Exception("Can't connet to server at {}".format(self._host))
+
+    @staticmethod
+    def __close(conn: ovirt.Connection) -> None:
+        try:
+            conn.close()
+        except Exception:  # nosec: this is a "best effort" close
+            # Nothing happens, may it was already disconnected
+            pass
+
+    def __borrow(self) -> ovirt.Connection:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                # Last used is the most probable to be still alive
+                conn, lastUsed = self._idle.pop()
+
+            if time.monotonic() - lastUsed < ConnectionPool.CHECK_INTERVAL:
+                return conn
+            if conn.test(raise_exception=False):
+                return conn
+            logger.debug('Discarding stale connection to %s', self._host)
+            ConnectionPool.__close(conn)
+
+        return self.__connect()
+
+    def __return(self, conn: ovirt.Connection) -> None:
+        with self._lock:
+            if not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                return
+        # Connections in use when the pool was closed are closed on return
+        ConnectionPool.__close(conn)
+
+    @contextlib.contextmanager
+    def connection(self) -> typing.Iterator[ovirt.Connection]:
+        """
+        Borrows a connection from the pool for the duration of the block.
+
+        Connections that fail with an authentication or connection error are discarded,
+        so next request will get a freshly authenticated one.
+        """
+        with self._semaphore:
+            conn = self.__borrow()
+            try:
+                yield conn
+            except (ovirt.AuthError, ovirt.ConnectionError):
+                ConnectionPool.__close(conn)
+                raise
+            except BaseException:
+                self.__return(conn)
+                raise
+            else:
+                self.__return(conn)
+
+    def close(self) -> None:
+        """
+        Closes all idle connections of the pool. Connections in use are closed when returned
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            ConnectionPool.__close(conn)
+
+
+class Client:
     """
+    Module to manage oVirt connections using ovirtsdk.
+
+    Connections are borrowed from a pool shared by all clients of the same provider,
+    so several requests can be run concurrently. Even so, the use of cache here is important
+    to achieve aceptable performance.
 
-    cached_api: typing.ClassVar[typing.Optional[ovirt.Connection]] = None
-    cached_api_key: typing.ClassVar[typing.Optional[str]] = None
+    """
 
     CACHE_TIME_LOW = 60 * 5  # Cache time for requests are 5 minutes by default
     CACHE_TIME_HIGH = (
         60 * 30
     )  # Cache time for requests that are less probable to change (as cluster perteinance of a machine)
+    CACHE_TIME_STATE = 10  # Cache time for the machines states of a cluster
 
     _host: str
     _username: str
     _password: str
     _timeout: int
     _cache: 'Cache'
+    _pool: ConnectionPool
     _needsUsbFix = True
 
     def __getKey(self, prefix: str = '') -> str:
@@ -88,41 +222,11 @@ class Client:
             prefix, self._host, self._username, self._password, self._timeout
         )
 
-    def __getApi(self) -> ovirt.Connection:
+    def __api(self) -> typing.ContextManager[ovirt.Connection]:
         """
-        Gets the api connection.
-
-        Again, due to the fact that ovirtsdk don't allow (at this moment, but it's on the "TODO" list) concurrent access to
-        more than one server, we keep only one opened connection.
-
-        Must be accesed "locked", so we can safely alter cached_api and cached_api_key
+        Borrows a connection from the pool, to be used as a context manager
         """
-        aKey = self.__getKey('o-host')
-        # if cached_api_key == aKey:
-        #    return cached_api
-
-        if Client.cached_api:
-            try:
-                Client.cached_api.close()
-            except Exception:  # nosec: this is a "best effort" close
-                # Nothing happens, may it was already disconnected
-                pass
-        try:
-            Client.cached_api_key = aKey
-            Client.cached_api = ovirt.Connection(
-                url='https://' + self._host + '/ovirt-engine/api',
-                username=self._username,
-                password=self._password,
-                timeout=self._timeout,
-                insecure=True,
-            )  # , debug=True, log=logger )
-
-            return Client.cached_api
-        except:
-            logger.exception('Exception connection ovirt at %s', self._host)
-            Client.cached_api = None
-            Client.cached_api_key = None
-            raise Exception("Can't connet to server at {}".format(self._host))
+        return self._pool.connection()
 
     def __init__(
         self,
@@ -131,6 +235,7 @@ class Client:
         password: str,
         timeout: typing.Union[str, int],
         cache: 'Cache',
+        owner: typing.Optional[str] = None,
     ):
         self._host = host
         self._username = username
@@ -138,16 +243,18 @@ class Client:
         self._timeout = int(timeout)
         self._cache = cache
         self._needsUsbFix = True
+        # Pools are kept per owner (provider), or per engine & credentials if no owner is provided
+        self._pool = ConnectionPool.get(
+            owner or self.__getKey('o-host'), host, username, password, self._timeout
+        )
 
     def test(self) -> bool:
         try:
-            lock.acquire(True)
-            return self.__getApi().test()
+            with self.__api() as api:
+                return api.test()
         except Exception as e:
             logger.error('Testing Server failed for oVirt: %s', e)
             return False
-        finally:
-            lock.release()
 
     def isFullyFunctionalVersion(self) -> tuple[bool, str]:
         """
@@ -178,11 +285,7 @@ class Client:
         if val is not None and force is False:
             return val
 
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             vms: collections.abc.Iterable[typing.Any] = api.system_service().vms_service().list()  # type: ignore
 
             logger.debug('oVirt VMS: %s', vms)
@@ -207,9 +310,6 @@ class Client:
 
             return res
 
-        finally:
-            lock.release()
-
     def getClusters(
         self, force: bool = False
     ) -> list[collections.abc.MutableMapping[str, typing.Any]]:
@@ -234,11 +334,7 @@ class Client:
         if val and not force:
             return val
 
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             clusters: list[typing.Any] = api.system_service().clusters_service().list()  # type: ignore
 
             res: list[collections.abc.MutableMapping[str, typing.Any]] = []
@@ -264,9 +360,6 @@ class Client:
 
             return res
 
-        finally:
-            lock.release()
-
     def getClusterInfo(
         self, clusterId: str, force: bool = False
     ) -> collections.abc.MutableMapping[str, typing.Any]:
@@ -291,11 +384,7 @@ class Client:
         if val and not force:
             return val
 
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             c: typing.Any = api.system_service().clusters_service().service(clusterId).get()  # type: ignore
 
             dc = c.data_center
@@ -306,8 +395,6 @@ class Client:
             res = {'name': c.name, 'id': c.id, 'datacenter_id': dc}
             self._cache.put(clKey, res, Client.CACHE_TIME_HIGH)
             return res
-        finally:
-            lock.release()
 
     def getDatacenterInfo(
         self, datacenterId: str, force: bool = False
@@ -342,11 +429,7 @@ class Client:
         if val is not None and force is False:
             return val
 
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             datacenter_service = (
                 api.system_service().data_centers_service().service(datacenterId)
             )
@@ -380,8 +463,6 @@ class Client:
 
             self._cache.put(dcKey, res, Client.CACHE_TIME_HIGH)
             return res
-        finally:
-            lock.release()
 
     def getStorageInfo(
         self, storageId: str, force: bool = False
@@ -411,11 +492,7 @@ class Client:
         if val and not force:
             return val
 
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             dd: typing.Any = api.system_service().storage_domains_service().service(storageId).get()  # type: ignore
 
             res = {
@@ -428,8 +505,6 @@ class Client:
 
             self._cache.put(sdKey, res, Client.CACHE_TIME_LOW)
             return res
-        finally:
-            lock.release()
 
     def makeTemplate(
         self,
@@ -464,11 +539,7 @@ class Client:
             displayType,
         )
 
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             # cluster = ov.clusters_service().service('00000002-0002-0002-0002-0000000002e4') # .get()
             # vm = ov.vms_service().service('e7ff4e00-b175-4e80-9c1f-e50a5e76d347') # .get()
 
@@ -503,8 +574,6 @@ class Client:
             # display=display)
 
             return api.system_service().templates_service().add(template).id  # type: ignore
-        finally:
-            lock.release()
 
     def getTemplateState(self, templateId: str) -> str:
         """
@@ -518,11 +587,7 @@ class Client:
 
         (don't know if ovirt returns something more right now, will test what happens when template can't be published)
         """
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             try:
                 template: typing.Any = (
                     api.system_service().templates_service().service(templateId).get()  # type: ignore
@@ -532,12 +597,11 @@ class Client:
                     return 'removed'
 
                 return template.status.value
+            except (ovirt.AuthError, ovirt.ConnectionError):
+                raise  # Let the pool discard the connection
             except Exception:  # Not found
                 return 'removed'
 
-        finally:
-            lock.release()
-
     def deployFromTemplate(
         self,
         name: str,
@@ -574,11 +638,7 @@ class Client:
             memoryMB,
             guaranteedMB,
         )
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             logger.debug('Deploying machine %s', name)
 
             cluster = ovirt.types.Cluster(id=clusterId)
@@ -607,24 +667,15 @@ class Client:
 
             return api.system_service().vms_service().add(par).id  # type: ignore
 
-        finally:
-            lock.release()
-
     def removeTemplate(self, templateId: str) -> None:
         """
         Removes a template from ovirt server
 
         Returns nothing, and raises an Exception if it fails
         """
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             api.system_service().templates_service().service(templateId).remove()  # type: ignore
             # This returns nothing, if it fails it raises an exception
-        finally:
-            lock.release()
 
     def getMachineState(self, machineId: str) -> str:
         """
@@ -642,11 +693,7 @@ class Client:
              suspended, image_illegal, image_locked or powering_down
              Also can return'unknown' if Machine is not known
         """
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             try:
                 vm = api.system_service().vms_service().service(machineId).get()  # type: ignore
 
@@ -654,11 +701,50 @@ class Client:
                     return 'unknown'
 
                 return vm.status.value  # type: ignore
+            except (ovirt.AuthError, ovirt.ConnectionError):
+                raise  # Let the pool discard the connection
             except Exception:  # machine not found
                 return 'unknown'
 
-        finally:
-            lock.release()
+    def getMachinesState(self, clusterId: typing.Optional[str] = None, force: bool = False) -> dict[str, str]:
+        """
+        Returns current state of all machines of a cluster (or all machines if no cluster is provided),
+        listing them with a single request.
+        The result is cached for a few seconds, so checking a lot of machines of the same cluster
+        does not hits the oVirt server for every one of them.
+
+        Args:
+            clusterId: Id of the cluster, or None for all clusters
+            force: If true, force to update the cache
+
+        Returns:
+            A dictionary, machine id -> state (see getMachineState for possible values)
+            Machines not present in the dictionary are not known by oVirt
+        """
+        stKey = self.__getKey('o-states' + (clusterId or ''))
+        val: typing.Optional[dict[str, str]] = self._cache.get(stKey)
+
+        if val is not None and not force:
+            return val
+
+        search = (
+            'cluster="{}"'.format(self.getClusterInfo(clusterId)['name'])
+            if clusterId
+            else None
+        )
+
+        with self.__api() as api:
+            vms: collections.abc.Iterable[typing.Any] = api.system_service().vms_service().list(  # type: ignore
+                search=search
+            )
+
+            res: dict[str, str] = {
+                vm.id: vm.status.value if vm.status is not None else 'unknown'
+                for vm in vms
+            }
+
+        self._cache.put(stKey, res, Client.CACHE_TIME_STATE)
+        return res
 
     def startMachine(self, machineId: str) -> None:
         """
@@ -671,11 +757,7 @@ class Client:
 
         Returns:
         """
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             vmService: typing.Any = (
                 api.system_service().vms_service().service(machineId)
             )
@@ -685,9 +767,6 @@ class Client:
 
             vmService.start()
 
-        finally:
-            lock.release()
-
     def stopMachine(self, machineId: str) -> None:
         """
         Tries to start a machine. No check is done, it is simply requested to oVirt
@@ -697,11 +776,7 @@ class Client:
 
         Returns:
         """
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             vmService: typing.Any = (
                 api.system_service().vms_service().service(machineId)
             )
@@ -711,9 +786,6 @@ class Client:
 
             vmService.stop()
 
-        finally:
-            lock.release()
-
     def suspendMachine(self, machineId: str) -> None:
         """
         Tries to start a machine. No check is done, it is simply requested to oVirt
@@ -723,11 +795,7 @@ class Client:
 
         Returns:
         """
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             vmService: typing.Any = (
                 api.system_service().vms_service().service(machineId)
             )
@@ -737,9 +805,6 @@ class Client:
 
             vmService.suspend()
 
-        finally:
-            lock.release()
-
     def removeMachine(self, machineId: str) -> None:
         """
         Tries to delete a machine. No check is done, it is simply requested to oVirt
@@ -749,11 +814,7 @@ class Client:
 
         Returns:
         """
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             vmService: typing.Any = (
                 api.system_service().vms_service().service(machineId)
             )
@@ -763,18 +824,11 @@ class Client:
 
             vmService.remove()
 
-        finally:
-            lock.release()
-
     def updateMachineMac(self, machineId: str, macAddres: str) -> None:
         """
         Changes the mac address of first nic of the machine to the one specified
         """
-        try:
-            lock.acquire(True)
-
-            api = self.__getApi()
-
+        with self.__api() as api:
             vmService: typing.Any = (
                 api.system_service().vms_service().service(machineId)
             )
@@ -782,31 +836,24 @@ class Client:
             if vmService.get() is None:
                 raise Exception('Machine not found')
 
-            nic = vmService.nics_service().list()[
-                0
-            ]  # If has no nic, will raise an exception (IndexError)
+            try:
+                nic = vmService.nics_service().list()[
+                    0
+                ]  # If has no nic, will raise an exception (IndexError)
+            except IndexError:
+                raise Exception('Machine do not have network interfaces!!')
             nic.mac.address = macAddres
             nicService = vmService.nics_service().service(nic.id)
             nicService.update(nic)
-        except IndexError:
-            raise Exception('Machine do not have network interfaces!!')
-
-        finally:
-            lock.release()
 
     def fixUsb(self, machineId: str) -> None:
         # Fix for usb support
         if self._needsUsbFix:
-            try:
-                lock.acquire(True)
-
-                api = self.__getApi()
+            with self.__api() as api:
                 usb = ovirt.types.Usb(enabled=True, type=ovirt.types.UsbType.NATIVE)
                 vms: typing.Any = api.system_service().vms_service().service(machineId)
                 vmu = ovirt.types.Vm(usb=usb)
                 vms.update(vmu)
-            finally:
-                lock.release()
 
     def getConsoleConnection(
         self, machineId: str
@@ -815,55 +862,49 @@ class Client:
         Gets the connetion info for the specified machine
         """
         try:
-            lock.acquire(True)
-            api = self.__getApi()
-
-            vmService: typing.Any = (
-                api.system_service().vms_service().service(machineId)
-            )
-            vm = vmService.get()
+            with self.__api() as api:
+                vmService: typing.Any = (
+                    api.system_service().vms_service().service(machineId)
+                )
+                vm = vmService.get()
 
-            if vm is None:
-                raise Exception('Machine not found')
+                if vm is None:
+                    raise Exception('Machine not found')
 
-            display = vm.display
-            ticket = vmService.ticket()
+                display = vm.display
+                ticket = vmService.ticket()
 
-            # Get host subject
-            cert_subject = ''
-            if display.certificate is not None:
-                cert_subject = display.certificate.subject
-            else:
-                for i in typing.cast(
-                    collections.abc.Iterable, api.system_service().hosts_service().list()
-                ):
-                    for k in typing.cast(
-                        collections.abc.Iterable,
-                        api.system_service()
-                        .hosts_service()
-                        .service(i.id)
-                        .nics_service()  # type: ignore
-                        .list(),
+                # Get host subject
+                cert_subject = ''
+                if display.certificate is not None:
+                    cert_subject = display.certificate.subject
+                else:
+                    for i in typing.cast(
+                        collections.abc.Iterable, api.system_service().hosts_service().list()
                     ):
-                        if k.ip.address == display.address:
-                            cert_subject = i.certificate.subject
+                        for k in typing.cast(
+                            collections.abc.Iterable,
+                            api.system_service()
+                            .hosts_service()
+                            .service(i.id)
+                            .nics_service()  # type: ignore
+                            .list(),
+                        ):
+                            if k.ip.address == display.address:
+                                cert_subject = i.certificate.subject
+                                break
+                        # If found
+                        if cert_subject != '':
                             break
-                    # If found
-                    if cert_subject != '':
-                        break
-
-            return {
-                'type': display.type.value,
-                'address': display.address,
-                'port': display.port,
-                'secure_port': display.secure_port,
-                'monitors': display.monitors,
-                'cert_subject': cert_subject,
-                'ticket': {'value': ticket.value, 'expiry': ticket.expiry},
-            }
 
+                return {
+                    'type': display.type.value,
+                    'address': display.address,
+                    'port': display.port,
+                    'secure_port': display.secure_port,
+                    'monitors': display.monitors,
+                    'cert_subject': cert_subject,
+                    'ticket': {'value': ticket.value, 'expiry': ticket.expiry},
+                }
         except Exception:
             return None
-
-        finally:
-            lock.release()
@@ -89,6 +89,8 @@ class OVirtLinkedDeployment(services.UserService):
     _vmid: str
     _reason: str
     _queue: list[int]
+    # State of the machine obtained in bulk from provider, only for current check (not marshaled)
+    _bulkState: typing.Optional[str] = None
 
     # Utility overrides for type checking...
     def service(self) -> 'OVirtLinkedService':
@@ -293,7 +295,11 @@ if sys.platform == 'win32':
             self._name,
             chkState,
         )
-        state = self.service().getMachineState(self._vmid)
+        if self._bulkState is not None:
+            # Use it only once, further operations on this check must get a fresh state
+            state, self._bulkState = self._bulkState, None
+        else:
+            state = self.service().getMachineState(self._vmid)
 
         # If we want to check an state and machine does not exists (except in case that we whant to check this)
         if state == 'unknown' and chkState != 'unknown':
@@ -590,6 +596,17 @@ if sys.platform == 'win32':
         except Exception as e:
             return self.__error(e)
 
+    def checkStateFrom(self, states: collections.abc.Mapping[str, typing.Any]) -> str:
+        """
+        Checks the state using the machines states obtained in bulk from provider.
+        If our machine is not there, state is requested as usual
+        """
+        self._bulkState = states.get(self._vmid)
+        try:
+            return self.checkState()
+        finally:
+            self._bulkState = None
+
     def moveToCache(self, newLevel: int) -> str:
         """
         Moves machines between cache levels
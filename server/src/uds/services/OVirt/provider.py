@@ -180,10 +180,8 @@ class OVirtProvider(
     # Own variables
     _api: typing.Optional[client.Client] = None
 
-    # oVirt engine, right now, only permits a connection to one server and only one per instance
-    # If we want to connect to more than one server, we need keep locked access to api, change api server, etc..
-    # We have implemented an "exclusive access" client that will only connect to one server at a time (using locks)
-    # and this way all will be fine
+    # Connections to oVirt engine are pooled and shared by all clients of the same provider
+    # (see client.ConnectionPool), so creating a client per instance is cheap
     def __getApi(self) -> client.Client:
         """
         Returns the connection API object for oVirt (using ovirtsdk)
@@ -195,6 +193,7 @@ class OVirtProvider(
                 self.password.value,
                 self.timeout.value,
                 self.cache,
+                owner=self.env.key,
             )
 
         return self._api
@@ -402,6 +401,26 @@ class OVirtProvider(
         """
         return self.__getApi().getMachineState(machineId)
 
+    def getMachinesState(self, clusterId: typing.Optional[str] = None, force: bool = False) -> dict[str, str]:
+        """
+        Returns the state of all machines of a cluster (or of all clusters), obtained with a single request
+        and cached for a few seconds.
+
+        Args:
+            clusterId: Id of the cluster, None for all
+
+        Returns:
+            A dictionary, machine id -> state (same values as getMachineState)
+            Machines not in the dictionary are not known by oVirt
+        """
+        return self.__getApi().getMachinesState(clusterId, force)
+
+    def getServicesStates(self) -> typing.Optional[collections.abc.Mapping[str, typing.Any]]:
+        """
+        States of all machines, used to check the state of all oVirt deployments at once
+        """
+        return self.getMachinesState(force=True)
+
     def removeTemplate(self, templateId: str) -> None:
         """
         Removes a template from ovirt server
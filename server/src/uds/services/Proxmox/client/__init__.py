@@ -467,6 +467,13 @@ class ProxmoxClient:
             self._get('nodes/{}/tasks/{}/status'.format(node, urllib.parse.quote(upid)))
         )
 
+    @ensureConnected
+    def listTasks(self) -> list[types.TaskStatus]:
+        """
+        Running and recently finished tasks of the whole cluster, with a single request
+        """
+        return [types.TaskStatus.fromClusterTask(task) for task in self._get('cluster/tasks')['data']]
+
     @ensureConnected
     @cached(
         'vms',
@@ -152,6 +152,23 @@ class TaskStatus(typing.NamedTuple):
     def fromJson(dictionary: collections.abc.MutableMapping[str, typing.Any]) -> 'TaskStatus':
         return convertFromDict(TaskStatus, dictionary['data'])
 
+    @staticmethod
+    def fromClusterTask(dictionary: collections.abc.MutableMapping[str, typing.Any]) -> 'TaskStatus':
+        # Cluster task list has no exit status, "status" holds it once the task has ended
+        ended = 'endtime' in dictionary
+        return TaskStatus(
+            node=str(dictionary.get('node', '')),
+            pid=0,
+            pstart=0,
+            starttime=datetime.datetime.fromtimestamp(int(dictionary.get('starttime', 0))),
+            type=str(dictionary.get('type', '')),
+            status='stopped' if ended else 'running',
+            exitstatus=str(dictionary.get('status', '')) if ended else '',
+            user=str(dictionary.get('user', '')),
+            upid=str(dictionary['upid']),
+            id=str(dictionary.get('id', '')),
+        )
+
     def isRunning(self) -> bool:
         return self.status == 'running'
 
@@ -95,6 +95,8 @@ class ProxmoxDeployment(services.UserService):
     _vmid: str
     _reason: str
     _queue: list[int]
+    # Status of our task obtained in bulk from provider, only for current check (not marshaled)
+    _bulkTask: typing.Optional['client.types.TaskStatus'] = None
 
     # Utility overrides for type checking...
     def service(self) -> 'ProxmoxLinkedService':
@@ -472,10 +474,14 @@ if sys.platform == 'win32':
 
         node, upid = self.__getTask()
 
-        try:
-            task = self.service().getTaskInfo(node, upid)
-        except client.ProxmoxConnectionError:
-            return State.RUNNING  # Try again later
+        if self._bulkTask is not None and self._bulkTask.upid == upid:
+            # Use it only once, further checks must get a fresh status
+            task, self._bulkTask = self._bulkTask, None
+        else:
+            try:
+                task = self.service().getTaskInfo(node, upid)
+            except client.ProxmoxConnectionError:
+                return State.RUNNING  # Try again later
 
         if task.isErrored():
             return self.__error(task.exitstatus)
@@ -600,6 +606,17 @@ if sys.platform == 'win32':
         except Exception as e:
             return self.__error(e)
 
+    def checkStateFrom(self, states: collections.abc.Mapping[str, typing.Any]) -> str:
+        """
+        Checks the state using the cluster tasks obtained in bulk from provider.
+        If our task is not there (too old or not yet known), it is requested as usual
+        """
+        self._bulkTask = states.get(self.__getTask()[1]) if self._task else None
+        try:
+            return self.checkState()
+        finally:
+            self._bulkTask = None
+
     def moveToCache(self, newLevel: int) -> str:
         """
         Moves machines between cache levels
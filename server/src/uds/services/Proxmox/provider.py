@@ -277,6 +277,13 @@ class ProxmoxProvider(
     def getTaskInfo(self, node: str, upid: str) -> client.types.TaskStatus:
         return self._getApi().getTask(node, upid)
 
+    def getServicesStates(self) -> typing.Optional[collections.abc.Mapping[str, typing.Any]]:
+        """
+        Proxmox deployments check the tasks they have launched, so states are
+        the running and recent tasks of the cluster, keyed by upid
+        """
+        return {task.upid: task for task in self._getApi().listTasks()}
+
     def enableHA(
         self, vmId: int, started: bool = False, group: typing.Optional[str] = None
     ) -> None:
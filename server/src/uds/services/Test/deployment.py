@@ -114,6 +114,11 @@ class TestUserService(services.UserService):
         self.data.count = 3
         return State.RUNNING
 
+    def deployForCache(self, cacheLevel: int) -> str:
+        logger.info('Deploying for cache %s %s', cacheLevel, self.data)
+        self.data.count = 3
+        return State.RUNNING
+
     def checkState(self) -> str:
         logger.info('Checking state of deployment %s', self.data)
         if self.data.count <= 0:
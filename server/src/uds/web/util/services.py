@@ -50,6 +50,7 @@ from uds.core.util.config import GlobalConfig
 from uds.core.util.model import getSqlDatetime
 from uds.models import MetaPool, Network, ServicePool, ServicePoolGroup, TicketStore, Transport
 from uds.web.util import errors
+from uds.web.util.services_index import ServicesIndex, TransportInfo
 
 # Not imported at runtime, just for type checking
 if typing.TYPE_CHECKING:
@@ -129,6 +130,10 @@ def getServicesData(
     )  # Pass in user to get "number_assigned" to optimize
     now = getSqlDatetime()
 
+    # Static info (transports, groups, ...) of pools is got from the index, so we only have to filter it by ip/os
+    index = ServicesIndex.manager()
+    index.checkVersion()
+
     # Information for administrators
     nets = ''
     validTrans = ''
@@ -149,22 +154,11 @@ def getServicesData(
     services = []
 
     # Metapool helpers
-    def transportIterator(member) -> collections.abc.Iterable[Transport]:
-        for t in member.pool.transports.all().order_by('priority'):
-            try:
-                typeTrans = t.getType()
-                if (
-                    typeTrans
-                    and t.validForIp(request.ip)
-                    and typeTrans.supportsOs(osType)
-                    and t.validForOs(osType)
-                ):
-                    yield t
-            except Exception as e:
-                logger.warning('Transport %s of %s not found. Ignoring. (%s)', t, member.pool, e)
+    def transportIterator(member: tuple[TransportInfo, ...]) -> collections.abc.Iterable[TransportInfo]:
+        return (t for t in member if t.isValidFor(request.ip, osType))
 
     def buildMetaTransports(
-        transports: collections.abc.Iterable[Transport], isLabel: bool, meta: 'MetaPool'
+        transports: collections.abc.Iterable[TransportInfo], isLabel: bool, meta: 'MetaPool'
     ) -> list[collections.abc.Mapping[str, typing.Any]]:
         def idd(i):
             return i.uuid if not isLabel else 'LABEL:' + i.label
@@ -185,6 +179,7 @@ def getServicesData(
         # Check that we have access to at least one transport on some of its children
         metaTransports: list[collections.abc.Mapping[str, typing.Any]] = []
         in_use = meta.number_in_use > 0  # type: ignore # anotated value
+        metaInfo = index.meta(meta)
 
         inAll: typing.Optional[typing.Set[str]] = None
         tmpSet: typing.Set[str]
@@ -213,23 +208,25 @@ def getServicesData(
 
         if meta.transport_grouping == types.pools.TransportSelectionPolicy.COMMON:
             # only keep transports that are in ALL members
-            for member in meta.members.all().order_by('priority'):
+            utrans: collections.abc.MutableMapping[str, TransportInfo] = {}
+            for member in metaInfo.members:
                 tmpSet = set()
                 # if first pool, get all its transports and check that are valid
                 for t in transportIterator(member):
                     if inAll is None:
-                        tmpSet.add(t.uuid)  # type: ignore
+                        tmpSet.add(t.uuid)
+                        utrans[t.uuid] = t
                     elif t.uuid in inAll:  # For subsequent, reduce...
-                        tmpSet.add(t.uuid)  # type: ignore
+                        tmpSet.add(t.uuid)
 
                 inAll = tmpSet
             # tmpSet has ALL common transports
             metaTransports = buildMetaTransports(
-                Transport.objects.filter(uuid__in=inAll or []), isLabel=False, meta=meta
+                sorted((utrans[u] for u in inAll or []), key=lambda x: x.name), isLabel=False, meta=meta
             )
         elif meta.transport_grouping == types.pools.TransportSelectionPolicy.LABEL:
-            ltrans: collections.abc.MutableMapping[str, Transport] = {}
-            for member in meta.members.all().order_by('priority'):
+            ltrans: collections.abc.MutableMapping[str, TransportInfo] = {}
+            for member in metaInfo.members:
                 tmpSet = set()
                 # if first pool, get all its transports and check that are valid
                 for t in transportIterator(member):
@@ -248,26 +245,19 @@ def getServicesData(
                 (v for k, v in ltrans.items() if k in (inAll or set())), isLabel=True, meta=meta
             )
         else:
-            for member in meta.members.all():
+            for member in metaInfo.members:
                 # if pool.isInMaintenance():
                 #    continue
-                for t in member.pool.transports.all():
-                    typeTrans = t.getType()
-                    if (
-                        typeTrans
-                        and t.isValidForIp(request.ip)
-                        and typeTrans.supportsOs(osType)
-                        and t.isValidForOs(osType)
-                    ):
-                        metaTransports = [
-                            {
-                                'id': 'meta',
-                                'name': 'meta',
-                                'link': html.udsAccessLink(request, 'M' + meta.uuid, None),  # type: ignore
-                                'priority': 0,
-                            }
-                        ]
-                        break
+                for t in transportIterator(member):
+                    metaTransports = [
+                        {
+                            'id': 'meta',
+                            'name': 'meta',
+                            'link': html.udsAccessLink(request, 'M' + meta.uuid, None),  # type: ignore
+                            'priority': 0,
+                        }
+                    ]
+                    break
 
                 # if not in_use and meta.number_in_use:  # Only look for assignation on possible used
                 #     assignedUserService = UserServiceManager().getExistingAssignationForUser(pool, request.user)
@@ -281,7 +271,7 @@ def getServicesData(
         # If no usable pools, this is not visible
         if metaTransports:
             group: collections.abc.MutableMapping[str, typing.Any] = (
-                meta.servicesPoolGroup.as_dict if meta.servicesPoolGroup else ServicePoolGroup.default().as_dict
+                dict(metaInfo.group) if metaInfo.group is not None else ServicePoolGroup.default().as_dict
             )
 
             services.append(
@@ -336,18 +326,11 @@ def getServicesData(
                 .replace('{left}', left_count)
             )
 
+        poolInfo = index.pool(sPool)
         trans: list[collections.abc.Mapping[str, typing.Any]] = []
-        for t in sorted(
-            sPool.transports.all(), key=lambda x: x.priority
-        ):  # In memory sort, allows reuse prefetched and not too big array
-            typeTrans = t.getType()
-            if (
-                typeTrans
-                and t.isValidForIp(request.ip)
-                and typeTrans.supportsOs(osType)
-                and t.isValidForOs(osType)
-            ):
-                if typeTrans.ownLink:
+        for t in poolInfo.transports:  # Already sorted by priority
+            if t.isValidFor(request.ip, osType):
+                if t.own_link:
                     link = reverse('TransportOwnLink', args=('F' + sPool.uuid, t.uuid))  # type: ignore
                 else:
                     link = html.udsAccessLink(request, 'F' + sPool.uuid, t.uuid)  # type: ignore
@@ -364,9 +347,7 @@ def getServicesData(
         #     if ads:
         #         in_use = ads.in_use
 
-        group = (
-            sPool.servicesPoolGroup.as_dict if sPool.servicesPoolGroup else ServicePoolGroup.default().as_dict
-        )
+        group = dict(poolInfo.group) if poolInfo.group is not None else ServicePoolGroup.default().as_dict
 
         # Only add toBeReplaced info in case we allow it. This will generate some "overload" on the services
         toBeReplacedDate = (
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+'''
+import logging
+import threading
+import typing
+import uuid
+
+from django.db import transaction
+from django.db.models import signals
+
+from uds.core import types
+from uds.core.util import net, singleton
+from uds.core.util.cache import Cache
+from uds.models import MetaPool, MetaPoolMember, Network, ServicePool, ServicePoolGroup, Transport
+
+# Not imported at runtime, just for type checking
+if typing.TYPE_CHECKING:
+    from uds.core import transports
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY: typing.Final[str] = 'version'
+VERSION_VALIDITY: typing.Final[int] = 24 * 3600  # Version stamp is renewed (so index is rebuilt) at least daily
+
+
+class TransportInfo(typing.NamedTuple):
+    """
+    Info of a transport needed by the portal, so it can be checked without accessing db
+    """
+
+    uuid: str
+    name: str
+    priority: int
+    label: str
+    type: type['transports.Transport']
+    allowed_oss: frozenset[str]  # Empty means "all"
+    net_filtering: str
+    networks: tuple[tuple[int, int, int], ...]  # (start, end, version) of every related network
+
+    @staticmethod
+    def fromTransport(transport: 'Transport') -> 'TransportInfo':
+        return TransportInfo(
+            uuid=transport.uuid,
+            name=transport.name,
+            priority=transport.priority,
+            label=transport.label,
+            type=transport.getType(),
+            allowed_oss=frozenset(i for i in str(transport.allowed_oss or '').split(',') if i),
+            net_filtering=transport.net_filtering,
+            networks=tuple((n.net_start, n.net_end, n.version) for n in transport.networks.all()),
+        )
+
+    @property
+    def own_link(self) -> bool:
+        return self.type.ownLink
+
+    def isValidForIp(self, ip: str) -> bool:
+        """
+        Same as Transport.isValidForIp, but using the indexed networks
+        """
+        if self.net_filtering == Transport.NO_FILTERING:
+            return True
+        ipInt, version = net.ipToLong(ip)
+        exists = any(start <= ipInt <= end and version == v for start, end, v in self.networks)
+        if self.net_filtering == Transport.ALLOW:
+            return exists
+        # Deny, must not be in any network
+        return not exists
+
+    def isValidFor(self, ip: str, os: 'types.os.KnownOS') -> bool:
+        """
+        Checks if this transport can be used from this ip and os
+        """
+        return (
+            self.type.supportsOs(os)
+            and (not self.allowed_oss or os.name in self.allowed_oss)
+            and self.isValidForIp(ip)
+        )
+
+
+class PoolInfo(typing.NamedTuple):
+    """
+    Static (not depending on request) info of a service pool
+    """
+
+    transports: tuple[TransportInfo, ...]  # Sorted by priority
+    group: typing.Optional[dict[str, typing.Any]]  # None means "default group"
+
+
+class MetaPoolInfo(typing.NamedTuple):
+    """
+    Static (not depending on request) info of a meta pool
+    """
+
+    members: tuple[tuple[TransportInfo, ...], ...]  # Transports of every member pool, members sorted by priority
+    group: typing.Optional[dict[str, typing.Any]]  # None means "default group"
+
+
+class ServicesIndex(metaclass=singleton.Singleton):
+    """
+    Index of the info of pools and meta pools that does not depends on the request (transports, networks, groups...)
+    so the portal services list can be built without reevaluating them on every request.
+
+    Entries are built on first use, and the whole index is discarded when any of the related models changes.
+    The version stamp of the index is kept on cache, so changes done on other processes are also noticed.
+    """
+
+    _lock: threading.Lock
+    _version: typing.Any
+    _pools: dict[str, PoolInfo]  # By uuid
+    _metas: dict[str, MetaPoolInfo]  # By uuid
+
+    cache: typing.ClassVar[Cache] = Cache('servicesIndex', local=True)
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._version = None
+        self._pools = {}
+        self._metas = {}
+
+    @staticmethod
+    def manager() -> 'ServicesIndex':
+        return ServicesIndex()  # Singleton pattern will return always the same instance
+
+    def checkVersion(self) -> None:
+        """
+        Discards the index if its version has changed (i.e. some related model has changed)
+        """
+        version = ServicesIndex.cache.get(VERSION_KEY)
+        if version is None:  # Expired or never set, set a new one
+            version = self.invalidate()
+        if version != self._version:
+            with self._lock:
+                self._version = version
+                self._pools = {}
+                self._metas = {}
+
+    def invalidate(self) -> str:
+        """
+        Sets a new version for the index, so it will be rebuilt on all processes
+        """
+        version = uuid.uuid4().hex
+        ServicesIndex.cache.put(VERSION_KEY, version, VERSION_VALIDITY, local=False)
+        return version
+
+    def pool(self, pool: 'ServicePool') -> PoolInfo:
+        info = self._pools.get(pool.uuid)
+        if info is None:
+            info = PoolInfo(
+                transports=tuple(
+                    TransportInfo.fromTransport(t) for t in sorted(pool.transports.all(), key=lambda x: x.priority)
+                ),
+                group=dict(pool.servicesPoolGroup.as_dict) if pool.servicesPoolGroup else None,
+            )
+            self._pools[pool.uuid] = info
+        return info
+
+    def meta(self, meta: 'MetaPool') -> MetaPoolInfo:
+        info = self._metas.get(meta.uuid)
+        if info is None:
+            info = MetaPoolInfo(
+                members=tuple(
+                    tuple(
+                        TransportInfo.fromTransport(t)
+                        for t in sorted(member.pool.transports.all(), key=lambda x: x.priority)
+                    )
+                    for member in sorted(meta.members.all(), key=lambda x: x.priority)
+                ),
+                group=dict(meta.servicesPoolGroup.as_dict) if meta.servicesPoolGroup else None,
+            )
+            self._metas[meta.uuid] = info
+        return info
+
+
+def _modelChanged(sender: typing.Any, **kwargs: typing.Any) -> None:
+    # Invalidated once the changes are on db, so other processes can not rebuild the index with old data
+    transaction.on_commit(ServicesIndex.manager().invalidate)
+
+
+for _model in (ServicePool, MetaPool, MetaPoolMember, Transport, Network, ServicePoolGroup):
+    signals.post_save.connect(_modelChanged, sender=_model, dispatch_uid=f'servicesIndex.save.{_model.__name__}')
+    signals.post_delete.connect(_modelChanged, sender=_model, dispatch_uid=f'servicesIndex.delete.{_model.__name__}')
+signals.m2m_changed.connect(_modelChanged, sender=ServicePool.transports.through, dispatch_uid='servicesIndex.transports')
+signals.m2m_changed.connect(_modelChanged, sender=Transport.networks.through, dispatch_uid='servicesIndex.networks')
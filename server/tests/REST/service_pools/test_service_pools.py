@@ -28,12 +28,14 @@
 """
 Author: Adolfo Gómez, dkmaster at dkmon dot com
 """
+import json
 import logging
 import typing
 import collections.abc
 
 from uds import models
 from uds.core import consts
+from uds.core.util.state import State
 from uds.REST.handlers import AUTH_TOKEN_HEADER
 from uds.REST.methods.actor_v3 import MANAGED, UNMANAGED
 
@@ -72,3 +74,61 @@ class ServicePoolTest(rest.test.RESTTestCase):
             # Get from DB the service pool
             db_pool = models.ServicePool.objects.get(uuid=service_pool['id'])
             self.assertTrue(rest.assertions.assertServicePoolIs(db_pool, service_pool))
+
+    def test_service_pools_paging(self) -> None:
+        url = f'servicespools/overview'
+
+        all_pools = {p['id'] for p in self.client.rest_get(url).json()}
+        self.assertGreater(len(all_pools), 3)
+
+        # Follow the cursor until no more pages
+        paged_pools: list[str] = []
+        params: dict[str, typing.Any] = {'limit': 3}
+        while True:
+            response = self.client.rest_get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.streaming)
+            page = json.loads(b''.join(response.streaming_content))  # type: ignore
+            self.assertLessEqual(len(page), 3)
+            paged_pools.extend(p['id'] for p in page)
+            if 'UDS-Next-Cursor' not in response:
+                break
+            params['cursor'] = response['UDS-Next-Cursor']
+
+        self.assertEqual(len(paged_pools), len(all_pools))
+        self.assertEqual(set(paged_pools), all_pools)
+
+        # Offset, and filter (pushed to db)
+        response = self.client.rest_get(url, {'offset': 1})
+        page = json.loads(b''.join(response.streaming_content))  # type: ignore
+        self.assertEqual(len(page), len(all_pools) - 1)
+
+        name = models.ServicePool.objects.first().name  # type: ignore
+        response = self.client.rest_get(url, {'offset': 0, 'filter': f'name={name[:-1]}*'})
+        page = json.loads(b''.join(response.streaming_content))  # type: ignore
+        self.assertEqual(
+            {p['id'] for p in page},
+            set(models.ServicePool.objects.filter(name__istartswith=name[:-1]).values_list('uuid', flat=True)),
+        )
+
+        # Invalid paging
+        response = self.client.rest_get(url, {'limit': 'invalid'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_service_pools_filter(self) -> None:
+        url = f'servicespools/overview'
+
+        pool = typing.cast(models.ServicePool, models.ServicePool.objects.first())
+        provider = pool.service.provider  # type: ignore
+        provider.maintenance_mode = True
+        provider.save()
+
+        # Rendered state is maintenance, but stored one is not, so this filter is not pushed to db
+        response = self.client.rest_get(url, {'filter': f'state={State.MAINTENANCE}'})
+        self.assertIn(pool.uuid, {p['id'] for p in response.json()})
+        response = self.client.rest_get(url, {'filter': f'state={State.MAINTENANCE}', 'limit': 0})
+        self.assertIn(pool.uuid, {p['id'] for p in json.loads(b''.join(response.streaming_content))})  # type: ignore
+
+        # Invalid filter is reported before starting the stream
+        response = self.client.rest_get(url, {'filter': 'invalid', 'limit': 0})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import logging
+import typing
+from unittest import mock
+
+from uds.core.ui import gui
+
+from ..utils import rest
+
+logger = logging.getLogger(__name__)
+
+
+class GuiCallbackTest(rest.test.RESTTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.login()
+
+    def test_callback_of_not_loaded_module(self) -> None:
+        def fillResources(params: dict[str, typing.Any]) -> list[dict[str, typing.Any]]:
+            return [{'name': 'resource', 'values': [params['id']]}]
+
+        def loadModules() -> None:
+            # Registered when the module is imported
+            gui.callbacks['testFillResources'] = fillResources
+
+        with mock.patch.dict(gui.callbacks, clear=True), mock.patch(
+            'uds.core.util.modfinder.ensureModulesLoaded', side_effect=loadModules
+        ) as ensureModulesLoaded:
+            response = self.client.rest_get('gui/callback/testFillResources', {'id': 'one'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), [{'name': 'resource', 'values': ['one']}])
+            ensureModulesLoaded.assert_called_once()
+
+            # Already registered, modules are not checked again
+            self.client.rest_get('gui/callback/testFillResources', {'id': 'one'})
+            ensureModulesLoaded.assert_called_once()
+
+            response = self.client.rest_get('gui/callback/notExistingCallback')
+            self.assertEqual(response.status_code, 404)
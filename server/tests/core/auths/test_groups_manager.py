@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+from uds import models
+from uds.core.auths.groups_manager import GroupsManager
+
+from ...fixtures import authenticators as fixtures_authenticators
+from ...utils.test import UDSTestCase
+
+
+class GroupsManagerTest(UDSTestCase):
+    auth: 'models.Authenticator'
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.auth = fixtures_authenticators.createAuthenticator()
+        for name in ('Admins', 'Users', 'pat:^dev-.*', 'pat:ops$', 'pat:(a)\\1', 'pat:[invalid'):
+            self.auth.groups.create(name=name, comments='', is_meta=False)
+
+    def validGroupsNames(self, gm: GroupsManager) -> set[str]:
+        return {g.dbGroup().name for g in gm.getValidGroups()}
+
+    def test_matching(self) -> None:
+        gm = GroupsManager(self.auth)
+        gm.validate(['admins', 'DEV-team', 'other', 'devops', 'aa'])
+        self.assertEqual(self.validGroupsNames(gm), {'Admins', 'pat:^dev-.*', 'pat:ops$', 'pat:(a)\\1'})
+        self.assertTrue(gm.isValid('ADMINS'))
+        self.assertFalse(gm.isValid('users'))
+        self.assertEqual(len(list(gm.getGroupsNames())), 6)
+
+    def test_cached_and_invalidated(self) -> None:
+        GroupsManager(self.auth)
+        with self.assertNumQueries(0):
+            gm = GroupsManager(self.auth)
+            gm.validate(['users'] * 10)
+
+        # New groups are seen
+        self.auth.groups.create(name='Others', comments='', is_meta=False)
+        gm = GroupsManager(self.auth)
+        gm.validate('others')
+        self.assertEqual(self.validGroupsNames(gm), {'Others'})
+
+    def test_meta_groups(self) -> None:
+        groups = {g.name: g for g in self.auth.groups.all()}
+        metaAll = self.auth.groups.create(name='meta-all', comments='', is_meta=True, meta_if_any=False)
+        metaAll.groups.add(groups['Admins'], groups['Users'])
+        metaAny = self.auth.groups.create(name='meta-any', comments='', is_meta=True, meta_if_any=True)
+        metaAny.groups.add(groups['Admins'], groups['Users'])
+
+        gm = GroupsManager(self.auth)
+        gm.validate('admins')
+        with self.assertNumQueries(1):  # All valid groups, and meta groups, at once
+            self.assertEqual(self.validGroupsNames(gm), {'Admins', 'meta-any'})
+
+        gm.validate('users')
+        self.assertEqual(self.validGroupsNames(gm), {'Admins', 'Users', 'meta-any', 'meta-all'})
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2023 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import datetime
+import logging
+
+from ...utils.test import UDSTestCase
+
+from uds.models import DelayedTask as DBDelayedTask
+from uds.core.jobs.delayed_task import DelayedTask
+from uds.core.jobs.delayed_task_runner import DelayedTaskRunner
+
+logger = logging.getLogger(__name__)
+
+
+class SimpleTask(DelayedTask):
+    value: int
+
+    def __init__(self, value: int) -> None:
+        super().__init__()
+        self.value = value
+
+    def run(self) -> None:
+        pass
+
+
+class DelayedTaskRunnerTest(UDSTestCase):
+    def test_claim_tasks(self) -> None:
+        runner = DelayedTaskRunner.runner()
+        for i in range(5):
+            runner.insert(SimpleTask(i), 0, f'tag_{i}')
+        runner.insert(SimpleTask(100), 3600, 'not_due')
+        # Make them due, most overdue first
+        for i, task in enumerate(DBDelayedTask.objects.exclude(tag='not_due').order_by('id')):
+            task.execution_time -= datetime.timedelta(seconds=60 - i)
+            task.save()
+
+        self.assertTrue(runner.checkExists('tag_0'))
+        self.assertFalse(runner.checkExists('tag_100'))
+        self.assertFalse(runner.checkExists(''))
+
+        info = runner.queueInfo()
+        self.assertEqual(info.total, 6)
+        self.assertEqual(info.due, 5)
+        self.assertGreaterEqual(info.lag, 59)
+
+        tasks = runner.claimTasks(3)
+        self.assertEqual([task.value for task in tasks], [0, 1, 2])  # type: ignore
+        # Claimed tasks are removed from queue
+        self.assertFalse(runner.checkExists('tag_0'))
+        self.assertEqual([task.value for task in runner.claimTasks(3)], [3, 4])  # type: ignore
+        self.assertEqual(runner.claimTasks(3), [])
+        self.assertTrue(runner.checkExists('not_due'))
+
+        # Next wait is limited to max_wait, as the remaining task is due in an hour
+        self.assertEqual(runner.nextWait(), DelayedTaskRunner.max_wait)
+        self.assertEqual(runner.queueInfo(), (1, 0, 0.0))
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2023 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import datetime
+import logging
+from unittest import mock
+
+from ...utils.test import UDSTestCase
+
+from uds.models import Scheduler as DBScheduler
+from uds.core.jobs.scheduler import Scheduler
+from uds.core.util.model import getSqlDatetime
+from uds.core.util.state import State
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerTest(UDSTestCase):
+    def setUp(self) -> None:
+        now = getSqlDatetime()
+        # 4 due jobs, and one not due
+        for i in range(4):
+            DBScheduler.objects.create(
+                name=f'due_{i}',
+                last_execution=now - datetime.timedelta(hours=1),
+                next_execution=now - datetime.timedelta(minutes=10 - i),
+            )
+        DBScheduler.objects.create(
+            name='not_due',
+            last_execution=now - datetime.timedelta(hours=1),
+            next_execution=now + datetime.timedelta(seconds=5),
+        )
+
+    def test_claim_jobs(self) -> None:
+        scheduler = Scheduler()
+        jobs = scheduler.claimJobs(3)
+        # Oldest due jobs are claimed first
+        self.assertEqual([job.name for job in jobs], ['due_0', 'due_1', 'due_2'])
+        for job in DBScheduler.objects.filter(name__in=['due_0', 'due_1', 'due_2']):
+            self.assertEqual(job.state, State.RUNNING)
+            self.assertEqual(job.owner_server, scheduler._hostname)
+
+        # Claimed jobs are not claimed again
+        self.assertEqual([job.name for job in scheduler.claimJobs(3)], ['due_3'])
+        self.assertEqual(scheduler.claimJobs(3), [])
+
+    def test_execute_jobs_releases_failed(self) -> None:
+        scheduler = Scheduler()
+        pool = mock.MagicMock()
+        instances = [mock.MagicMock(), Exception('Broken job'), mock.MagicMock()]
+        with mock.patch.object(DBScheduler, 'getInstance', side_effect=instances):
+            self.assertEqual(scheduler.executeJobs(pool, 3), 3)
+
+        # Failed job is released, the others are submitted
+        self.assertEqual(pool.submit.call_count, 2)
+        self.assertEqual(scheduler._running, 2)
+        job = DBScheduler.objects.get(name='due_1')
+        self.assertEqual((job.state, job.owner_server), (State.FOR_EXECUTE, ''))
+
+        # A failing pool releases the rest of the batch
+        pool.submit.side_effect = RuntimeError('cannot schedule new futures after shutdown')
+        with mock.patch.object(DBScheduler, 'getInstance', return_value=mock.MagicMock()):
+            scheduler.executeJobs(pool, 10)
+        self.assertEqual(scheduler._running, 2)
+        self.assertEqual(
+            set(DBScheduler.objects.filter(state=State.RUNNING).values_list('name', flat=True)), {'due_0', 'due_2'}
+        )
+
+    def test_next_wait(self) -> None:
+        scheduler = Scheduler()
+        # There are due jobs, so wait the minimum
+        self.assertEqual(scheduler.nextWait(), Scheduler.min_wait)
+        scheduler.claimJobs(10)
+        # Next job is due in about 5 seconds
+        self.assertTrue(Scheduler.min_wait < scheduler.nextWait() <= 5)
+        DBScheduler.objects.all().delete()
+        self.assertEqual(scheduler.nextWait(), Scheduler.max_wait)
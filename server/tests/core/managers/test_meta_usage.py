@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2023 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import logging
+import typing
+from unittest import mock
+
+from uds import models
+from uds.core import types
+from uds.core.managers.user_service import UserServiceManager
+from uds.core.managers.userservice.meta_usage import MemberUsage, MetaPoolUsage
+
+from ...fixtures import authenticators as authenticators_fixtures
+from ...fixtures import services as services_fixtures
+from ...utils.test import UDSTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class MetaPoolUsageTest(UDSTestCase):
+    pools: list[models.ServicePool]
+    meta: models.MetaPool
+    user: models.User
+
+    def setUp(self) -> None:
+        MetaPoolUsage.invalidate()
+        # One assigned user service on each pool
+        userServices = services_fixtures.createCacheTestingUserServices(count=3)
+        self.pools = [userService.deployed_service for userService in userServices]
+        for pool, maxServices in zip(self.pools, (2, 4, 10)):
+            pool.max_srvs = maxServices
+            pool.save()
+        groups = list(userServices[0].user.groups.all())  # type: ignore
+        self.meta = services_fixtures.createMetaPool(self.pools, groups)
+        self.user = authenticators_fixtures.createUsers(
+            userServices[0].user.manager, groups=groups  # type: ignore
+        )[0]
+
+    def test_snapshot(self) -> None:
+        self.assertEqual(
+            MetaPoolUsage.get(self.meta),
+            {
+                pool.id: MemberUsage(True, True, True, types.pools.UsageInfo(1, maxServices))
+                for pool, maxServices in zip(self.pools, (2, 4, 10))
+            },
+        )
+        # Shared until expired or invalidated
+        with self.assertNumQueries(0):
+            MetaPoolUsage.get(self.meta)
+            self.assertEqual(self.meta.usage(), types.pools.UsageInfo(3, 16))
+
+        MetaPoolUsage.assigned(self.meta, self.pools[0])
+        self.assertEqual(MetaPoolUsage.get(self.meta)[self.pools[0].id].usage, types.pools.UsageInfo(2, 2))
+
+        provider = self.pools[1].service.provider  # type: ignore
+        provider.maintenance_mode = True
+        provider.save()
+        self.assertTrue(MetaPoolUsage.get(self.meta)[self.pools[1].id].usable)
+        MetaPoolUsage.invalidate(self.meta.id)
+        self.assertFalse(MetaPoolUsage.get(self.meta)[self.pools[1].id].usable)
+
+    def test_greater_percent_free(self) -> None:
+        self.meta.policy = types.pools.LoadBalancingPolicy.GREATER_PERCENT_FREE
+        self.meta.save()
+
+        def getMeta() -> str:
+            with mock.patch.object(
+                UserServiceManager, 'getService', autospec=True, side_effect=lambda *args, **kwargs: args[4]
+            ):
+                return typing.cast(
+                    str,
+                    UserServiceManager().getMeta(
+                        self.user,
+                        '127.0.0.1',
+                        types.os.DetectedOsInfo(types.os.KnownOS.LINUX, types.os.KnownBrowser.FIREFOX, '1'),
+                        self.meta.uuid,
+                        'meta',
+                    ),
+                )
+
+        # Greater free percent is the last pool (10%)
+        self.assertEqual(getMeta(), 'F' + self.pools[2].uuid)
+        self.assertEqual(MetaPoolUsage.get(self.meta)[self.pools[2].id].usage.used, 2)
+
+        # If the snapshot is outdated, chosen pool is checked again
+        self.pools[2].max_srvs = 1
+        self.pools[2].save()
+        self.assertEqual(getMeta(), 'F' + self.pools[1].uuid)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2023 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import logging
+from unittest import mock
+
+from uds.core.managers.userservice.opchecker import ProviderStates
+from uds.core.util.model import getSqlStampInSeconds
+from uds.services.Test.provider import TestProvider
+
+from ...fixtures import services as services_fixtures
+from ...utils.test import UDSTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStatesTest(UDSTestCase):
+    def setUp(self) -> None:
+        ProviderStates.cache.clear()
+
+    def test_not_supported(self) -> None:
+        userService = services_fixtures.createCacheTestingUserServices(count=1)[0]
+        self.assertIsNone(ProviderStates.get(userService, getSqlStampInSeconds()))
+
+    def test_shared_states(self) -> None:
+        userService = services_fixtures.createCacheTestingUserServices(count=1)[0]
+        # Several user services of the same provider
+        userServices = [userService] + [
+            services_fixtures.createUserService(
+                userService.deployed_service, userService.publication, userService.user  # type: ignore
+            )
+            for _ in range(3)
+        ]
+        since = getSqlStampInSeconds()
+
+        with mock.patch.object(
+            TestProvider, 'getServicesStates', autospec=True, return_value={'vm': 'up'}
+        ) as getServicesStates:
+            for userService in userServices:
+                self.assertEqual(ProviderStates.get(userService, since), {'vm': 'up'})
+
+            # All user services of the provider share a single bulk request
+            self.assertEqual(getServicesStates.call_count, 1)
+
+            # But states obtained before the operation being checked are not valid
+            ProviderStates.get(userServices[0], since + 1000)
+            self.assertEqual(getServicesStates.call_count, 2)
+
+            # Errors on bulk request falls back to regular checking
+            ProviderStates.cache.clear()
+            getServicesStates.side_effect = Exception('Connection lost')
+            self.assertIsNone(ProviderStates.get(userServices[0], since))
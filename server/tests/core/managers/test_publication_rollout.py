@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2023 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import logging
+from unittest import mock
+
+from uds import models
+from uds.core import services
+from uds.core.managers.publication import PublicationFinishChecker, PublicationManager, PublicationRollout
+from uds.core.managers.user_service import UserServiceManager
+from uds.core.util.config import GlobalConfig
+from uds.core.util.state import State
+from uds.core.workers.servicepools_cache_updater import ServiceCacheUpdater
+from uds.services.Test.provider import TestProvider
+from uds.services.Test.service import TestServiceCache
+
+from ...fixtures import authenticators as authenticators_fixtures
+from ...fixtures import services as services_fixtures
+from ...utils.test import UDSTestCase
+
+logger = logging.getLogger(__name__)
+
+OLD_CACHE = 10
+WAVE = 4
+
+
+class PublicationRolloutTest(UDSTestCase):
+    servicePool: models.ServicePool
+    publication: models.ServicePoolPublication
+    authenticator: models.Authenticator
+
+    def setUp(self) -> None:
+        TestProvider.maxPreparingServices = 1000
+        TestServiceCache.maxUserServices = 1000
+        userService = services_fixtures.createCacheTestingUserServices()[0]
+        self.servicePool = userService.deployed_service
+        self.authenticator = userService.user.manager  # type: ignore
+        oldPublication = userService.publication
+        userService.delete()
+
+        for i in range(OLD_CACHE):
+            cache = services_fixtures.createUserService(self.servicePool, oldPublication, None)  # type: ignore
+            cache.cache_level = services.UserService.L1_CACHE if i % 2 else services.UserService.L2_CACHE
+            cache.save()
+
+        # New publication, about to finish
+        self.publication = services_fixtures.createPublication(self.servicePool)
+        self.publication.state = State.PREPARING
+        self.publication.save()
+
+        for value, setting in (
+            (GlobalConfig.PUBLICATION_ROLLOUT_WAVE, WAVE),
+            (GlobalConfig.PUBLICATION_ROLLOUT_INTERVAL, 30),
+        ):
+            patcher = mock.patch.object(value, 'getInt', return_value=setting)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        TestProvider.maxPreparingServices = 1000
+
+    def oldCache(self, state: str) -> int:
+        return (
+            self.servicePool.userServices.exclude(cache_level=0)
+            .exclude(publication=self.publication)
+            .filter(state=state)
+            .count()
+        )
+
+    def newCache(self) -> int:
+        return self.servicePool.userServices.exclude(cache_level=0).filter(publication=self.publication).count()
+
+    def finishPublication(self) -> None:
+        PublicationFinishChecker.checkAndUpdateState(
+            self.publication, self.publication.getInstance(), State.FINISHED
+        )
+        self.assertEqual(self.publication.state, State.USABLE)
+
+    def test_rollout(self) -> None:
+        self.finishPublication()
+
+        # Previous cache is not removed at once
+        self.assertEqual(self.oldCache(State.USABLE), OLD_CACHE)
+        progress = PublicationManager().rolloutProgress(self.servicePool)
+        self.assertIsNotNone(progress)
+        self.assertEqual((progress.replaced, progress.remaining), (0, OLD_CACHE))  # type: ignore
+        self.assertTrue(ServiceCacheUpdater.isRollingOut(self.servicePool))
+
+        waves = 0
+        while self.oldCache(State.USABLE):
+            PublicationRollout(self.publication).run()
+            waves += 1
+            replaced = min(waves * WAVE, OLD_CACHE)
+            self.assertEqual(self.oldCache(State.REMOVABLE), replaced)
+            # Every removed one is replaced at once on same cache level
+            self.assertEqual(self.newCache(), replaced)
+
+        self.assertEqual(waves, 3)
+        self.assertEqual(
+            self.servicePool.userServices.filter(
+                publication=self.publication, cache_level=services.UserService.L1_CACHE
+            ).count(),
+            OLD_CACHE // 2,
+        )
+        progress = PublicationManager().rolloutProgress(self.servicePool)
+        self.assertEqual((progress.replaced, progress.remaining), (OLD_CACHE, 0))  # type: ignore
+        self.assertFalse(ServiceCacheUpdater.isRollingOut(self.servicePool))
+
+    def test_rollout_provider_limit(self) -> None:
+        self.finishPublication()
+        TestProvider.maxPreparingServices = WAVE + 2
+
+        PublicationRollout(self.publication).run()
+        self.assertEqual(self.newCache(), WAVE)
+        # New ones are still preparing, so just 2 slots left
+        PublicationRollout(self.publication).run()
+        self.assertEqual(self.newCache(), WAVE + 2)
+        PublicationRollout(self.publication).run()
+        self.assertEqual(self.newCache(), WAVE + 2)
+
+    def test_rollout_superseded(self) -> None:
+        self.finishPublication()
+        self.publication.setState(State.REMOVABLE)
+        PublicationRollout(self.publication).run()
+        self.assertEqual(self.oldCache(State.USABLE), OLD_CACHE)
+
+    def test_disabled(self) -> None:
+        with mock.patch.object(GlobalConfig.PUBLICATION_ROLLOUT_WAVE, 'getInt', return_value=0):
+            self.finishPublication()
+        self.assertEqual(self.oldCache(State.REMOVABLE), OLD_CACHE)
+        self.assertIsNone(PublicationManager().rolloutProgress(self.servicePool))
+
+    def test_login_during_rollout(self) -> None:
+        self.finishPublication()
+        oldL1 = self.servicePool.cachedUserServices().filter(
+            cache_level=services.UserService.L1_CACHE, state=State.USABLE
+        )
+        oldL1Count = oldL1.count()
+        # Just one replacement is ready
+        newL1 = services_fixtures.createUserService(self.servicePool, self.publication, None)  # type: ignore
+        newL1.cache_level = services.UserService.L1_CACHE
+        newL1.save()
+
+        users = authenticators_fixtures.createUsers(self.authenticator, number_of_users=2)
+        self.servicePool.max_srvs = 1000
+        self.servicePool.save()
+        userService = UserServiceManager().getAssignationForUser(self.servicePool, users[0])
+        self.assertEqual(userService, newL1)
+
+        # No more new ones on cache, so a new one is created instead of assigning an old one
+        userService = UserServiceManager().getAssignationForUser(self.servicePool, users[1])
+        self.assertEqual(userService.publication, self.publication)  # type: ignore
+        self.assertEqual(oldL1.count(), oldL1Count)
@@ -110,7 +110,7 @@ class ServerManagerManagedServersTest(UDSTestCase):
     ) -> typing.Iterator[mock.Mock]:
         with mock.patch('uds.core.managers.servers_api.requester.ServerApiRequester') as mockServerApiRequester:
 
-            def _getStats() -> typing.Optional[types.servers.ServerStats]:
+            def _getStats(force: bool = False) -> typing.Optional[types.servers.ServerStats]:
                 # Get first argument from call to init on serverApiRequester
                 server = mockServerApiRequester.call_args[0][0]
                 logger.debug('Getting stats for %s', server.host)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2023 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import logging
+import random
+from unittest import mock
+
+from uds import models
+from uds.core import services
+from uds.core.managers.user_service import ClaimCounters, UserServiceManager
+from uds.core.util.state import State
+
+from ...fixtures import authenticators as authenticators_fixtures
+from ...fixtures import services as services_fixtures
+from ...utils.test import UDSTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class UserServiceClaimTest(UDSTestCase):
+    servicePool: models.ServicePool
+    users: list[models.User]
+
+    def setUp(self) -> None:
+        userService = services_fixtures.createCacheTestingUserServices(count=1)[0]
+        self.servicePool = userService.deployed_service
+        self.users = authenticators_fixtures.createUsers(
+            userService.user.manager, number_of_users=4  # type: ignore
+        )
+        ClaimCounters.claimed = ClaimCounters.conflicts = 0
+
+    def createCache(self, count: int, state: str = State.USABLE) -> list[models.UserService]:
+        caches: list[models.UserService] = []
+        for _ in range(count):
+            cache = services_fixtures.createUserService(
+                self.servicePool, self.servicePool.publications.first(), None  # type: ignore
+            )
+            cache.cache_level = services.UserService.L1_CACHE
+            cache.state = cache.os_state = state
+            cache.save()
+            caches.append(cache)
+        return caches
+
+    def test_claim(self) -> None:
+        caches = self.createCache(3)
+        assigned: list[models.UserService] = []
+        for user in self.users[:3]:
+            userService = UserServiceManager().getAssignationForUser(self.servicePool, user)
+            self.assertIsNotNone(userService)
+            assigned.append(userService)  # type: ignore
+            userService = models.UserService.objects.get(id=userService.id)  # type: ignore
+            self.assertEqual(userService.user, user)
+            self.assertEqual(userService.cache_level, 0)
+
+        # Every user got its own cached service
+        self.assertEqual({i.id for i in assigned}, {i.id for i in caches})
+        self.assertEqual(ClaimCounters.asDict(), {'claimed': 3, 'conflicts': 0})
+
+    def test_claim_preparing(self) -> None:
+        cache = self.createCache(1, State.PREPARING)[0]
+        userService = UserServiceManager().getAssignationForUser(self.servicePool, self.users[0])
+        self.assertEqual(userService, cache)
+
+    def test_claim_conflict(self) -> None:
+        caches = self.createCache(2)
+        sample = random.sample
+        lost: list[int] = []
+
+        def concurrentClaim(population: list[models.UserService], k: int) -> list[models.UserService]:
+            # Another assignation claims the first candidate between read and claim
+            lost.append(population[0].id)
+            models.UserService.objects.filter(id=population[0].id).update(user=self.users[3], cache_level=0)
+            return [population[0]] + sample(population[1:], k - 1)
+
+        with mock.patch('uds.core.managers.user_service.random.sample', side_effect=concurrentClaim):
+            userService = UserServiceManager().getAssignationForUser(self.servicePool, self.users[0])
+
+        self.assertIn(userService, caches)
+        self.assertNotEqual(userService.id, lost[0])  # type: ignore
+        self.assertEqual(ClaimCounters.asDict(), {'claimed': 1, 'conflicts': 1})
+        self.assertEqual(models.UserService.objects.get(id=lost[0]).user, self.users[3])
@@ -34,12 +34,13 @@
 import logging
 import typing
 import collections.abc
+from collections import Counter
 
 # We use commit/rollback
 from ...utils.test import UDSTestCase
 
 from uds.core import types, consts
-from uds.core.ui.user_interface import gui
+from uds.core.ui.user_interface import UserInterface, gui
 
 from ...fixtures.user_interface import TestingUserInterface, DEFAULTS
 
@@ -221,4 +222,51 @@ class UserinterfaceInternalTest(UDSTestCase):
                 'date_field': 'This is a date field',
                 'info_field': '',  # Info field is without tooltip, so it's '' because it's required
             },
-        )
\ No newline at end of file
+        )
+
+    def test_copy_on_write(self):
+        ui, other = TestingUserInterface(), TestingUserInterface()
+        # Declared field info is shared until modified
+        self.assertIs(ui.choice_field._fieldsInfo, TestingUserInterface.choice_field._fieldsInfo)
+
+        # Values are independent, and setting them does not copy the field info
+        ui.str_field.value = 'changed'
+        self.assertEqual(other.str_field.value, DEFAULTS['str_field'])
+        self.assertEqual(TestingUserInterface.str_field.value, DEFAULTS['str_field'])
+        self.assertIs(ui.str_field._fieldsInfo, TestingUserInterface.str_field._fieldsInfo)
+
+        ui.choice_field.setChoices(['Other value'])
+        ui.choice_field.label = 'Changed label'
+        self.assertIsNot(ui.choice_field._fieldsInfo, TestingUserInterface.choice_field._fieldsInfo)
+        self.assertEqual(other.choice_field.label, 'Choice Field')
+        self.assertEqual(len(other.choice_field._fieldsInfo.choices or []), 3)
+        self.assertEqual(len(TestingUserInterface.choice_field._fieldsInfo.choices or []), 3)
+
+    def test_callables(self):
+        calls: collections.abc.MutableMapping[str, int] = Counter()
+
+        def choices() -> list[types.ui.ChoiceItem]:
+            calls['choices'] += 1
+            return [gui.choiceItem('1', 'One')]
+
+        def default() -> str:
+            calls['default'] += 1
+            return 'generated'
+
+        class CallablesUserInterface(UserInterface):
+            choice_field = gui.ChoiceField(label='Choice', choices=choices, default=default)
+
+        ui = CallablesUserInterface()
+        # Not evaluated on instantiation, only when needed, and once per instance
+        self.assertEqual(calls, {})
+        self.assertEqual(ui.choice_field.default, 'generated')
+        self.assertEqual(ui.choice_field.default, 'generated')
+        self.assertEqual(calls, {'default': 1})
+
+        self.assertEqual(ui.guiDescription()[0]['gui']['choices'], [gui.choiceItem('1', 'One')])
+        ui.guiDescription()
+        self.assertEqual(calls, {'default': 1, 'choices': 1})
+
+        # Other instances evaluates its own
+        CallablesUserInterface().guiDescription()
+        self.assertEqual(calls, {'default': 2, 'choices': 2})
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2023 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import logging
+import threading
+import typing
+
+from ...utils.test import UDSTestCase
+
+from uds import models
+from uds.core.managers.stats import StatsManager
+from uds.core.util.buffered_writer import BufferedWriter
+from uds.core.util.config import GlobalConfig
+from uds.core.util.stats import counters
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWriterTest(UDSTestCase):
+    def test_buffered_writer(self) -> None:
+        # Big flush size & age, so background thread does not flush
+        writer = BufferedWriter('test', 4, 100, 3600)
+        for i in range(4):
+            self.assertTrue(writer.add(models.StatsCounters(owner_id=i, stamp=i)))
+        self.assertEqual(models.StatsCounters.objects.count(), 0)
+        self.assertEqual(len(writer), 4)
+
+        # Buffer is full, so caller flushes it before adding
+        self.assertTrue(writer.add(models.StatsEvents(owner_id=5, stamp=5)))
+        self.assertEqual(models.StatsCounters.objects.count(), 4)
+        self.assertEqual(writer.written, 4)
+        self.assertEqual(len(writer), 1)
+
+        writer.stop()
+        self.assertEqual(models.StatsEvents.objects.count(), 1)
+        self.assertEqual(writer.written, 5)
+        self.assertEqual(writer.dropped, 0)
+        self.assertEqual(writer.flush(), 0)
+
+    def test_restart_after_stop(self) -> None:
+        writer = BufferedWriter('test', 4, 100, 3600)
+        writer._ensureRunning()
+        first = writer._thread
+        # Started again before the first thread has seen the stop
+        writer.stop()
+        writer._ensureRunning()
+        second = writer._thread
+        self.assertIsNot(first, second)
+
+        typing.cast(threading.Thread, first).join(5)
+        self.assertFalse(typing.cast(threading.Thread, first).is_alive())
+        self.assertTrue(typing.cast(threading.Thread, second).is_alive())
+        writer.stop()
+        typing.cast(threading.Thread, second).join(5)
+        self.assertFalse(typing.cast(threading.Thread, second).is_alive())
+
+    def test_stats_manager_buffered(self) -> None:
+        manager = StatsManager.manager()
+        writer = manager.writer
+        manager.writer = BufferedWriter('test', 100, 100, 3600)
+        try:
+            GlobalConfig.STATS_BUFFERED.set(True)
+            self.assertTrue(manager.addCounter(counters.OT_PROVIDER, 1, counters.CT_ASSIGNED, 10))
+            self.assertTrue(manager.addEvent(counters.OT_PROVIDER, 1, 1, username='user'))
+            self.assertEqual(models.StatsCounters.objects.count(), 0)
+            self.assertEqual(models.StatsEvents.objects.count(), 0)
+            manager.flush()
+            self.assertEqual(models.StatsCounters.objects.get().value, 10)
+            self.assertEqual(models.StatsEvents.objects.get().fld1, 'user')
+
+            # Unbuffered, written at once
+            GlobalConfig.STATS_BUFFERED.set(False)
+            self.assertTrue(manager.addCounter(counters.OT_PROVIDER, 1, counters.CT_ASSIGNED, 20))
+            self.assertEqual(models.StatsCounters.objects.count(), 2)
+        finally:
+            GlobalConfig.STATS_BUFFERED.set(False)
+            manager.writer = writer
@@ -34,9 +34,12 @@
 # We use commit/rollback
 from ...utils.test import UDSTransactionTestCase
 from uds.core.util.cache import Cache
+from uds.models.cache import Cache as DBCache
 import time
 import string
 
+from django.db import transaction
+
 # Some random chars, that include unicode non-ascci chars
 UNICODE_CHARS = 'ñöçóá^(pípè)'
 UNICODE_CHARS_2 = 'ñöçóá^(€íöè)'
@@ -106,3 +109,74 @@ class CacheTest(UDSTransactionTestCase):
             None,
             'Put a key and recover it once it has expired and has been cleaned',
         )
+
+    def test_put_existing(self):
+        cache = Cache(UNICODE_CHARS)
+        cache.put('key', VALUE_1)
+        with transaction.atomic():
+            # Refreshing an existing key is a single update, and does not break the transaction in course
+            with self.assertNumQueries(1):
+                cache.put('key', 'updated')
+            self.assertEqual(DBCache.objects.count(), 1)
+        self.assertEqual(cache.get('key'), 'updated')
+
+    def test_local_cache(self):
+        cache = Cache(UNICODE_CHARS, local=True)
+        Cache.local.clear()
+        stats = Cache.localStats().get(UNICODE_CHARS, (0, 0))
+
+        cache.put('key', VALUE_1)
+        # Removing from DB does not affect local cache
+        DBCache.objects.all().delete()
+        self.assertEqual(cache.get('key'), VALUE_1, 'Local value is served without DB')
+        # Returned value is a copy, so modifying it does not modify cached value
+        cache.get('key').append('modified')
+        self.assertEqual(cache.get('key'), VALUE_1, 'Local value is not modified by callers')
+
+        # Non local access goes to DB
+        self.assertEqual(cache.get('key', local=False), None, 'Non local access reads DB')
+
+        # Remove invalidates local entry
+        cache.put('key', VALUE_1)
+        cache.remove('key')
+        self.assertEqual(cache.get('key'), None, 'Removed key is not on local cache')
+
+        # Negative caching, key created on DB by other process is not seen until negative ttl expires
+        self.assertEqual(cache.get('other'), None)
+        Cache(UNICODE_CHARS).put('other', VALUE_1)  # Non local put invalidates local entry
+        self.assertEqual(cache.get('other'), VALUE_1)
+        Cache.local.putNegative(UNICODE_CHARS, DBCache.objects.get().key, 60)
+        self.assertEqual(cache.get('other'), None, 'Negative entry is used')
+
+        # Owner scoped invalidation
+        cache.put('key', VALUE_1)
+        Cache(UNICODE_CHARS_2, local=True).put('key', VALUE_1)
+        cache.clear()
+        self.assertEqual(cache.get('key'), None, 'Cleared owner')
+        self.assertEqual(Cache(UNICODE_CHARS_2, local=True).get('key'), VALUE_1, 'Other owner is kept')
+
+        # Stats per owner
+        newStats = Cache.localStats()[UNICODE_CHARS]
+        self.assertGreater(newStats.hits, stats[0])
+        self.assertGreater(newStats.misses, stats[1])
+
+        # Size bound, LRU
+        local = Cache.local
+        maxItems = local.max_items
+        try:
+            local.clear()
+            local.max_items = 2
+            local.put('owner', 'a', 1, 60)
+            local.put('owner', 'b', 2, 60)
+            local.get('owner', 'a')  # a is now most recent
+            local.put('owner', 'c', 3, 60)
+            self.assertEqual(len(local), 2)
+            self.assertEqual(local.get('owner', 'b'), (False, None), 'Least recently used entry is evicted')
+            self.assertEqual(local.get('owner', 'a'), (True, 1))
+            # TTL
+            local.put('owner', 'd', 4, 0.1)
+            time.sleep(0.2)
+            self.assertEqual(local.get('owner', 'd'), (False, None), 'Expired local entry')
+        finally:
+            local.max_items = maxItems
+            local.clear()
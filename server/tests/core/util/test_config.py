@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+from unittest import mock
+
+from django.db import transaction
+
+from uds.models.config import Config as DBConfig
+from uds.core.util import config
+from uds.core.util.config import GlobalConfig, Config
+
+from ...utils.test import UDSTestCase
+
+
+class ConfigTest(UDSTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        GlobalConfig.initialize()
+        config._ConfigSnapshot.invalidate()  # pylint: disable=protected-access
+
+    def test_no_queries(self) -> None:
+        values = (GlobalConfig.RELOAD_TIME, GlobalConfig.SITE_FILTER_ONTOP, GlobalConfig.SUPER_USER_LOGIN)
+        with self.captureOnCommitCallbacks(execute=True):
+            for value in values:  # Load snapshot (and store values not already in db)
+                value.get()
+        with self.assertNumQueries(0):
+            for _ in range(4):
+                GlobalConfig.RELOAD_TIME.getInt(True)
+                GlobalConfig.SITE_FILTER_ONTOP.getBool(True)
+                GlobalConfig.SUPER_USER_LOGIN.get(True)
+
+    def test_changes_seen(self) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            GlobalConfig.RELOAD_TIME.set(123)
+        self.assertEqual(GlobalConfig.RELOAD_TIME.getInt(), 123)
+
+        # Change done by "other process"
+        DBConfig.objects.filter(section=GlobalConfig.RELOAD_TIME.section(), key=GlobalConfig.RELOAD_TIME.key()).update(
+            value='321'
+        )
+        DBConfig.objects.filter(section=config.VERSION_SECTION, key=config.VERSION_KEY).update(value='other')
+        self.assertEqual(GlobalConfig.RELOAD_TIME.getInt(), 123)  # Not checked yet
+        config._ConfigSnapshot._checked = 0  # pylint: disable=protected-access
+        self.assertEqual(GlobalConfig.RELOAD_TIME.getInt(), 321)
+
+        # And updates from admin are seen once commited
+        with self.captureOnCommitCallbacks(execute=True):
+            Config.update(Config.SectionType.GLOBAL, GlobalConfig.RELOAD_TIME.key(), '456')
+        self.assertEqual(GlobalConfig.RELOAD_TIME.getInt(), 456)
+
+    def test_rolled_back_changes_not_seen(self) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            GlobalConfig.RELOAD_TIME.set(123)
+        key = (GlobalConfig.RELOAD_TIME.section(), GlobalConfig.RELOAD_TIME.key())
+
+        def shared() -> str:
+            return config._ConfigSnapshot._values[key].value  # pylint: disable=protected-access
+
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                GlobalConfig.RELOAD_TIME.set(456)
+                # Seen by the thread that made the change, but not shared until commited
+                self.assertEqual(GlobalConfig.RELOAD_TIME.getInt(), 456)
+                self.assertEqual(shared(), '123')
+                raise ValueError()
+
+        self.assertEqual(GlobalConfig.RELOAD_TIME.getInt(), 123)
+        self.assertEqual(shared(), '123')
+
+    def test_crypt_decrypted_once(self) -> None:
+        value = Config.section(Config.SectionType.OTHER).valueCrypt('cryptTest', 'secret')
+        self.assertEqual(value.get(), 'secret')
+        with mock.patch('uds.core.managers.crypto.CryptoManager.decrypt') as decrypt:
+            for _ in range(4):
+                self.assertEqual(value.get(), 'secret')
+            decrypt.assert_not_called()
+
+    def test_read_does_not_write(self) -> None:
+        value = Config.section(Config.SectionType.OTHER).value('readTest', '1', help='Help on code')
+        value.get()
+        DBConfig.objects.filter(section=value.section(), key=value.key()).update(help='Other help')
+        config._ConfigSnapshot.invalidate()  # pylint: disable=protected-access
+        with self.assertNumQueries(2):  # Version check & reload, no writes
+            self.assertEqual(value.get(), '1')
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2022 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import threading
+import time
+import typing
+
+from django.db import connection
+
+from uds.core.util.decorators import cached
+
+from ...utils.test import UDSTestCase
+
+
+class DictCache:
+    """
+    In memory replacement of Cache, so cached calls can be done from several threads
+    """
+
+    def __init__(self) -> None:
+        self.data: dict[str, typing.Any] = {}
+
+    def get(self, key: str, defValue: typing.Any = None, local: typing.Optional[bool] = None) -> typing.Any:
+        return self.data.get(key, defValue)
+
+    def put(self, key: str, value: typing.Any, validity: typing.Optional[int] = None, local: typing.Optional[bool] = None) -> None:
+        self.data[key] = value
+
+
+class Remote:
+    def __init__(self) -> None:
+        self.cache = DictCache()
+        self.calls = 0
+        self.atomicDepth = -1
+        self.release = threading.Event()
+
+    @cached('remote', 60)
+    def value(self, x: int) -> list[int]:
+        self.calls += 1
+        self.atomicDepth = len(connection.atomic_blocks)
+        self.release.wait(5)
+        return [x, self.calls]
+
+
+class CachedTest(UDSTestCase):
+    def runConcurrently(self, remote: Remote, count: int) -> list[typing.Any]:
+        results: list[typing.Any] = [None] * count
+
+        def call(n: int) -> None:
+            results[n] = remote.value(1)
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+        for t in threads:
+            t.start()
+        time.sleep(0.2)  # Let all of them to reach the call
+        remote.release.set()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_single_flight(self) -> None:
+        remote = Remote()
+        results = self.runConcurrently(remote, 8)
+
+        # Only one call to remote, and all callers got its result
+        self.assertEqual(remote.calls, 1)
+        self.assertEqual(results, [[1, 1]] * 8)
+
+        # Now is cached
+        self.assertEqual(remote.value(1), [1, 1])
+        self.assertEqual(remote.calls, 1)
+
+        # But force always calls
+        self.assertEqual(remote.value(1, force=True), [1, 2])
+
+    def test_stale(self) -> None:
+        remote = Remote()
+        remote.release.set()
+        remote.value(1)
+        # Expire the cached value
+        for key, value in remote.cache.data.items():
+            remote.cache.data[key] = value._replace(expires=0)
+
+        remote.release.clear()
+        results = self.runConcurrently(remote, 4)
+        # One of them has refreshed the value, the rest got the stale one
+        self.assertEqual(remote.calls, 2)
+        self.assertEqual(sorted(results), [[1, 1]] * 3 + [[1, 2]])
+
+    def test_no_transaction(self) -> None:
+        remote = Remote()
+        remote.release.set()
+        depth = len(connection.atomic_blocks)
+        remote.value(1)
+        # No transaction has been opened for the call
+        self.assertEqual(remote.atomicDepth, depth)
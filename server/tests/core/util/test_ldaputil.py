@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import logging
+import re
+import typing
+from unittest import mock
+
+import pytest
+
+# Authenticators & ldaputil need python-ldap
+ldap = pytest.importorskip('ldap')
+
+from uds.core import consts, types
+from uds.core.environment import Environment
+from uds.core.util import ldaputil
+from uds.core.util.cache import Cache
+from uds.auths.SimpleLDAP.authenticator import SimpleLDAPAuthenticator
+
+from ...utils.test import UDSTestCase
+
+logger = logging.getLogger(__name__)
+
+SERVICE_DN: typing.Final[str] = 'cn=admin,dc=uds,dc=test'
+SERVICE_PASSWORD: typing.Final[str] = 'admin-password'
+
+# uid -> (password, groups)
+USERS: typing.Final[dict[str, tuple[str, list[str]]]] = {
+    f'user{i}': (f'password{i}', ['all', 'odd' if i % 2 else 'even']) for i in range(8)
+}
+
+
+def userDn(uid: str) -> str:
+    return f'uid={uid},ou=users,dc=uds,dc=test'
+
+
+class LDAPStub:
+    """
+    In-process replacement of LDAPObject, serving a small fixed directory.
+    Counts binds and searches, so tests can check how many round trips are done.
+    """
+
+    binds: typing.ClassVar[int] = 0
+    searches: typing.ClassVar[int] = 0
+    alive: typing.ClassVar[bool] = True
+
+    uri: str
+    bound: bool
+    network_timeout: int
+    protocol_version: int
+
+    def __init__(self, uri: str) -> None:
+        self.uri = uri
+        self.bound = False
+
+    @staticmethod
+    def reset() -> None:
+        LDAPStub.binds = LDAPStub.searches = 0
+        LDAPStub.alive = True
+
+    def set_option(self, option: typing.Any, value: typing.Any) -> None:
+        pass
+
+    def simple_bind_s(self, who: str, cred: bytes) -> None:
+        LDAPStub.binds += 1
+        if who == SERVICE_DN and cred == SERVICE_PASSWORD.encode():
+            self.bound = True
+            return
+        for uid, (password, _) in USERS.items():
+            if who == userDn(uid) and cred == password.encode():
+                self.bound = True
+                return
+        raise ldap.INVALID_CREDENTIALS({'desc': 'Invalid credentials'})  # type: ignore
+
+    def whoami_s(self) -> str:
+        if not LDAPStub.alive:
+            raise ldap.SERVER_DOWN({'desc': "Can't contact LDAP server"})  # type: ignore
+        return 'dn:' + SERVICE_DN
+
+    def unbind_s(self) -> None:
+        self.bound = False
+
+    def search_ext_s(
+        self, base: str, scope: typing.Any, filterstr: str, attrlist: typing.Any, sizelimit: int
+    ) -> list[tuple[str, dict[str, list[bytes]]]]:
+        LDAPStub.searches += 1
+        if not self.bound:
+            raise ldap.OPERATIONS_ERROR({'desc': 'Not bound'})  # type: ignore
+        if 'objectClass=posixGroup' in filterstr:
+            member = re.search(r'memberUid=([^)]+)', filterstr)
+            uid = member.group(1) if member else ''
+            return [
+                (f'cn={group},ou=groups,dc=uds,dc=test', {'cn': [group.encode()]})
+                for group in (USERS[uid][1] if uid in USERS else [])
+            ]
+        found = re.search(r'\(uid=([^)]+)\)', filterstr)
+        uid = found.group(1) if found else ''
+        if uid not in USERS:
+            return []
+        return [(userDn(uid), {'uid': [uid.encode()], 'cn': [f'Real {uid}'.encode()]})]
+
+
+class LdapUtilTest(UDSTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        LDAPStub.reset()
+        ldaputil.ConnectionPool.closeAll()
+        Cache.local.clear()
+        patcher = mock.patch('ldap.initialize', side_effect=lambda uri: LDAPStub(uri))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pool(self) -> ldaputil.ConnectionPool:
+        return ldaputil.ConnectionPool.get(SERVICE_DN, SERVICE_PASSWORD, 'ldap.uds.test')
+
+    def authenticator(self) -> SimpleLDAPAuthenticator:
+        return SimpleLDAPAuthenticator(
+            Environment.getTempEnv(),
+            {
+                'host': 'ldap.uds.test',
+                'port': '389',
+                'ssl': False,
+                'username': SERVICE_DN,
+                'password': SERVICE_PASSWORD,
+                'timeout': '10',
+                'ldapBase': 'dc=uds,dc=test',
+                'userClass': 'posixAccount',
+                'groupClass': 'posixGroup',
+                'userIdAttr': 'uid',
+                'groupIdAttr': 'cn',
+                'memberAttr': 'memberUid',
+                'userNameAttr': 'cn',
+                'mfaAttr': '',
+                'verifySsl': False,
+                'certificate': '',
+            },
+        )
+
+    def test_pool_reuses_bound_connections(self) -> None:
+        pool = self.pool()
+        self.assertIs(pool, self.pool())
+        # Different credentials, different pool
+        self.assertIsNot(pool, ldaputil.ConnectionPool.get(SERVICE_DN, 'other', 'ldap.uds.test'))
+
+        for _ in range(10):
+            with pool.connection() as con:
+                self.assertTrue(con.bound)
+        self.assertEqual(LDAPStub.binds, 1)
+        self.assertEqual(pool.idleCount(), 1)
+
+    def test_pool_replaced_on_config_change(self) -> None:
+        def get(password: str) -> ldaputil.ConnectionPool:
+            return ldaputil.ConnectionPool.get(SERVICE_DN, password, 'ldap.uds.test', owner='auth')
+
+        pool = get(SERVICE_PASSWORD)
+        self.assertIs(pool, get(SERVICE_PASSWORD))
+        with pool.connection() as inUse:
+            with pool.connection() as idle:
+                pass
+            # Password of the authenticator is changed while a search is running
+            newPool = get('other')
+            self.assertIsNot(newPool, pool)
+            self.assertFalse(idle.bound)
+            self.assertTrue(inUse.bound)
+        # Returned to a replaced pool, so it is closed
+        self.assertFalse(inUse.bound)
+        self.assertEqual(pool.idleCount(), 0)
+        self.assertIs(newPool, get('other'))
+
+    def test_pool_limits_and_discards(self) -> None:
+        pool = self.pool()
+        with mock.patch.object(consts.system, 'LDAP_MAX_IDLE_CONNECTIONS', 2):
+            with pool.connection(), pool.connection(), pool.connection():
+                pass
+        self.assertEqual(LDAPStub.binds, 3)
+        self.assertEqual(pool.idleCount(), 2)
+
+        # A failing block discards its connection
+        with self.assertRaises(ValueError):
+            with pool.connection():
+                raise ValueError()
+        self.assertEqual(pool.idleCount(), 1)
+
+        # Stale connections are replaced on next use
+        with mock.patch.object(ldaputil.ConnectionPool, 'CHECK_INTERVAL', -1):
+            LDAPStub.alive = False
+            with pool.connection() as con:
+                self.assertTrue(con.bound)
+        self.assertEqual(LDAPStub.binds, 4)
+        self.assertEqual(pool.idleCount(), 1)
+
+        pool.close()
+        self.assertEqual(pool.idleCount(), 0)
+
+    def test_login_storm(self) -> None:
+        groupsManager = mock.MagicMock()
+        request = mock.MagicMock()
+
+        for _ in range(5):
+            for uid, (password, groups) in USERS.items():
+                groupsManager.reset_mock()
+                # New instance per login, as done by the authentication process
+                self.assertEqual(
+                    self.authenticator().authenticate(uid, password, groupsManager, request),
+                    types.auth.SUCCESS_AUTH,
+                )
+                groupsManager.validate.assert_called_once_with(groups)
+
+        logins = 5 * len(USERS)
+        # Just one bind for the service connection, and one per login to check the password
+        self.assertEqual(LDAPStub.binds, 1 + logins)
+        # User and groups searched once per user, then served from cache
+        self.assertEqual(LDAPStub.searches, 2 * len(USERS))
+
+        # Password is checked on every login, even with cached entries
+        with mock.patch('uds.auths.SimpleLDAP.authenticator.authLogLogin'):
+            self.assertEqual(
+                self.authenticator().authenticate('user0', 'wrong', groupsManager, request),
+                types.auth.FAILED_AUTH,
+            )
+            self.assertEqual(
+                self.authenticator().authenticate('nobody', 'wrong', groupsManager, request),
+                types.auth.FAILED_AUTH,
+            )
+
+    def test_cached(self) -> None:
+        fetch = mock.MagicMock(side_effect=[None, 'value', 'other'])
+        self.assertIsNone(ldaputil.cached('owner', 'key', fetch))
+        # None is not cached
+        self.assertEqual(ldaputil.cached('owner', 'key', fetch), 'value')
+        self.assertEqual(ldaputil.cached('owner', 'key', fetch), 'value')
+        self.assertEqual(fetch.call_count, 2)
+        Cache.local.clear('owner')
+        self.assertEqual(ldaputil.cached('owner', 'key', fetch), 'other')
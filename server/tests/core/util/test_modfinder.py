@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import importlib
+import typing
+from unittest import mock
+
+from uds import reports
+from uds.core import services
+from uds.core.util import factory, modfinder
+from uds.services.Test.provider import TestProvider
+
+from ...utils.test import UDSTestCase
+
+
+class ProvidersFactory(factory.ModuleFactory[services.ServiceProvider]):
+    pass
+
+
+class OtherProvidersFactory(factory.ModuleFactory[services.ServiceProvider]):
+    pass
+
+
+class ModFinderTest(UDSTestCase):
+    def test_factory_loaders(self) -> None:
+        class Factory(factory.Factory[typing.Any]):
+            pass
+
+        fact = Factory()
+        loader = mock.MagicMock(side_effect=lambda: fact.put('one', int) or fact.put('two', str))
+        lookup = mock.MagicMock(side_effect=lambda name: fact.put(name, int) if name == 'one' else None)
+        fact.addLoader(loader, lookup)
+
+        # Found by lookup, no full load
+        self.assertIs(fact.get('ONE'), int)
+        lookup.assert_called_once_with('one')
+        loader.assert_not_called()
+
+        # Not found by lookup, full load
+        self.assertIs(fact.get('two'), str)
+        loader.assert_called_once()
+        self.assertEqual(set(fact.objects()), {'one', 'two'})
+
+        # Once loaded, nothing more is invoked
+        self.assertIsNone(fact.get('three'))
+        self.assertEqual((loader.call_count, lookup.call_count), (1, 2))
+
+    def test_lazy_modules(self) -> None:
+        with mock.patch('uds.core.util.modfinder.importModules', wraps=modfinder.importModules) as importModules:
+            modfinder.dynamicLoadAndRegisterModules(ProvidersFactory(), services.ServiceProvider, 'uds.services')
+            importModules.assert_not_called()
+            # Full load on first listing, that also stores the index
+            self.assertIn(TestProvider.getType().lower(), ProvidersFactory().providers())
+            importModules.assert_called_once()
+
+            # Other process (simulated by an empty local index) only needs to import the package
+            modfinder._indexes.clear()
+            modfinder.dynamicLoadAndRegisterModules(
+                OtherProvidersFactory(), services.ServiceProvider, 'uds.services'
+            )
+            with mock.patch('importlib.import_module', wraps=importlib.import_module) as importModule:
+                self.assertIs(OtherProvidersFactory().get(TestProvider.getType()), TestProvider)
+                importModule.assert_called_once_with('uds.services.Test')
+            importModules.assert_called_once()
+
+    def test_lazy_reports(self) -> None:
+        self.assertTrue(reports.availableReports)
+        self.assertIs(reports.availableReports, reports.availableReports)
+        with self.assertRaises(AttributeError):
+            getattr(reports, 'notExistingAttribute')
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import logging
+import timeit
+
+from uds.core import types
+from uds.core.util import os_detector
+
+from ...utils.test import UDSTestCase
+
+logger = logging.getLogger(__name__)
+
+CHROME_WINDOWS = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+KNOWN_UAS: list[tuple[str, types.os.KnownOS, types.os.KnownBrowser, str]] = [
+    (CHROME_WINDOWS, types.os.KnownOS.WINDOWS, types.os.KnownBrowser.CHROME, '120.0.0.0'),
+    (
+        CHROME_WINDOWS + ' Edg/120.0.2210.91',
+        types.os.KnownOS.WINDOWS,
+        types.os.KnownBrowser.EDGE,
+        '120.0.2210.91',
+    ),
+    (
+        'Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0',
+        types.os.KnownOS.LINUX,
+        types.os.KnownBrowser.FIREFOX,
+        '121.0',
+    ),
+    (
+        CHROME_WINDOWS + ' OPR/106.0.0.0',
+        types.os.KnownOS.WINDOWS,
+        types.os.KnownBrowser.OPERA,
+        '106.0.0.0',
+    ),
+    (
+        'Mozilla/5.0 (Windows NT 6.1; Trident/7.0; rv:11.0) like Gecko',
+        types.os.KnownOS.WINDOWS,
+        types.os.KnownBrowser.IEXPLORER,
+        '11.0',
+    ),
+    (
+        'Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 Version/17.2 Mobile/15E148 Safari/604.1',
+        types.os.KnownOS.IPHONE,
+        types.os.KnownBrowser.SAFARI,
+        '604.1',
+    ),
+    ('', types.os.KnownOS.UNKNOWN, types.os.KnownBrowser.OTHER, '0.0'),
+]
+
+
+class OsDetectorTest(UDSTestCase):
+    def test_detection(self) -> None:
+        for _ in range(2):  # Second time, from cache
+            for ua, os, browser, version in KNOWN_UAS:
+                self.assertEqual(
+                    os_detector.getOsFromUA(ua),
+                    types.os.DetectedOsInfo(os=os, browser=browser, version=version),
+                    ua,
+                )
+        self.assertEqual(os_detector.getOsFromUA(None).os, types.os.KnownOS.UNKNOWN)
+
+    def test_cost(self) -> None:
+        # Microbenchmark of the per request cost, with and without the cache
+        number = 2000
+        uncached = timeit.timeit(
+            lambda: os_detector._detectOs.__wrapped__(CHROME_WINDOWS), number=number  # type: ignore
+        )
+        cached = timeit.timeit(lambda: os_detector.getOsFromUA(CHROME_WINDOWS), number=number)
+        logger.info(
+            'User agent detection: %.2f us (%.2f us without cache)',
+            cached / number * 1e6,
+            uncached / number * 1e6,
+        )
+        self.assertLess(cached, uncached)
@@ -412,6 +412,47 @@ class PermissionsTest(UDSTestCase):
     def test_group_network_permissions_staff(self):
         self.doTestGroupPermissions(self.network, self.staffs[0])
 
+    def test_effective_permissions_bulk(self):
+        objs: list[typing.Any] = [self.authenticator, self.servicePool, self.service, self.provider, self.network]
+        user = self.staffs[0]
+        group = user.groups.all()[0]
+        permissions.addUserPermission(user, self.authenticator, uds.core.types.permissions.PermissionType.READ)
+        permissions.addGroupPermission(group, self.authenticator, uds.core.types.permissions.PermissionType.ALL)
+        permissions.addUserPermission(user, self.servicePool, uds.core.types.permissions.PermissionType.MANAGEMENT)
+        permissions.addGroupPermission(group, self.network, uds.core.types.permissions.PermissionType.READ)
+        # Permission for the type (root), applies to all providers
+        models.Permissions.addPermission(
+            user=user,
+            object_type=objtype.ObjectType.PROVIDER.type,
+            object_id=None,
+            permission=uds.core.types.permissions.PermissionType.READ,
+        )
+
+        for u in (user, self.users[0], self.admins[0]):
+            groups = list(u.groups.all())
+            with self.assertNumQueries(0 if u.is_admin else 1):
+                resolved = permissions.getEffectivePermissions(u, objs, groups=groups)
+            self.assertEqual(len(resolved), len(objs))
+            for obj in objs:
+                self.assertEqual(
+                    resolved[(objtype.ObjectType.from_model(obj).type, obj.pk)],
+                    permissions.getEffectivePermission(u, obj),
+                )
+
+        resolved = permissions.getEffectivePermissions(user, objs)
+        self.assertEqual(
+            resolved[(objtype.ObjectType.AUTHENTICATOR.type, self.authenticator.pk)],
+            uds.core.types.permissions.PermissionType.ALL,
+        )
+        self.assertEqual(
+            resolved[(objtype.ObjectType.PROVIDER.type, self.provider.pk)],
+            uds.core.types.permissions.PermissionType.READ,
+        )
+        self.assertEqual(
+            resolved[(objtype.ObjectType.SERVICE.type, self.service.pk)],
+            uds.core.types.permissions.PermissionType.NONE,
+        )
+
     @staticmethod
     def getObjectType(obj: typing.Type) -> int:
         return objtype.ObjectType.from_model(obj).type
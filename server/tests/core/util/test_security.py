@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2022 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import http.server
+import os
+import ssl
+import tempfile
+import threading
+import typing
+
+import requests
+
+from uds.core.util import security
+
+from ...utils.test import UDSTestCase
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep alive
+
+    def do_GET(self) -> None:
+        body = b'{"result": "ok"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: typing.Any) -> None:
+        pass
+
+
+class SessionsPoolTest(UDSTestCase):
+    server: http.server.ThreadingHTTPServer
+    cert: str
+    connections: int
+    resumed: list[bool]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        key, cls.cert, password = security.selfSignedCert('127.0.0.1')
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, 'key.pem'), 'w') as f:
+                f.write(key)
+            with open(os.path.join(tmp, 'cert.pem'), 'w') as f:
+                f.write(cls.cert)
+            context.load_cert_chain(
+                os.path.join(tmp, 'cert.pem'), os.path.join(tmp, 'key.pem'), password
+            )
+
+        cls.connections = 0
+        cls.resumed = []
+
+        class Server(http.server.ThreadingHTTPServer):
+            def get_request(self) -> typing.Any:
+                cls.connections += 1
+                sock, addr = self.socket.accept()
+                ssock = context.wrap_socket(sock, server_side=True)
+                cls.resumed.append(ssock.session_reused)
+                return ssock, addr
+
+        cls.server = Server(('127.0.0.1', 0), Handler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def url(self) -> str:
+        return f'https://127.0.0.1:{self.server.server_address[1]}/'
+
+    def test_pinned_and_reused(self) -> None:
+        pool = security.RequestsSessionsPool(maxIdle=4)
+        connections = self.connections
+        for _ in range(4):
+            with pool.session(self.url(), self.cert) as session:
+                self.assertEqual(session.get(self.url(), timeout=4).json()['result'], 'ok')
+                session.headers['X-Test'] = 'test'
+
+        # Only one session and one connection has been used
+        self.assertEqual(pool.idleCount(), 1)
+        self.assertEqual(self.connections - connections, 1)
+        # And headers set by users are not kept
+        with pool.session(self.url(), self.cert) as session:
+            self.assertNotIn('X-Test', session.headers)
+        pool.clear()
+
+    def test_tls_session_resumed(self) -> None:
+        pool = security.RequestsSessionsPool(maxIdle=4)
+        with pool.session(self.url(), self.cert) as session:
+            session.get(self.url(), timeout=4)
+            session.close()  # Drop connection, next one should resume TLS session
+            session.get(self.url(), timeout=4)
+        self.assertEqual(self.resumed[-2:], [False, True])
+        pool.clear()
+
+    def test_other_certificate_fails(self) -> None:
+        pool = security.RequestsSessionsPool(maxIdle=4)
+        _, otherCert, _ = security.selfSignedCert('127.0.0.1')
+        with pool.session(self.url(), otherCert) as session:
+            with self.assertRaises(requests.exceptions.SSLError):
+                session.get(self.url(), timeout=4)
+        # Without certificate, no verification is done
+        with pool.session(self.url()) as session:
+            self.assertEqual(session.get(self.url(), timeout=4).json()['result'], 'ok')
+        pool.clear()
+
+    def test_idle_limit(self) -> None:
+        pool = security.RequestsSessionsPool(maxIdle=2)
+        sessions = [pool.acquire(f'https://host{i}:43910/') for i in range(3)]
+        for i, session in enumerate(sessions):
+            pool.release(f'https://host{i}:43910/', '', session)
+
+        self.assertEqual(pool.idleCount(), 2)
+        # Least recently used one (host0) has been evicted
+        self.assertIsNot(pool.acquire('https://host0:43910/'), sessions[0])
+        self.assertIs(pool.acquire('https://host2:43910/'), sessions[2])
@@ -32,6 +32,7 @@
 """
 import time
 
+from uds.core.util import config, unique_id_generator
 from uds.core.util.unique_id_generator import UniqueIDGenerator
 from uds.core.util.unique_gid_generator import UniqueGIDGenerator
 from uds.core.util.unique_mac_generator import UniqueMacGenerator
@@ -165,3 +166,59 @@ class UniqueIdTest(UDSTestCase):
 
         with self.assertRaises(KeyError):
             self.nameGen.get('test', length=1)
+
+
+class UniqueIdBlocksTest(UDSTestCase):
+    """
+    Same generators, but reserving ids in blocks
+    """
+
+    def setUp(self) -> None:
+        config.GlobalConfig.UNIQUEID_BLOCK_SIZE.set('8')
+        self.newProcess()
+
+    def tearDown(self) -> None:
+        config.GlobalConfig.UNIQUEID_BLOCK_SIZE.set('0')
+
+    def newProcess(self) -> None:
+        # Reservations are per process, so this simulates a new one
+        unique_id_generator._ReservedIds._pid = 0  # pylint: disable=protected-access
+
+    def test_unique(self) -> None:
+        uidGen = UniqueIDGenerator('uidg1', 'test', 'test')
+        uidGen2 = UniqueIDGenerator('uidg2', 'test', 'test')
+        seqs = [uidGen.get() for _ in range(20)]
+        self.assertEqual(seqs, list(range(20)))  # Only one process, so in sequence
+        self.newProcess()
+        seqs += [uidGen2.get() for _ in range(20)]
+        self.newProcess()
+        seqs += [uidGen.get() for _ in range(20)]
+        self.assertEqual(len(set(seqs)), 60)
+        self.assertNotIn(-1, seqs)
+
+    def test_free_reused(self) -> None:
+        uidGen = UniqueIDGenerator('uidg1', 'test', 'test')
+        seqs = [uidGen.get() for _ in range(16)]  # Two full blocks
+        for seq in seqs[:8]:
+            uidGen.free(seq)
+        # Freed ones are reserved again on next block
+        self.assertEqual(sorted(uidGen.get() for _ in range(8)), seqs[:8])
+
+    def test_mac_full(self) -> None:
+        macGen = UniqueMacGenerator('test')
+        start, end = TEST_MAC_RANGE_FULL.split('-')
+        length = macToInt(end) - macToInt(start) + 1
+        macs = [macGen.get(TEST_MAC_RANGE_FULL)]
+        self.newProcess()  # Previous process keeps 7 reserved macs
+        macs += [macGen.get(TEST_MAC_RANGE_FULL) for _ in range(length - 1)]
+        self.assertEqual(len(set(macs)), length)
+        self.assertNotIn('00:00:00:00:00:00', macs)
+        self.assertEqual(macGen.get(TEST_MAC_RANGE_FULL), '00:00:00:00:00:00')
+
+    def test_name_full(self) -> None:
+        nameGen = UniqueNameGenerator('test')
+        names = {nameGen.get('test', length=1) for _ in range(10)}
+        self.assertEqual(len(names), 10)
+
+        with self.assertRaises(KeyError):
+            nameGen.get('test', length=1)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2023 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import logging
+
+from ...utils.test import UDSTestCase
+
+from uds import models
+from uds.core.environment import Environment
+from uds.core.managers.log.objects import LogObjectType
+from uds.core.util.model import getSqlDatetime
+from uds.core.workers.log import LogMaintenance
+
+logger = logging.getLogger(__name__)
+
+
+class LogMaintenanceTest(UDSTestCase):
+    def test_log_maintenance(self) -> None:
+        max_elements = LogObjectType.USERSERVICE.get_max_elements()
+        now = getSqlDatetime()
+        counts = {1: max_elements + 20, 2: max_elements - 2, 3: max_elements}
+        for owner_id, count in counts.items():
+            models.Log.objects.bulk_create(
+                [
+                    models.Log(
+                        owner_id=owner_id,
+                        owner_type=LogObjectType.USERSERVICE.value,
+                        created=now,
+                        data=f'{owner_id}-{i}',
+                    )
+                    for i in range(count)
+                ]
+            )
+        # Unknown owner type
+        models.Log.objects.create(owner_id=1, owner_type=9999, created=now)
+
+        LogMaintenance(Environment.getTempEnv()).run()
+
+        self.assertFalse(models.Log.objects.filter(owner_type=9999).exists())
+        for owner_id, count in counts.items():
+            logs = models.Log.objects.filter(owner_id=owner_id, owner_type=LogObjectType.USERSERVICE.value)
+            expected = count if count < max_elements else max_elements - 1
+            self.assertEqual(logs.count(), expected)
+            # Newest ones are kept
+            self.assertEqual(logs.order_by('-id')[0].data, f'{owner_id}-{count - 1}')
+            self.assertEqual(logs.order_by('id')[0].data, f'{owner_id}-{count - expected}')
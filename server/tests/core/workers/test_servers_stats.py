@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import typing
+import collections.abc
+from unittest import mock
+
+from uds import models
+from uds.core import types
+from uds.core.environment import Environment
+from uds.core.managers.servers import ServerManager
+from uds.core.workers.servers_stats import ServersStatsUpdater
+
+from ...utils.test import UDSTestCase
+from ...fixtures import servers as servers_fixtures
+
+NUM_SERVERS = 4
+GB = 1024 * 1024 * 1024
+
+
+class SyncExecutor:
+    """
+    Runs "in parallel" tasks on current thread, so they use the test database connection
+    """
+
+    def __init__(self, max_workers: int = 1) -> None:
+        pass
+
+    def __enter__(self) -> 'SyncExecutor':
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        pass
+
+    def map(self, fn: collections.abc.Callable[..., typing.Any], items: typing.Iterable[typing.Any]) -> typing.Iterator[typing.Any]:
+        return iter([fn(i) for i in items])
+
+
+class ServersStatsUpdaterTest(UDSTestCase):
+    group: 'models.ServerGroup'
+
+    def setUp(self) -> None:
+        super().setUp()
+        patcher = mock.patch('uds.core.managers.servers.ThreadPoolExecutor', SyncExecutor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.group = servers_fixtures.createServerGroup(
+            type=types.servers.ServerType.SERVER, subtype='test', num_servers=NUM_SERVERS
+        )
+
+    def test_stats_updated(self) -> None:
+        stats = types.servers.ServerStats(memused=GB, memtotal=4 * GB, cpuused=0.5, current_users=2)
+        with mock.patch(
+            'uds.core.managers.servers_api.requester.ServerApiRequester.get', return_value=stats.asDict()
+        ) as get:
+            ServersStatsUpdater(Environment.getTempEnv()).run()
+            # All servers has been requested, and its stats are stored
+            self.assertEqual(get.call_count, NUM_SERVERS)
+            for server in self.group.servers.all():
+                self.assertIsNotNone(server.stats)
+                self.assertTrue(server.stats.is_valid)  # type: ignore
+                self.assertEqual(server.stats.memtotal, 4 * GB)  # type: ignore
+
+            # Assignation uses stored stats, so no more requests are done
+            retrieved = ServerManager.manager().getServerStats(self.group.servers.all())
+            self.assertEqual(len(retrieved), NUM_SERVERS)
+            self.assertEqual(get.call_count, NUM_SERVERS)
+
+            # Even if valid, updater refreshes them
+            ServersStatsUpdater(Environment.getTempEnv()).run()
+            self.assertEqual(get.call_count, NUM_SERVERS * 2)
+
+    def test_maintenance_skipped(self) -> None:
+        self.group.servers.update(maintenance_mode=True)
+        with mock.patch('uds.core.managers.servers_api.requester.ServerApiRequester.get') as get:
+            ServersStatsUpdater(Environment.getTempEnv()).run()
+            self.assertEqual(get.call_count, 0)
+
+    def test_only_servers_requested(self) -> None:
+        servers_fixtures.createServerGroup(type=types.servers.ServerType.TUNNEL, subtype='test', num_servers=2)
+        servers_fixtures.createServerGroup(type=types.servers.ServerType.UNMANAGED, subtype='test', num_servers=2)
+        with mock.patch('uds.core.managers.servers_api.requester.ServerApiRequester.get', return_value={}) as get:
+            ServersStatsUpdater(Environment.getTempEnv()).run()
+            self.assertEqual(get.call_count, NUM_SERVERS)
@@ -35,6 +35,7 @@ import logging
 
 
 from uds.core.util.state import State
+from uds.core.util.config import GlobalConfig
 from uds.core.workers.servicepools_cache_updater import ServiceCacheUpdater
 from uds.core.environment import Environment
 
@@ -155,6 +156,8 @@ class ServiceCacheUpdaterTest(UDSTestCase):
         self.assertEqual(self.runCacheUpdater(self.servicePool.cache_l1_srvs + 10), 1)
 
     def test_provider_removing_limits(self) -> None:
+        # One removal per pool on every run
+        GlobalConfig.CACHE_UPDATE_STEPS.set(1)
         TestProvider.maxRemovingServices = 10
         self.setCache(initial=0, cache=50, max=50)
 
@@ -182,3 +185,23 @@ class ServiceCacheUpdaterTest(UDSTestCase):
         # This allows us to "honor" some external providers that, in some cases, will not have services available...
         TestServiceCache.maxUserServices = 0
         self.assertEqual(self.runCacheUpdater(self.servicePool.cache_l1_srvs + 10), 0)
+
+    def test_multiple_steps(self) -> None:
+        GlobalConfig.CACHE_UPDATE_STEPS.set(5)
+        GlobalConfig.CACHE_UPDATE_BUDGET.set(0)
+        self.setCache(initial=10, cache=20, max=50)
+
+        # Every run must create up to 5 services on the pool, until cache is full
+        self.assertEqual(self.runCacheUpdater(1), 5)
+        self.assertEqual(self.runCacheUpdater(3), 20)
+        self.assertEqual(self.runCacheUpdater(1), 20)
+
+        # And remove them the same way
+        self.setCache(initial=0, cache=12)
+        self.assertEqual(self.runCacheUpdater(1), 15)
+        self.assertEqual(self.runCacheUpdater(1), 12)
+
+        # Budget limits the extra steps, but not the first one
+        GlobalConfig.CACHE_UPDATE_BUDGET.set(3)
+        self.setCache(cache=30)
+        self.assertEqual(self.runCacheUpdater(1), 15)
@@ -28,16 +28,21 @@
 """
 @author: Adolfo Gómez, dkmaster at dkmon dot com
 """
+import datetime
 import typing
 import collections.abc
 import logging
 from unittest import mock
 
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory
 from django.urls import reverse
 
 from uds.core.util import config
 from uds.middleware import request
-from uds.core.auths.auth import AUTHORIZED_KEY
+from uds.core.auths.auth import AUTHORIZED_KEY, EXPIRY_KEY, USER_KEY
+
+from ..fixtures import authenticators as fixtures_authenticators
 
 from ..utils.web import test
 
@@ -241,3 +246,62 @@ class GlobalRequestMiddlewareTest(test.WEBTestCase):
                         self.assertEqual(req.ip, first_proxy)
                         self.assertEqual(req.ip_proxy, client_ip)
                         self.assertEqual(req.ip_version, 4 if '.' in first_proxy else 6)
+
+    def test_session_expiry_throttled(self) -> None:
+        config.GlobalConfig.SESSION_DURATION_USER.set(1000)
+        config.GlobalConfig.SESSION_REFRESH_RATIO.set(10)
+        auth = fixtures_authenticators.createAuthenticator()
+        user = fixtures_authenticators.createUsers(auth)[0]
+
+        req = typing.cast('ExtendedHttpRequestWithUser', RequestFactory().get('/'))
+        req.session = SessionStore()
+        req.session[USER_KEY] = user.pk
+        skipped = request.SessionCounters.skipped
+
+        # First request sets expiry
+        self.assertIsNone(request._process_request(req))
+        self.assertEqual(req.user, user)
+        self.assertIn(EXPIRY_KEY, req.session)
+
+        # Next ones will not modify session, and will not read user from db
+        req.session.save()
+        req.session.modified = False
+        with self.assertNumQueries(0):
+            for _ in range(4):
+                self.assertIsNone(request._process_request(req))
+                self.assertEqual(req.user, user)
+        self.assertFalse(req.session.modified)
+        self.assertEqual(request.SessionCounters.skipped, skipped + 4)
+
+        # Once 10% of the session has elapsed, it is refreshed
+        req.session[EXPIRY_KEY] = (
+            datetime.datetime.fromisoformat(req.session[EXPIRY_KEY]) - datetime.timedelta(seconds=101)
+        ).isoformat()
+        req.session.modified = False
+        request._process_request(req)
+        self.assertTrue(req.session.modified)
+
+        # Every request gets its own copy of user and authenticator
+        first = req.user
+        first.manager.getInstance()
+        request._process_request(req)
+        self.assertIsNot(req.user, first)
+        self.assertIsNot(req.user.manager, first.manager)
+        self.assertIsNone(req.user.manager._cachedInstance)
+
+        # Changes on authenticator are seen
+        auth.name = 'Changed'
+        auth.save()
+        request._process_request(req)
+        self.assertEqual(req.user.manager.name, 'Changed')
+
+        # Changes on user are seen
+        user.real_name = 'Changed'
+        user.save()
+        request._process_request(req)
+        self.assertEqual(req.user.real_name, 'Changed')
+
+        # And deleted users are not valid anymore
+        user.delete()
+        request._process_request(req)
+        self.assertIsNone(req.user)
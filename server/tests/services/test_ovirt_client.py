@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2023 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L.U. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import importlib.util
+import logging
+import threading
+import time
+import types
+import typing
+from unittest import TestCase, mock
+
+from uds import services
+
+logger = logging.getLogger(__name__)
+
+
+class SDKError(Exception):
+    pass
+
+
+class SDKAuthError(SDKError):
+    pass
+
+
+class SDKConnectionError(SDKError):
+    pass
+
+
+class ConnectionStub:
+    """
+    In-process replacement of ovirtsdk4.Connection.
+    Counts created, closed and concurrently used connections, so tests can check the pool.
+    """
+
+    lock: typing.ClassVar[threading.Lock] = threading.Lock()
+    created: typing.ClassVar[int] = 0
+    closed: typing.ClassVar[int] = 0
+    concurrent: typing.ClassVar[int] = 0
+    maxConcurrent: typing.ClassVar[int] = 0
+    listed: typing.ClassVar[int] = 0
+    alive: typing.ClassVar[bool] = True
+
+    vms: typing.ClassVar[list[typing.Any]] = [
+        types.SimpleNamespace(id='vm1', status=types.SimpleNamespace(value='up')),
+        types.SimpleNamespace(id='vm2', status=types.SimpleNamespace(value='down')),
+        types.SimpleNamespace(id='vm3', status=None),
+    ]
+
+    isClosed: bool
+
+    def __init__(self, url: str, username: str, password: str, timeout: int, insecure: bool) -> None:
+        self.username = username
+        self.isClosed = False
+        with ConnectionStub.lock:
+            ConnectionStub.created += 1
+
+    @staticmethod
+    def reset() -> None:
+        ConnectionStub.created = ConnectionStub.closed = ConnectionStub.listed = 0
+        ConnectionStub.concurrent = ConnectionStub.maxConcurrent = 0
+        ConnectionStub.alive = True
+
+    def test(self, raise_exception: bool = True) -> bool:
+        return ConnectionStub.alive
+
+    def close(self) -> None:
+        self.isClosed = True
+        with ConnectionStub.lock:
+            ConnectionStub.closed += 1
+
+    def system_service(self) -> 'ConnectionStub':
+        return self
+
+    def vms_service(self) -> 'ConnectionStub':
+        return self
+
+    def list(self, search: typing.Optional[str] = None) -> list[typing.Any]:
+        with ConnectionStub.lock:
+            ConnectionStub.listed += 1
+        return ConnectionStub.vms
+
+    def use(self, seconds: float) -> None:
+        # Simulates a request, tracking how many connections are in use at the same time
+        with ConnectionStub.lock:
+            ConnectionStub.concurrent += 1
+            ConnectionStub.maxConcurrent = max(ConnectionStub.maxConcurrent, ConnectionStub.concurrent)
+        time.sleep(seconds)
+        with ConnectionStub.lock:
+            ConnectionStub.concurrent -= 1
+
+
+class CacheStub:
+    def __init__(self) -> None:
+        self.data: dict[str, typing.Any] = {}
+
+    def get(self, key: str, defValue: typing.Any = None) -> typing.Any:
+        return self.data.get(key, defValue)
+
+    def put(self, key: str, value: typing.Any, validity: typing.Optional[int] = None) -> None:
+        self.data[key] = value
+
+
+def loadClient() -> typing.Any:
+    """
+    Loads the oVirt client module against a stubbed ovirtsdk4, so it can be tested without the sdk.
+    The module is loaded from its file, so the OVirt provider package is not imported.
+    """
+    sdk = types.ModuleType('ovirtsdk4')
+    sdkTypes = types.ModuleType('ovirtsdk4.types')
+    sdk.Connection = ConnectionStub  # type: ignore
+    sdk.Error = SDKError  # type: ignore
+    sdk.AuthError = SDKAuthError  # type: ignore
+    sdk.ConnectionError = SDKConnectionError  # type: ignore
+    sdk.types = sdkTypes  # type: ignore
+
+    with mock.patch.dict('sys.modules', {'ovirtsdk4': sdk, 'ovirtsdk4.types': sdkTypes}):
+        spec = typing.cast(
+            typing.Any,
+            importlib.util.spec_from_file_location(
+                'tests_ovirt_client', services.__path__[0] + '/OVirt/client/ovirt.py'
+            ),
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    return module
+
+
+class OVirtClientTest(TestCase):
+    client: typing.Any
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.client = loadClient()
+
+    def setUp(self) -> None:
+        ConnectionStub.reset()
+        self.client.ConnectionPool._pools.clear()
+
+    def newClient(self, password: str = 'password', owner: typing.Optional[str] = 'provider') -> typing.Any:
+        return self.client.Client('host', 'user', password, 10, CacheStub(), owner=owner)
+
+    def getPool(self) -> typing.Any:
+        return self.client.ConnectionPool.get('provider', 'host', 'user', 'password', 10)
+
+    def test_reuse(self) -> None:
+        pool = self.getPool()
+        conns = set()
+        for _ in range(10):
+            with pool.connection() as conn:
+                conns.add(conn)
+        self.assertEqual(len(conns), 1)
+        self.assertEqual(ConnectionStub.created, 1)
+        # Clients of the same provider share the pool
+        self.assertIs(self.newClient()._pool, pool)
+        self.assertIs(self.newClient()._pool, self.newClient()._pool)
+
+    def test_stale_check(self) -> None:
+        pool = self.getPool()
+        with pool.connection() as first:
+            pass
+
+        # Idle for less than CHECK_INTERVAL, reused without checking it
+        ConnectionStub.alive = False
+        with pool.connection() as conn:
+            self.assertIs(conn, first)
+
+        # Idle for more than CHECK_INTERVAL, and the check fails
+        with mock.patch.object(self.client.ConnectionPool, 'CHECK_INTERVAL', -1):
+            with pool.connection() as conn:
+                self.assertIsNot(conn, first)
+        self.assertTrue(first.isClosed)
+        self.assertEqual(ConnectionStub.created, 2)
+
+        # Check succeeds, so it is reused
+        ConnectionStub.alive = True
+        with mock.patch.object(self.client.ConnectionPool, 'CHECK_INTERVAL', -1):
+            with pool.connection() as again:
+                self.assertIs(again, conn)
+        self.assertEqual(ConnectionStub.created, 2)
+
+    def test_discard_on_auth_error(self) -> None:
+        pool = self.getPool()
+        with self.assertRaises(SDKAuthError):
+            with pool.connection() as first:
+                raise SDKAuthError('Session expired')
+        self.assertTrue(first.isClosed)
+
+        with pool.connection() as conn:
+            self.assertIsNot(conn, first)
+
+        # Other errors do not discard the connection
+        with self.assertRaises(ValueError):
+            with pool.connection() as second:
+                raise ValueError()
+        self.assertFalse(second.isClosed)
+        with pool.connection() as conn:
+            self.assertIs(conn, second)
+        self.assertEqual(ConnectionStub.created, 2)
+
+    def test_max_connections(self) -> None:
+        pool = self.getPool()
+
+        def worker() -> None:
+            for _ in range(3):
+                with pool.connection() as conn:
+                    conn.use(0.02)
+
+        threads = [threading.Thread(target=worker) for _ in range(self.client.ConnectionPool.MAX_CONNECTIONS * 2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        self.assertGreater(ConnectionStub.maxConcurrent, 1)
+        self.assertLessEqual(ConnectionStub.maxConcurrent, self.client.ConnectionPool.MAX_CONNECTIONS)
+        self.assertLessEqual(ConnectionStub.created, self.client.ConnectionPool.MAX_CONNECTIONS)
+
+    def test_pool_replaced_on_config_change(self) -> None:
+        client = self.newClient()
+        pool = client._pool
+        with pool.connection() as inUse:
+            with pool.connection() as idle:
+                pass
+            # Credentials of the provider are changed while a request is running
+            newPool = self.newClient(password='other')._pool
+            self.assertIsNot(newPool, pool)
+            self.assertTrue(idle.isClosed)
+            self.assertFalse(inUse.isClosed)
+        # Returned to a replaced pool, so it is closed
+        self.assertTrue(inUse.isClosed)
+        self.assertEqual(list(self.client.ConnectionPool._pools), ['provider'])
+
+        with newPool.connection() as conn:
+            self.assertEqual(conn.username, 'user')
+            self.assertIsNot(conn, idle)
+
+        # Without owner, pools are kept per engine & credentials
+        self.assertIsNot(self.newClient(owner=None)._pool, self.newClient(owner=None, password='other')._pool)
+
+    def test_get_machines_state(self) -> None:
+        client = self.newClient()
+        states = {'vm1': 'up', 'vm2': 'down', 'vm3': 'unknown'}
+        self.assertEqual(client.getMachinesState(), states)
+        self.assertEqual(ConnectionStub.listed, 1)
+
+        # Cached, so no request is done
+        self.assertEqual(client.getMachinesState(), states)
+        self.assertEqual(ConnectionStub.listed, 1)
+
+        self.assertEqual(client.getMachinesState(force=True), states)
+        self.assertEqual(ConnectionStub.listed, 2)
+        self.assertEqual(ConnectionStub.created, 1)
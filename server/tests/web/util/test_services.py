@@ -40,6 +40,7 @@ from unittest import mock
 from uds import models
 from uds.core import types, consts
 from uds.web.util import services
+from uds.web.util.services_index import ServicesIndex
 
 from ...utils.test import UDSTransactionTestCase
 from ...fixtures import authenticators as fixtures_authenticators
@@ -251,3 +252,24 @@ class TestGetServicesData(UDSTransactionTestCase):
         self.assertEqual(len(list(filter(lambda x: x['is_meta'], result_services))), 10)
         self.assertEqual(len(list(filter(lambda x: not x['is_meta'], result_services))), 10)
 
+
+    def test_services_index_invalidation(self) -> None:
+        pool = fixtures_services.createCacheTestingUserServices(count=1, user=self.user, groups=self.groups)[
+            0
+        ].deployed_service
+
+        data = services.getServicesData(self.request)
+        self.assertEqual(len(data['services']), 1)
+        self.assertEqual(len(data['services'][0]['transports']), pool.transports.count())
+
+        # Index is used on next request
+        index = ServicesIndex.manager()
+        self.assertIn(pool.uuid, index._pools)
+
+        # Restrict transports to other os, index must be invalidated and pool must not be shown
+        for transport in pool.transports.all():
+            transport.allowed_oss = types.os.KnownOS.WINDOWS.name
+            transport.save()
+
+        data = services.getServicesData(self.request)
+        self.assertEqual(len(data['services']), 0)